@@ -0,0 +1,255 @@
+"""
+Measure setup time, poll throughput, executor occupancy, peak memory and
+state writes against a simulated cloud. Run with:
+
+    python -m benchmarks.run --robots 1 10 100 500
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from custom_components.purei9 import api, const, coordinator, vacuum, sensor, governor, lanes
+from tests.fakes import FakeAuth, FakeCloud
+
+class MeasuredExecutor(ThreadPoolExecutor):
+    """An executor that keeps track of how long its threads are busy"""
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self.workers = max_workers
+        self.busy = 0.0
+        self.jobs = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        def measured():
+            start = time.perf_counter()
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - start
+                    self.jobs += 1
+
+        return super().submit(measured)
+
+# pylint: disable=too-few-public-methods
+class StateWrites:
+    """Counts state writes instead of writing to Home Assistant"""
+    count = 0
+
+    def async_write_ha_state(self):
+        """Count a state write"""
+        StateWrites.count += 1
+
+# pylint: disable=abstract-method
+class BenchmarkVacuum(StateWrites, vacuum.PureI9):
+    """Vacuum entity that counts its state writes"""
+
+def create_entities(coord):
+    """Create all entities of a robot, counting their state writes"""
+    entity_classes = [
+        BenchmarkVacuum,
+        *[
+            type(f"Benchmark{cls.__name__}", (StateWrites, cls), {})
+            for cls in (
+                sensor.PureI9LastCleaningStart,
+                sensor.PureI9LastCleaningStop,
+                sensor.PureI9LastCleaningDuration,
+                sensor.PureI9Dustbin,
+                sensor.PureI9Battery,
+            )
+        ],
+    ]
+
+    return [
+        cls(coord, coord.robot, coord.data) if cls is BenchmarkVacuum else cls(coord, coord.data)
+        for cls in entity_classes
+    ]
+
+def create_config_entry(batched_polling: bool) -> ConfigEntry:
+    """A config entry that is never set up by Home Assistant"""
+    return ConfigEntry(
+        data={},
+        discovery_keys=MappingProxyType({}),
+        domain=const.DOMAIN,
+        minor_version=1,
+        options={const.CONF_BATCHED_POLLING: batched_polling},
+        source="user",
+        title="benchmark",
+        unique_id=None,
+        version=1,
+    )
+
+async def async_refresh(coords, account_coord) -> None:
+    """Poll every robot once, the same way the integration does"""
+    if account_coord is not None:
+        await account_coord.async_refresh()
+    else:
+        await asyncio.gather(*[coord.async_refresh() for coord in coords])
+
+async def async_run_scenario(fleet_size: int, args) -> dict:
+    """Set up a fleet, poll it a number of rounds and measure"""
+    with tempfile.TemporaryDirectory() as config_dir:
+        return await async_measure(fleet_size, args, config_dir)
+
+# pylint: disable=too-many-locals
+async def async_measure(fleet_size: int, args, config_dir: str) -> dict:
+    """Measure a fleet with Home Assistant's configuration in a directory"""
+    cloud = FakeCloud(
+        [f"robot-{i:04d}" for i in range(fleet_size)],
+        [],
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        change_rate=args.change_rate,
+        seed=args.seed,
+        sessions=28
+    )
+    server = TestServer(cloud.app)
+    await server.start_server()
+
+    hass = HomeAssistant(config_dir)
+
+    # The integration's own executors, the default executor is not used for its blocking work
+    executors = [
+        MeasuredExecutor(lanes.EXECUTOR_WORKERS),
+        MeasuredExecutor(lanes.LOCAL_EXECUTOR_WORKERS),
+    ]
+    hass.data[lanes.DATA_EXECUTOR], hass.data[lanes.DATA_LOCAL_EXECUTOR] = executors
+
+    StateWrites.count = 0
+
+    tracemalloc.start()
+    wall_start = time.perf_counter()
+
+    async with ClientSession() as session:
+        # Without a rate, the governor never holds back requests to the simulated cloud
+        request_governor = (
+            governor.Governor(args.rate, max(1, int(args.rate)))
+            if args.rate
+            else governor.Governor(float(10 ** 9), 10 ** 9, 0)
+        )
+        cloud_api = api.CloudApi(
+            session,
+            FakeAuth(),
+            f"http://{server.host}:{server.port}",
+            request_governor
+        )
+        config_entry = create_config_entry(args.batched)
+
+        # Setup: discover robots, create coordinators, first refresh and entities
+        start = time.perf_counter()
+
+        robots = [
+            api.ApiRobot(cloud_api, robot_id)
+            for robot_id in await cloud_api.async_get_robot_ids()
+        ]
+
+        coords = [
+            coordinator.PureI9Coordinator(hass, config_entry, robot, polling=not args.batched)
+            for robot in robots
+        ]
+
+        account_coord = (
+            coordinator.PureI9AccountCoordinator(hass, config_entry, cloud_api, coords)
+            if args.batched
+            else None
+        )
+
+        await async_refresh(coords, account_coord)
+
+        for coord in coords:
+            for entity in create_entities(coord):
+                coord.async_add_listener(entity._handle_coordinator_update) # pylint: disable=protected-access
+
+        setup_time = time.perf_counter() - start
+        writes_after_setup = StateWrites.count
+
+        # Polls: the fleet changes a bit between each round
+        start = time.perf_counter()
+
+        for _ in range(args.rounds):
+            cloud.tick()
+            await async_refresh(coords, account_coord)
+
+        poll_time = time.perf_counter() - start
+
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall_time = time.perf_counter() - wall_start
+
+    for coord in coords:
+        coord.commands.cancel()
+
+    await hass.async_stop(force=True)
+    await server.close()
+
+    for executor in executors:
+        executor.shutdown()
+
+    simulated_minutes = args.rounds * args.interval / 60
+
+    return {
+        "robots": fleet_size,
+        "setup_s": setup_time,
+        "polls_per_s": fleet_size * args.rounds / poll_time,
+        "executor_busy_pct": 100 * sum(executor.busy for executor in executors) / (
+            wall_time * sum(executor.workers for executor in executors)
+        ),
+        "executor_jobs": sum(executor.jobs for executor in executors),
+        "peak_mem_mib": peak_memory / 2 ** 20,
+        "writes_per_min": (StateWrites.count - writes_after_setup) / simulated_minutes,
+        "requests": cloud.request_count,
+        "failed_requests": cloud.failures,
+    }
+
+def print_results(results) -> None:
+    """Print the results as a table"""
+    columns = list(results[0])
+
+    print(" | ".join(f"{column:>17}" for column in columns))
+
+    for result in results:
+        print(" | ".join(
+            f"{result[column]:>17.3f}" if isinstance(result[column], float)
+            else f"{result[column]:>17}"
+            for column in columns
+        ))
+
+def main() -> None:
+    """Run the benchmarks from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--robots", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=20, help="Poll rounds per fleet")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of failed requests")
+    parser.add_argument(
+        "--change-rate",
+        type=float,
+        default=0.2,
+        help="Share of robots changing per round"
+    )
+    parser.add_argument("--interval", type=float, default=15, help="Simulated seconds per round")
+    parser.add_argument("--batched", action="store_true", help="Use batched polling")
+    parser.add_argument("--rate", type=float, default=0, help="Requests per second, 0 for no limit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = []
+
+    for fleet_size in args.robots:
+        results.append(asyncio.run(async_run_scenario(fleet_size, args)))
+
+    print_results(results)
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,289 @@
 """Control your Electrolux Purei9 vacuum robot"""
 import asyncio
-from homeassistant.const import CONF_PASSWORD, CONF_EMAIL, CONF_COUNTRY_CODE
+import logging
+from functools import partial
+from aiohttp import ClientError
+from homeassistant.const import CONF_PASSWORD, CONF_EMAIL, CONF_COUNTRY_CODE, CONF_TOKEN
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from purei9_unofficial.cloudv3 import CloudClient
-from . import const, coordinator
+from . import (
+    const,
+    coordinator,
+    api,
+    snapshot,
+    stream,
+    services,
+    exception,
+    metadata,
+    local,
+    pool,
+    history,
+    maps,
+)
+
+_LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["vacuum", "sensor"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(const.DOMAIN)
+
+# pylint: disable=unused-argument
+async def async_setup(hass, config) -> bool:
+    """Register the services, which act on the robots of all config entries"""
+    services.async_setup_services(hass)
+
+    return True
+
+def create_auth(hass, config_entry) -> api.CloudAuth:
+    """Create the authentication for a config entry"""
+    # Reuse the token from the last time to skip logging in again
+    purei9_client = CloudClient(
+        config_entry.data.get(CONF_EMAIL),
+        config_entry.data.get(CONF_PASSWORD),
+        token=config_entry.data.get(CONF_TOKEN),
+        countrycode=config_entry.data.get(CONF_COUNTRY_CODE)
+    )
+
+    # The regional URL is only learned while logging in, so keep it with the token
+    if const.CONF_BASE_URL in config_entry.data:
+        purei9_client.baseurl = config_entry.data[const.CONF_BASE_URL]
+
+    def save_token(token: str) -> None:
+        hass.config_entries.async_update_entry(
+            config_entry,
+            data={
+                **config_entry.data,
+                CONF_TOKEN: token,
+                const.CONF_BASE_URL: purei9_client.baseurl,
+            }
+        )
+
+    return api.CloudAuth(hass, purei9_client, async_get_clientsession(hass), save_token)
+
 async def async_setup_entry(hass, config_entry) -> bool:
     """Setup the integration after the config flow"""
-    email = config_entry.data.get(CONF_EMAIL)
-    password = config_entry.data.get(CONF_PASSWORD)
-    countrycode = config_entry.data.get(CONF_COUNTRY_CODE)
+    auth = create_auth(hass, config_entry)
 
-    purei9_client = CloudClient(email, password, countrycode=countrycode)
+    # Talk to the cloud using the shared HTTP session. Only the login is blocking.
+    cloud_api = api.CloudApi(async_get_clientsession(hass), auth)
 
-    robots = await hass.async_add_executor_job(purei9_client.getRobots)
-    robots = list(robots)
+    # Robots are shared with the other config entries
+    robot_pool = pool.async_get_robot_pool(hass)
+    config_entry.async_on_unload(partial(robot_pool.release, config_entry.entry_id))
 
-    # Download and cache all robots
-    await asyncio.gather(
-        *[hass.async_add_executor_job(robot.getid) for robot in robots]
-    )
+    # Start with the last known state, if any, so that startup does not
+    # need to wait for the cloud
+    snapshot_store = snapshot.SnapshotStore(hass, config_entry.entry_id)
+    snapshots = await snapshot_store.async_load()
+
+    # Appliances are only looked up once to know if they are robots
+    device_types = metadata.DeviceTypeCache(hass, config_entry.entry_id)
+    await device_types.async_load()
+
+    if snapshots:
+        robot_ids = list(snapshots)
+    else:
+        try:
+            robot_ids = await cloud_api.async_get_robot_ids(device_types)
+        except (ClientError, TimeoutError, exception.CloudUnavailableException) as ex:
+            raise ConfigEntryNotReady("Could not discover robots.") from ex
+
+    # Robots that another account already set up are skipped
+    robot_ids = robot_pool.claim_robots(config_entry.entry_id, robot_ids)
+    cloud_api.size_lanes(len(robot_ids))
+    robots = create_robots(config_entry, cloud_api, robot_ids)
+
+    batched_polling = config_entry.options.get(const.CONF_BATCHED_POLLING, False)
 
     # Create the coordinators
-    coords = [coordinator.PureI9Coordinator(hass, robot.getid(), robot) for robot in robots]
+    coords = [
+        coordinator.PureI9Coordinator(hass, config_entry, robot, polling=not batched_polling)
+        for robot in robots
+    ]
 
-    await asyncio.gather(
-        *[coord.async_config_entry_first_refresh() for coord in coords]
-    )
+    account_coord = None
+
+    if batched_polling:
+        # One coordinator polls all robots and pushes the result to each robot
+        account_coord = coordinator.PureI9AccountCoordinator(
+            hass,
+            config_entry,
+            cloud_api,
+            coords
+        )
+
+        # Coordinators only keep polling while something listens to them
+        config_entry.async_on_unload(account_coord.async_add_listener(lambda: None))
+
+    if snapshots:
+        for coord in coords:
+            coord.async_set_updated_data(snapshots[coord.robot.getid()])
+
+        # Refresh in the background, entities show the last known state until then
+        for coord in [account_coord] if batched_polling else coords:
+            config_entry.async_create_background_task(
+                hass,
+                coord.async_refresh(),
+                f"{const.DOMAIN} first refresh {coord.name}"
+            )
+
+        config_entry.async_create_background_task(
+            hass,
+            async_rediscover(
+                hass,
+                config_entry,
+                cloud_api,
+                robot_ids,
+                device_types,
+                snapshot_store
+            ),
+            f"{const.DOMAIN} rediscover {config_entry.title}"
+        )
+    elif batched_polling:
+        await account_coord.async_config_entry_first_refresh()
+    else:
+        await asyncio.gather(
+            *[coord.async_config_entry_first_refresh() for coord in coords]
+        )
+
+    config_entry.async_on_unload(snapshot_store.async_track(coords))
+
+    if config_entry.options.get(const.CONF_LOCAL, False):
+        start_local(hass, config_entry, coords)
+
+    if config_entry.options.get(const.CONF_PUSH, False):
+        start_stream(hass, config_entry, auth, coords, account_coord)
 
     # Continue with setting up devices and entities
     hass.data.setdefault(const.DOMAIN, {})
-    hass.data[const.DOMAIN][config_entry.entry_id] = {const.COORDINATORS: coords}
+    hass.data[const.DOMAIN][config_entry.entry_id] = {
+        const.COORDINATORS: coords,
+        const.ACCOUNT_COORDINATOR: account_coord,
+        const.OPTIONS: dict(config_entry.options),
+    }
+
+    config_entry.async_on_unload(auth.async_schedule_refresh())
+    config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
 
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
     return True
+
+def create_robots(config_entry, cloud_api: api.CloudApi, robot_ids):
+    """Create the robots, which talk to the cloud or the local network"""
+    robots = [api.ApiRobot(cloud_api, robot_id) for robot_id in robot_ids]
+
+    if config_entry.options.get(const.CONF_LOCAL, False):
+        # Robots talk to the cloud until they are found on the local network
+        robots = [local.LocalFirstRobot(robot) for robot in robots]
+
+    return robots
+
+def start_local(hass, config_entry, coords) -> None:
+    """Find the robots on the local network in the background"""
+    robots = [coord.robot for coord in coords]
+
+    for robot in robots:
+        config_entry.async_on_unload(robot.async_close)
+
+    # Robots are matched on name when their local id differs from the cloud
+    config_entry.async_create_background_task(
+        hass,
+        local.async_discover(
+            hass,
+            robots,
+            {coord.robot.getid(): coord.data.name for coord in coords if coord.data},
+            config_entry.options.get(const.CONF_LOCAL_PASSWORD, "")
+        ),
+        f"{const.DOMAIN} local discovery {config_entry.title}"
+    )
+
+def start_stream(hass, config_entry, auth: api.CloudAuth, coords, account_coord) -> None:
+    """Push updates to the coordinators, polling only to reconcile while connected"""
+    coords_by_id = {coord.robot.getid(): coord for coord in coords}
+
+    async def on_delta(robot_id, delta) -> None:
+        if robot_id in coords_by_id:
+            await coords_by_id[robot_id].async_handle_delta(delta)
+
+    def on_connection(connected: bool) -> None:
+        for coord in [account_coord] if account_coord is not None else coords:
+            coord.async_set_push_connected(connected)
+
+    appliance_stream = stream.ApplianceStream(
+        async_get_clientsession(hass),
+        auth,
+        stream.websocket_url(auth.client.baseurl),
+        list(coords_by_id),
+        on_delta,
+        on_connection
+    )
+
+    config_entry.async_create_background_task(
+        hass,
+        appliance_stream.async_run(),
+        f"{const.DOMAIN} stream {config_entry.title}"
+    )
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+async def async_rediscover(
+        hass,
+        config_entry,
+        cloud_api: api.CloudApi,
+        robot_ids,
+        device_types: metadata.DeviceTypeCache,
+        snapshot_store: snapshot.SnapshotStore
+    ) -> None:
+    """Reload the integration if robots were added or removed since the last known state"""
+    try:
+        discovered_robot_ids = await cloud_api.async_get_robot_ids(device_types)
+    except (ClientError, TimeoutError, exception.CloudUnavailableException):
+        _LOGGER.warning("Could not discover robots, using the last known robots.")
+        return
+
+    discovered_robot_ids = pool.async_get_robot_pool(hass).unclaimed(
+        config_entry.entry_id,
+        discovered_robot_ids
+    )
+
+    if set(discovered_robot_ids) != set(robot_ids):
+        _LOGGER.info("Robots have changed since the last known state, reloading.")
+
+        # Otherwise the reload would start from the same robots, and reload again
+        await snapshot_store.async_remove()
+        hass.config_entries.async_schedule_reload(config_entry.entry_id)
+
+async def async_unload_entry(hass, config_entry) -> bool:
+    """Unload the integration"""
+    unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+
+    if unload_ok:
+        hass.data[const.DOMAIN].pop(config_entry.entry_id)
+
+    return unload_ok
+
+async def async_remove_entry(hass, config_entry) -> None:
+    """Remove stored data when the integration is removed"""
+    device_types = metadata.DeviceTypeCache(hass, config_entry.entry_id)
+    await device_types.async_load()
+
+    # Robots that another config entry has set up keep their data
+    for robot_id in pool.async_get_robot_pool(hass).unclaimed(
+            config_entry.entry_id,
+            device_types.appliance_ids
+        ):
+        await history.CleaningHistory(hass, robot_id).async_remove()
+        await maps.MapCache(hass, robot_id).async_remove()
+
+    await snapshot.SnapshotStore(hass, config_entry.entry_id).async_remove()
+    await device_types.async_remove()
+
+async def async_reload_entry(hass, config_entry) -> None:
+    """Reload the integration when the options change"""
+    # Saving a new token also updates the entry, which should not reload it
+    if hass.data[const.DOMAIN][config_entry.entry_id][const.OPTIONS] == config_entry.options:
+        return
+
+    await hass.config_entries.async_reload(config_entry.entry_id)
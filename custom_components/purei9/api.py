@@ -0,0 +1,508 @@
+"""Asynchronous transport for the Electrolux cloud API"""
+import asyncio
+import datetime
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout
+from homeassistant.helpers.event import async_call_later
+from purei9_unofficial.cloudv3 import CloudClient
+from purei9_unofficial.common import CleaningSession, PowerMode
+from . import exception, metrics, breaker, lanes, governor
+
+_LOGGER = logging.getLogger(__name__)
+
+# See: https://github.com/Phype/purei9_unofficial/blob/master/src/purei9_unofficial/cloudv3.py
+BASE_URL = "https://api.ocp.electrolux.one"
+APPLIANCE_API_PATH = "/appliance/api/v2"
+PURE_API_PATH = "/purei/api/v2"
+
+DEVICE_TYPE_ROBOT = "ROBOTIC_VACUUM_CLEANER"
+
+REQUEST_TIMEOUT = ClientTimeout(total=10)
+REQUEST_RETRIES = 2
+# Seconds to wait before retrying a request, doubling for each retry
+RETRY_DELAY_MIN = 0.5
+RETRY_DELAY_MAX = 5
+
+# Refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+# Seconds to wait before refreshing again without a usable token, doubling for each retry
+TOKEN_REFRESH_RETRY = 60
+TOKEN_REFRESH_RETRY_MAX = 3600
+
+class CloudAuth:
+    """
+    Authenticate against the Electrolux cloud. Logging in is blocking and runs
+    in the executor, while a valid token is used without leaving the event loop.
+    """
+    def __init__(
+            self,
+            hass,
+            client: CloudClient,
+            session: ClientSession,
+            token_listener: Callable[[str], None] = None
+        ):
+        self._hass = hass
+        self._client = client
+        self._session = session
+        self._token_listener = token_listener
+        self._lock = asyncio.Lock()
+        self._cancel_refresh = None
+        self._refresh_retries = 0
+
+    @property
+    def client(self) -> CloudClient:
+        """Immutable client"""
+        return self._client
+
+    def is_token_valid(self) -> bool:
+        """If there is a token that has not expired"""
+        token = self._client.token
+        return token is not None and time.time() < token["expires"]
+
+    async def async_get_headers(self) -> Dict[str, str]:
+        """Get the headers required to authenticate a request"""
+        if not self.is_token_valid():
+            async with self._lock:
+                # Another request might have logged in while we were waiting
+                if not self.is_token_valid():
+                    await self._async_login()
+
+        # pylint: disable=protected-access
+        return self._client._getHeaders()
+
+    def invalidate_token(self) -> None:
+        """Forget a token that the cloud no longer accepts"""
+        self._client.settoken(None)
+
+    async def async_refresh_token(self) -> None:
+        """Refresh the token using the refresh token, or log in again if that fails"""
+        async with self._lock:
+            token = self._client.token
+
+            if token is None or "refreshToken" not in token:
+                await self._async_login()
+                return
+
+            try:
+                async with self._session.post(
+                    self._client.authorizationurl + "/token",
+                    json={
+                        "clientId": self._client.client_id,
+                        "grantType": "refresh_token",
+                        "refreshToken": token["refreshToken"],
+                    },
+                    headers={
+                        "x-api-key": self._client.x_api_key,
+                        "User-Agent": self._client.user_agent,
+                    },
+                    timeout=REQUEST_TIMEOUT
+                ) as response:
+                    response.raise_for_status()
+                    self._client.settoken(await response.text())
+            except (ClientError, TimeoutError):
+                _LOGGER.warning("Could not refresh the token, logging in again.")
+                await self._async_login()
+                return
+
+            self._token_changed()
+
+    def async_schedule_refresh(self) -> Callable[[], None]:
+        """Keep refreshing the token in the background. Returns a function to stop."""
+        self._cancel_refresh = async_call_later(
+            self._hass,
+            self._refresh_delay(),
+            self._async_scheduled_refresh
+        )
+
+        return self._async_cancel_refresh
+
+    def _refresh_delay(self) -> float:
+        token = self._client.token
+        expires = token.get("expires") if token is not None else None
+
+        if isinstance(expires, (int, float)):
+            delay = expires - TOKEN_REFRESH_MARGIN - time.time()
+
+            if delay > 0:
+                self._refresh_retries = 0
+                return delay
+
+            # A token that is due is refreshed right away, but only once
+            if self._refresh_retries == 0:
+                self._refresh_retries = 1
+                return 0
+
+        # Refreshing failed or did not give a token that can be used, back off
+        delay = min(TOKEN_REFRESH_RETRY * 2 ** self._refresh_retries, TOKEN_REFRESH_RETRY_MAX)
+        self._refresh_retries += 1
+
+        return delay
+
+    async def _async_scheduled_refresh(self, _now) -> None:
+        try:
+            await self.async_refresh_token()
+        # pylint: disable=broad-except
+        except Exception:
+            _LOGGER.exception("Could not refresh the token.")
+
+        self.async_schedule_refresh()
+
+    def _async_cancel_refresh(self) -> None:
+        if self._cancel_refresh is not None:
+            self._cancel_refresh()
+            self._cancel_refresh = None
+
+    async def _async_login(self) -> None:
+        self._client.settoken(None)
+        # pylint: disable=protected-access
+        await self._hass.loop.run_in_executor(
+            lanes.async_get_executor(self._hass),
+            self._client._getHeaders
+        )
+        self._token_changed()
+
+    def _token_changed(self) -> None:
+        if self._token_listener is not None:
+            self._token_listener(self._client.gettoken())
+
+# pylint: disable=too-many-instance-attributes
+class CloudApi:
+    """Talk to the Electrolux cloud API using a shared HTTP session"""
+    def __init__(
+            self,
+            session: ClientSession,
+            auth,
+            base_url: str = BASE_URL,
+            request_governor: governor.Governor = None
+        ):
+        self._session = session
+        self._auth = auth
+        self._governor = request_governor or governor.Governor()
+        self._api_url = base_url + APPLIANCE_API_PATH
+        self._pure_api_url = base_url + PURE_API_PATH
+        self._metrics = metrics.Metrics()
+        self._breaker = breaker.CircuitBreaker()
+        self._lanes = {
+            lanes.LANE_POLL: lanes.Lane(lanes.LANE_POLL),
+            lanes.LANE_COMMAND: lanes.Lane(lanes.LANE_COMMAND),
+        }
+
+    @property
+    def metrics(self) -> metrics.Metrics:
+        """Latency and outcome of the requests, by call"""
+        return self._metrics
+
+    @property
+    def breaker(self) -> breaker.CircuitBreaker:
+        """Stops requests for the whole account while the cloud is down"""
+        return self._breaker
+
+    @property
+    def governor(self) -> governor.Governor:
+        """Keeps the requests of the account within the rate limits of the cloud"""
+        return self._governor
+
+    @property
+    def lanes(self) -> Dict[str, lanes.Lane]:
+        """The lanes that requests wait in, by name"""
+        return self._lanes
+
+    def size_lanes(self, robot_count: int) -> None:
+        """Let more requests through at the same time for accounts with many robots"""
+        for lane in self._lanes.values():
+            lane.resize(lanes.lane_limit(robot_count))
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    async def async_request(
+            self,
+            method: str,
+            url: str,
+            retries: int = REQUEST_RETRIES,
+            call: str = None,
+            **kwargs
+        ):
+        """Send a request and return the decoded JSON body, if any"""
+        # Commands go before polls. Waiting here says nothing about the cloud, so it's
+        # done before the breaker and does not hold a place in a lane.
+        await self._governor.async_acquire(
+            governor.PRIORITY_POLL if method == "GET" else governor.PRIORITY_COMMAND
+        )
+
+        # Commands change the robot, everything else reads. Commands never wait behind reads.
+        lane = self._lanes[lanes.LANE_POLL if method == "GET" else lanes.LANE_COMMAND]
+
+        async with lane.async_acquire():
+            return await self._async_request_guarded(method, url, retries, call, **kwargs)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    async def _async_request_guarded(
+            self,
+            method: str,
+            url: str,
+            retries: int,
+            call: str,
+            **kwargs
+        ):
+        self._breaker.before_call()
+
+        try:
+            # Measure what the caller experiences, including retries
+            async with self._metrics.async_measure(call or method):
+                body = await self._async_request(method, url, retries, **kwargs)
+        except ClientResponseError as ex:
+            # Only server errors mean that the cloud is down, rate limits are up to the governor
+            if ex.status >= 500:
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+
+            raise
+        except (ClientError, TimeoutError):
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            # Say a login or parsing error, or a cancelled call, which does not
+            # mean that the cloud is down
+            self._breaker.release_probe()
+            raise
+
+        self._breaker.record_success()
+
+        return body
+
+    async def _async_retry(self, method: str, url: str, retries: int, **kwargs):
+        # Spread retries so that robots don't hit the cloud in lockstep
+        await asyncio.sleep(
+            breaker.backoff(
+                REQUEST_RETRIES - retries,
+                RETRY_DELAY_MIN,
+                RETRY_DELAY_MAX,
+                random.random
+            )
+        )
+
+        # Every attempt counts against the rate limit
+        self._governor.take()
+
+        return await self._async_request(method, url, retries - 1, **kwargs)
+
+    async def _async_request(self, method: str, url: str, retries: int, **kwargs):
+        headers = await self._auth.async_get_headers()
+
+        try:
+            async with self._session.request(
+                method,
+                url,
+                headers=headers,
+                timeout=REQUEST_TIMEOUT,
+                **kwargs
+            ) as response:
+                _LOGGER.debug("HTTP %s %s %d", method, url, response.status)
+                self._governor.record_response(response.status, response.headers)
+                response.raise_for_status()
+                body = await response.text()
+        except ClientResponseError as ex:
+            # A token saved from an earlier session might have been revoked
+            if ex.status == 401:
+                self._auth.invalidate_token()
+
+            # The governor holds back requests until the cloud allows more
+            if retries > 0 and ex.status != 429:
+                return await self._async_retry(method, url, retries, **kwargs)
+
+            raise
+        except (ClientError, TimeoutError):
+            if retries > 0:
+                return await self._async_retry(method, url, retries, **kwargs)
+
+            raise
+
+        return json.loads(body) if body else None
+
+    async def async_get_appliances(self) -> List[Dict[str, Any]]:
+        """Get the state documents of all appliances on the account"""
+        return await self.async_request("GET", self._api_url + "/appliances", call="get_appliances")
+
+    async def async_get_appliance(self, appliance_id: str) -> Dict[str, Any]:
+        """Get the state document of an appliance"""
+        return await self.async_request(
+            "GET",
+            self._api_url + "/appliances/" + appliance_id,
+            call="get_appliance"
+        )
+
+    async def async_get_appliance_info(self, appliance_id: str) -> Dict[str, Any]:
+        """Get static information about an appliance"""
+        return await self.async_request(
+            "GET",
+            self._api_url + "/appliances/" + appliance_id + "/info",
+            call="get_appliance_info"
+        )
+
+    async def async_get_robot_ids(self, device_types=None) -> List[str]:
+        """
+        Get the identifiers of all robot vacuums on the account. Appliances in
+        the device type cache, if any, are not looked up again.
+        """
+        appliance_ids = [
+            appliance["applianceId"] for appliance in await self.async_get_appliances()
+        ]
+
+        now = time.time()
+        known = {
+            appliance_id: device_types.get(appliance_id, now)
+            for appliance_id in appliance_ids
+        } if device_types is not None else {}
+
+        unknown_ids = [
+            appliance_id for appliance_id in appliance_ids if known.get(appliance_id) is None
+        ]
+
+        infos = await asyncio.gather(
+            *[self.async_get_appliance_info(appliance_id) for appliance_id in unknown_ids]
+        )
+
+        for appliance_id, info in zip(unknown_ids, infos):
+            known[appliance_id] = info["deviceType"]
+
+            if device_types is not None:
+                device_types.set(appliance_id, info["deviceType"], now)
+
+        return [
+            appliance_id
+            for appliance_id in appliance_ids
+            if known[appliance_id] == DEVICE_TYPE_ROBOT
+        ]
+
+    async def async_send_command(self, appliance_id: str, command: Dict[str, Any]) -> None:
+        """Send a command to an appliance"""
+        await self.async_request(
+            "PUT",
+            self._api_url + "/appliances/" + appliance_id + "/command",
+            call="send_command",
+            json=command
+        )
+
+    async def async_update_appliance(self, appliance_id: str, properties: Dict[str, Any]) -> None:
+        """Update properties on an appliance"""
+        await self.async_request(
+            "PUT",
+            self._api_url + "/appliances/" + appliance_id,
+            call="update_appliance",
+            json=properties
+        )
+
+    async def async_get_history(self, appliance_id: str) -> List[Dict[str, Any]]:
+        """Get the cleaning history of an appliance"""
+        return await self.async_request(
+            "GET",
+            self._pure_api_url + "/appliances/" + appliance_id + "/history",
+            call="get_history"
+        )
+
+    async def async_get_maps(self, appliance_id: str) -> List[Dict[str, Any]]:
+        """Get the interactive maps of an appliance"""
+        return await self.async_request(
+            "GET",
+            self._pure_api_url + "/appliances/" + appliance_id + "/interactive-maps",
+            call="get_maps"
+        )
+
+def cleaning_session_create(item: Dict[str, Any]) -> CleaningSession:
+    """Create a cleaning session from an item in the cleaning history"""
+    return CleaningSession(
+        endtime=datetime.datetime.strptime(
+            item["timeStamp"].split(".")[0],
+            "%Y-%m-%dT%H:%M:%S"
+        ),
+        duration=(
+            item["cleaningSession"]["cleaningDuration"] / 10000000.0
+            if "cleaningSession" in item
+            else None
+        ),
+        cleandearea=item["cleanedArea"],
+    )
+
+class ApiRobot:
+    """A robot vacuum with the same semantics as CloudRobot, but asynchronous"""
+    def __init__(self, api: CloudApi, robot_id: str):
+        self._api = api
+        self._id = robot_id
+        self._appliance = None
+
+    @property
+    def api(self) -> CloudApi:
+        """Immutable API"""
+        return self._api
+
+    def getid(self) -> str:
+        """Get the robot's id"""
+        return self._id
+
+    async def async_getinfo(self) -> Dict[str, Any]:
+        """Download the appliance state document"""
+        self._appliance = await self._api.async_get_appliance(self._id)
+        return self._appliance
+
+    async def async_startclean(self) -> None:
+        """Tell the robot to start cleaning"""
+        await self._async_send_clean_command("play")
+
+    async def async_spotclean(self) -> None:
+        """Tell the robot to spot clean"""
+        await self._async_send_clean_command("spot")
+
+    async def async_gohome(self) -> None:
+        """Tell the robot to go home"""
+        await self._async_send_clean_command("home")
+
+    async def async_pauseclean(self) -> None:
+        """Tell the robot to pause cleaning"""
+        await self._async_send_clean_command("pause")
+
+    async def async_stopclean(self) -> None:
+        """Tell the robot to stop cleaning"""
+        await self._async_send_clean_command("stop")
+
+    async def async_setpowermode(self, mode: PowerMode) -> None:
+        """Set the power mode of the robot"""
+        if self._appliance is None:
+            await self.async_getinfo()
+
+        reported = self._appliance["properties"]["reported"]
+
+        if reported.get("powerMode") is not None:
+            await self._api.async_update_appliance(self._id, {"powerMode": mode.value})
+        elif reported.get("ecoMode") is not None:
+            if mode == PowerMode.MEDIUM:
+                await self._api.async_update_appliance(self._id, {"ecoMode": True})
+            elif mode == PowerMode.HIGH:
+                await self._api.async_update_appliance(self._id, {"ecoMode": False})
+            else:
+                raise exception.CommandException(f"Robot does not support \"{mode}\".")
+        else:
+            raise exception.CommandException("Robot does not support setting power mode.")
+
+    async def async_clean_zones(self, map_id: str, zone_ids: List[str]) -> None:
+        """Tell the robot to clean specific zones in a map"""
+        await self._api.async_send_command(self._id, {
+            "CustomPlay": {
+                "PersistentMapId": map_id,
+                "Zones": [{"ZoneId": zone_id} for zone_id in zone_ids]
+            }
+        })
+
+    async def async_get_cleaning_sessions(self) -> List[CleaningSession]:
+        """Download the cleaning history, newest first"""
+        return list(map(cleaning_session_create, await self._api.async_get_history(self._id)))
+
+    async def async_get_maps(self) -> List[Dict[str, Any]]:
+        """Download the interactive maps, including their zones"""
+        return await self._api.async_get_maps(self._id)
+
+    async def _async_send_clean_command(self, command: str) -> None:
+        await self._api.async_send_command(self._id, {"CleaningCommand": command})
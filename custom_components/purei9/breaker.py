@@ -0,0 +1,127 @@
+"""Stop calling the cloud while it is down"""
+import logging
+import random
+import time
+from typing import Any, Callable, Dict
+from . import exception
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Open after this many failed calls in a row
+FAILURE_THRESHOLD = 5
+# Seconds to stay open the first time, doubling each time a probe fails
+OPEN_DURATION_MIN = 30
+OPEN_DURATION_MAX = 900
+# Spread the open duration by this share so that accounts don't probe in lockstep
+JITTER = 0.2
+
+def backoff(attempt: int, minimum: float, maximum: float, rand: Callable[[], float]) -> float:
+    """Exponential backoff with jitter, attempt counting from 0"""
+    delay = min(minimum * 2 ** attempt, maximum)
+    return delay * (1 + JITTER * (2 * rand() - 1))
+
+# pylint: disable=too-many-instance-attributes
+class CircuitBreaker:
+    """
+    Shared by all calls of an account. Opens after repeated failures, rejects
+    calls while open and lets a single probe through when the backoff has passed.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+            self,
+            failure_threshold: int = FAILURE_THRESHOLD,
+            open_duration_min: float = OPEN_DURATION_MIN,
+            open_duration_max: float = OPEN_DURATION_MAX,
+            clock: Callable[[], float] = time.monotonic,
+            rand: Callable[[], float] = random.random
+        ):
+        self._failure_threshold = failure_threshold
+        self._open_duration_min = open_duration_min
+        self._open_duration_max = open_duration_max
+        self._clock = clock
+        self._rand = rand
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """Closed, open or half open"""
+        if self._state == STATE_OPEN and self._clock() >= self._open_until:
+            return STATE_HALF_OPEN
+
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise if the call should not be made"""
+        state = self.state
+
+        if state == STATE_CLOSED:
+            return
+
+        if state == STATE_HALF_OPEN and not self._probing:
+            _LOGGER.debug("Probing the cloud after an outage.")
+            self._state = STATE_HALF_OPEN
+            self._probing = True
+            return
+
+        retry_in = max(0, self._open_until - self._clock())
+
+        raise exception.CloudUnavailableException(
+            f"The cloud is unavailable, retrying in {retry_in:.0f} s."
+        )
+
+    def record_success(self) -> None:
+        """The cloud answered"""
+        if self._state != STATE_CLOSED:
+            _LOGGER.info("The cloud is available again.")
+
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """The cloud did not answer"""
+        self._failures += 1
+
+        # A failed probe opens again right away, for longer than last time
+        if self._probing or (
+                self._state == STATE_CLOSED and self._failures >= self._failure_threshold
+            ):
+            duration = backoff(
+                self._opened,
+                self._open_duration_min,
+                self._open_duration_max,
+                self._rand
+            )
+
+            _LOGGER.warning(
+                "The cloud is unavailable after \"%d\" failed calls, pausing calls for %.0f s.",
+                self._failures,
+                duration
+            )
+
+            self._state = STATE_OPEN
+            self._opened += 1
+            self._open_until = self._clock() + duration
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """The call ended without telling if the cloud is available, let another call probe"""
+        self._probing = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe the breaker for diagnostics"""
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self._opened,
+            "open_for": max(0.0, self._open_until - self._clock()),
+        }
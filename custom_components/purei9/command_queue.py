@@ -0,0 +1,103 @@
+"""Serialize, coalesce and debounce the commands sent to a robot"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Wait this long for more commands before sending anything, in seconds
+COMMAND_DEBOUNCE = 0.3
+
+# Commands of the same kind replace each other while waiting to be sent
+KIND_TRANSITION = "transition"
+KIND_POWER_MODE = "power_mode"
+
+Action = Callable[[], Awaitable[None]]
+
+class CommandQueue:
+    """
+    A queue of commands for one robot, sent by a single worker. Only the last
+    command of each kind is sent, i.e. stop followed by start is one transition.
+    """
+    def __init__(self, hass, debounce: float = COMMAND_DEBOUNCE):
+        self._hass = hass
+        self._debounce = debounce
+        # The last action of each kind, and everyone waiting for it
+        self._pending: Dict[str, Tuple[Action, List[asyncio.Future]]] = {}
+        # The actions being sent, taken from pending
+        self._sending: Dict[str, Tuple[Action, List[asyncio.Future]]] = {}
+        self._worker: asyncio.Task = None
+
+    async def async_enqueue(self, kind: str, action: Action) -> None:
+        """Queue an action and wait until it, or an action that replaced it, has been sent"""
+        future = self._hass.loop.create_future()
+        _, futures = self._pending.get(kind, (None, []))
+
+        if futures:
+            _LOGGER.debug("Coalesced a \"%s\" command with a queued one.", kind)
+
+        # Re-insert so that kinds are sent in the order they were last requested
+        self._pending.pop(kind, None)
+        self._pending[kind] = (action, futures + [future])
+
+        if self._worker is None:
+            self._worker = self._hass.async_create_task(self._async_run())
+
+        await future
+
+    def cancel(self) -> None:
+        """Stop the worker and drop all queued commands"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+        # Callers waiting for a command being sent are released too
+        self._cancel_futures(self._sending)
+        self._cancel_futures(self._pending)
+        self._sending = {}
+        self._pending = {}
+
+    async def _async_run(self) -> None:
+        sending = {}
+
+        try:
+            while self._pending:
+                await asyncio.sleep(self._debounce)
+
+                sending = self._sending = self._pending
+                self._pending = {}
+
+                for action, futures in sending.values():
+                    await self._async_execute(action, futures)
+
+                sending = self._sending = {}
+        finally:
+            # Cancelled while sending, nobody must be left waiting
+            self._cancel_futures(sending)
+
+            # A worker started after cancelling this one is left alone
+            if self._worker is asyncio.current_task():
+                self._worker = None
+                self._sending = {}
+
+    @staticmethod
+    def _cancel_futures(actions: Dict[str, Tuple[Action, List[asyncio.Future]]]) -> None:
+        for _, futures in actions.values():
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+
+    @staticmethod
+    async def _async_execute(action: Action, futures: List[asyncio.Future]) -> None:
+        try:
+            await action()
+        # Anything that goes wrong belongs to the callers waiting for the command
+        # pylint: disable=broad-except
+        except Exception as ex:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ex)
+        else:
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
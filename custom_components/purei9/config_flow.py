@@ -3,10 +3,24 @@ import logging
 from typing import Self
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, CONF_COUNTRY_CODE
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, CONF_COUNTRY_CODE, CONF_TOKEN
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.selector import CountrySelector
 from purei9_unofficial.cloudv3 import CloudClient
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    CONF_BATCHED_POLLING,
+    CONF_PUSH,
+    CONF_BASE_URL,
+    CONF_LOCAL,
+    CONF_LOCAL_PASSWORD,
+    CONF_POLL_INTERVAL_ACTIVE,
+    CONF_POLL_INTERVAL_IDLE,
+    CONF_POLL_INTERVAL_DOCKED,
+    CONF_POLL_INTERVAL_MAX,
+)
+from . import api, scheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,11 +32,20 @@ class HiveOsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Return True if other_flow is matching this flow."""
         return self.VERSION == other_flow.VERSION
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return PureI9OptionsFlow()
 
     async def async_step_user(self, user_input=None):
         errors = {}
 
         if user_input is not None:
+            # Don't log in again for an account that is already configured
+            await self.async_set_unique_id(user_input[CONF_EMAIL].lower())
+            self._abort_if_unique_id_configured()
+
             try:
                 # Validate that the provided credentials are correct
                 email = user_input[CONF_EMAIL]
@@ -32,11 +55,18 @@ class HiveOsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 _LOGGER.info("Config flow setup with country code \"%s\".", countrycode)
 
                 purei9_client = CloudClient(email, password, countrycode=countrycode)
-                await self.hass.async_add_executor_job(purei9_client.tryLogin)
+                session = async_get_clientsession(self.hass)
+                cloud_api = api.CloudApi(session, api.CloudAuth(self.hass, purei9_client, session))
+                await cloud_api.async_get_appliances()
 
+                # Save the token so that setting up the integration does not log in again
                 return self.async_create_entry(
                     title=email,
-                    data=user_input
+                    data={
+                        **user_input,
+                        CONF_TOKEN: purei9_client.gettoken(),
+                        CONF_BASE_URL: purei9_client.baseurl,
+                    }
                 )
             # pylint: disable=broad-except
             except Exception:
@@ -49,3 +79,62 @@ class HiveOsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         })
 
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
+
+class PureI9OptionsFlow(config_entries.OptionsFlow):
+    """Options flow"""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options"""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+
+        schema = vol.Schema({
+            vol.Optional(
+                CONF_BATCHED_POLLING,
+                default=options.get(CONF_BATCHED_POLLING, False)
+            ): bool,
+            vol.Optional(
+                CONF_PUSH,
+                default=options.get(CONF_PUSH, False)
+            ): bool,
+            vol.Optional(
+                CONF_LOCAL,
+                default=options.get(CONF_LOCAL, False)
+            ): bool,
+            vol.Optional(
+                CONF_LOCAL_PASSWORD,
+                default=options.get(CONF_LOCAL_PASSWORD, "")
+            ): str,
+            vol.Optional(
+                CONF_POLL_INTERVAL_ACTIVE,
+                default=options.get(
+                    CONF_POLL_INTERVAL_ACTIVE,
+                    scheduler.DEFAULT_POLL_INTERVAL_ACTIVE
+                )
+            ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+            vol.Optional(
+                CONF_POLL_INTERVAL_IDLE,
+                default=options.get(
+                    CONF_POLL_INTERVAL_IDLE,
+                    scheduler.DEFAULT_POLL_INTERVAL_IDLE
+                )
+            ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+            vol.Optional(
+                CONF_POLL_INTERVAL_DOCKED,
+                default=options.get(
+                    CONF_POLL_INTERVAL_DOCKED,
+                    scheduler.DEFAULT_POLL_INTERVAL_DOCKED
+                )
+            ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+            vol.Optional(
+                CONF_POLL_INTERVAL_MAX,
+                default=options.get(
+                    CONF_POLL_INTERVAL_MAX,
+                    scheduler.DEFAULT_POLL_INTERVAL_MAX
+                )
+            ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+        })
+
+        return self.async_show_form(step_id="init", data_schema=schema)
@@ -4,3 +4,16 @@ COMPONENTS = ["vacuum"]
 MANUFACTURER = "Electrolux"
 MODEL = "Pure i9"
 COORDINATORS = "coordinators"
+ACCOUNT_COORDINATOR = "account_coordinator"
+CONF_BATCHED_POLLING = "batched_polling"
+CONF_POLL_INTERVAL_ACTIVE = "poll_interval_active"
+CONF_POLL_INTERVAL_IDLE = "poll_interval_idle"
+CONF_POLL_INTERVAL_DOCKED = "poll_interval_docked"
+CONF_POLL_INTERVAL_MAX = "poll_interval_max"
+OPTIONS = "options"
+CONF_PUSH = "push"
+CONF_BASE_URL = "base_url"
+CONF_LOCAL = "local"
+CONF_LOCAL_PASSWORD = "local_password"
+VACUUMS = "vacuums"
+SERVICE_BULK_COMMAND = "bulk_command"
@@ -1,83 +1,412 @@
 """Coordinate data updates from Pure i9."""
+import asyncio
 import logging
-from datetime import timedelta
+import time
+from typing import Any, Callable, Dict, List
 from asyncio import timeout
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from purei9_unofficial.cloudv2 import CloudRobot
-from . import purei9
+from datetime import timedelta
+from dataclasses import replace
+from aiohttp import ClientError
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from . import (
+    purei9,
+    api,
+    scheduler,
+    history,
+    maps,
+    command_queue,
+    metrics,
+    exception,
+    metadata,
+    governor,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+METRIC_POLL = "poll"
+METRIC_CONFIRM = "confirm"
+
+# pylint: disable=too-many-instance-attributes
 class PureI9Coordinator(DataUpdateCoordinator):
     """Coordinate data updates from Pure i9."""
 
-    def __init__(self, hass, name, robot: CloudRobot):
+    def __init__(
+            self,
+            hass,
+            config_entry,
+            robot: api.ApiRobot,
+            polling: bool = True
+        ):
+        # When not polling, the data is pushed by the account coordinator
         super().__init__(
             hass,
             _LOGGER,
-            name=name,
-            update_interval=timedelta(minutes=1),
+            config_entry=config_entry,
+            name=robot.getid(),
+            update_interval=(
+                scheduler.poll_interval(None, 0, config_entry.options)
+                if polling
+                else None
+            ),
         )
         self._robot = robot
+        self._options = config_entry.options
+        self._stagger = scheduler.async_get_poll_stagger(hass)
+        self._unregister_stagger = self._stagger.register(self) if polling else lambda: None
+        self._failures = 0
+        self._history = history.CleaningHistory(hass, robot.getid())
+        self._history_fetched = False
+        self._map_cache = maps.MapCache(hass, robot.getid())
+        self._appliance = None
+        self._metadata: metadata.RobotMetadata = None
+        self._polling = polling
+        self._push_connected = False
+        self._commands = command_queue.CommandQueue(hass)
+        self._confirmation: asyncio.Task = None
+        self._metrics = metrics.Metrics()
 
     @property
-    def robot(self) -> str:
+    def robot(self) -> api.ApiRobot:
         """Immutable robot"""
         return self._robot
 
+    @property
+    def metrics(self) -> metrics.Metrics:
+        """Latency and outcome of the polls of this robot"""
+        return self._metrics
+
+    @property
+    def failures(self) -> int:
+        """How many polls in a row that have failed"""
+        return self._failures
+
+    @property
+    def commands(self) -> command_queue.CommandQueue:
+        """The queue that all commands to the robot go through"""
+        return self._commands
+
+    async def async_shutdown(self) -> None:
+        """Drop queued commands when the integration is unloaded"""
+        self._commands.cancel()
+        self._unregister_stagger()
+
+        if self._confirmation is not None:
+            self._confirmation.cancel()
+
+        await super().async_shutdown()
+
+    def async_confirm(self, confirmed: Callable[[purei9.Params], bool]) -> None:
+        """
+        Poll only this robot shortly after a command, with exponential spacing,
+        until the robot reports what the command asked for or the deadline passes.
+        """
+        if self._confirmation is not None:
+            self._confirmation.cancel()
+
+        self._confirmation = self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_confirm(confirmed),
+            f"{self.name} confirm command"
+        )
+
+    async def _async_confirm(self, confirmed: Callable[[purei9.Params], bool]) -> None:
+        for delay in scheduler.confirm_delays():
+            await asyncio.sleep(delay)
+
+            try:
+                async with self._metrics.async_measure(METRIC_CONFIRM), timeout(10):
+                    params = await self.async_update_and_create_params()
+            except (ClientError, TimeoutError, exception.CloudUnavailableException) as ex:
+                _LOGGER.debug("Could not confirm a command for \"%s\": %s", self.name, ex)
+                continue
+
+            self.async_set_updated_data(params)
+
+            if confirmed(params):
+                _LOGGER.debug("Command confirmed for \"%s\".", self.name)
+                return
+
+        _LOGGER.debug("Command not confirmed for \"%s\" before the deadline.", self.name)
+
     async def _async_update_data(self):
         """Fetch data from Pure i9."""
-        async with timeout(10):
-            return await self.hass.async_add_executor_job(
-                self.update_and_create_params
+        # Delay the poll while the cloud is rate limiting, instead of failing it
+        delay = self._robot.api.governor.delay(governor.PRIORITY_POLL)
+
+        if delay > governor.POLL_MAX_WAIT and self.data is not None:
+            _LOGGER.debug("Rate limited, polling \"%s\" in %.0f seconds.", self.name, delay)
+            self._update_poll_interval(self.data, delay)
+            return self.data
+
+        params = self.data
+        self._failures += 1
+
+        try:
+            async with self._stagger.semaphore:
+                async with self._metrics.async_measure(METRIC_POLL), timeout(10):
+                    params = await self.async_update_and_create_params()
+
+            self._failures = 0
+
+            return params
+        except exception.CloudUnavailableException as ex:
+            # Entities keep showing the last known state, marked as stale
+            raise UpdateFailed(str(ex)) from ex
+        finally:
+            # Adapt how often to poll depending on what the robot is doing
+            self._update_poll_interval(params)
+
+    def _update_poll_interval(self, params: purei9.Params, min_delay: float = 0) -> None:
+        if self._polling:
+            # Poll at this robot's own phase of the interval, apart from other robots
+            self.update_interval = max(
+                self._stagger.delay(
+                    self,
+                    scheduler.poll_interval(
+                        params,
+                        self._failures,
+                        self._options,
+                        self._push_connected
+                    ),
+                    time.monotonic()
+                ),
+                timedelta(seconds=min_delay)
             )
 
-    def update_and_create_params(self):
-        """Update and create the latest version of params."""
-        purei9_fan_speed_list = list(map(lambda x: x.name, self._robot.getsupportedpowermodes()))
-        fan_speed_list = purei9.fan_speed_list_to_hass(purei9_fan_speed_list)
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Poll seldom while connected to the appliance event stream"""
+        self._push_connected = connected
+        self._update_poll_interval(self.data)
 
-        params = purei9.Params(self._robot.getid(), self._robot.getname(), fan_speed_list)
+    async def async_handle_delta(self, delta: Dict[str, Any]) -> None:
+        """Apply properties pushed by the appliance event stream"""
+        # Without a full state document to apply it to, wait for the next poll
+        if self._appliance is None:
+            return
 
-        pure_i9_battery = self._robot.getbattery()
+        properties = self._appliance["properties"]
 
-        params.state = purei9.state_to_hass(
-            self._robot.getstatus(), pure_i9_battery)
+        appliance = {
+            **self._appliance,
+            "properties": {
+                **properties,
+                "reported": {**properties["reported"], **delta}
+            }
+        }
 
-        params.fan_speed = purei9.fan_speed_to_hass(
-            params.fan_speed_list, self._robot.getpowermode())
+        self.async_set_updated_data(await self.async_update_and_create_params(appliance))
 
-        params.name = self._robot.getname()
-        params.battery = purei9.battery_to_hass(pure_i9_battery)
-        params.available = self._robot.isconnected()
-        params.firmware = self._robot.getfirmware()
-        params.dustbin = purei9.dustbin_to_hass(self._robot.getdustbinstatus())
+    async def async_update_and_create_params(self, appliance: Dict[str, Any] = None):
+        """Update and create the latest version of params."""
+        if appliance is None or "properties" not in appliance:
+            appliance = await self._robot.async_getinfo()
 
-        params.last_cleaning_session = self.get_last_cleaning_session()
+        self._appliance = appliance
+
+        # Static properties are only parsed again when the firmware changes, or daily
+        reported = appliance["properties"]["reported"]
+        now = time.time()
+
+        if not metadata.metadata_valid(self._metadata, reported, now):
+            self._metadata = metadata.metadata_create(reported, now)
+
+        params = purei9.params_create(
+            self._robot.getid(),
+            appliance,
+            self._metadata.fan_speed_list
+        )
+
+        params = replace(
+            params,
+            last_cleaning_session=await self.async_get_last_cleaning_session(params),
+            maps=await self.async_get_maps(params),
+        )
         _LOGGER.debug("Has last cleaning session? %s", params.last_cleaning_session is not None)
 
-        # Temporarily commented out until we can figure out:
-        # https://github.com/Phype/purei9_unofficial/issues/30
-        #params.maps = list(map(purei9.params_map_create, self._robot.getMaps()))
-        #_LOGGER.debug(
-        #    "Downloaded \"%d\" maps for \"%s\".",
-        #    len(params.maps),
-        #    self._robot.getname()
-        #)
+        return purei9.params_reuse(self.data, params)
+
+    async def async_get_maps(self, params: purei9.Params):
+        """Get the maps, only downloading them when they might have changed"""
+        if not self._map_cache.loaded:
+            await self._map_cache.async_load()
+
+        previous_state = self.data.state if self.data is not None else None
+
+        if maps.should_fetch(previous_state, params.state, self._map_cache.fetched_at, time.time()):
+            try:
+                interactive_maps = await self._robot.async_get_maps()
+            except (ClientError, TimeoutError, exception.CloudUnavailableException) as ex:
+                # Maps are not critical, keep using the cached ones
+                _LOGGER.warning("Could not download maps for \"%s\": %s", params.name, ex)
+            else:
+                has_changed_maps = self._map_cache.update(interactive_maps)
 
-        return params
+                _LOGGER.debug(
+                    "Downloaded \"%d\" maps for \"%s\". Any changed? %s",
+                    len(interactive_maps),
+                    params.name,
+                    has_changed_maps
+                )
 
-    def get_last_cleaning_session(self):
+        return self._map_cache.maps
+
+    async def async_get_last_cleaning_session(self, params: purei9.Params):
         """Get the latest cleaning session"""
-        purei9_cleaning_sessions = self._robot.getCleaningSessions()
-        _LOGGER.debug(
-            "Downloaded \"%d\" cleaning sessions for \"%s\".",
-            len(purei9_cleaning_sessions),
-            self._robot.getname()
+        if not self._history.loaded:
+            await self._history.async_load()
+
+        previous_state = self.data.state if self.data is not None else None
+
+        # The history only changes when a cleaning session has finished
+        if history.should_fetch(previous_state, params.state, self._history_fetched):
+            purei9_cleaning_sessions = await self._robot.async_get_cleaning_sessions()
+            self._history_fetched = True
+
+            has_new_sessions = self._history.merge(purei9_cleaning_sessions)
+
+            _LOGGER.debug(
+                "Downloaded \"%d\" cleaning sessions for \"%s\". Any new? %s",
+                len(purei9_cleaning_sessions),
+                params.name,
+                has_new_sessions
+            )
+
+        return self._history.last
+
+class PureI9AccountCoordinator(DataUpdateCoordinator):
+    """
+    Coordinate data updates for every robot on an account. All appliances are
+    fetched in one batched request and the result is pushed to each robot.
+    """
+
+    def __init__(
+            self,
+            hass,
+            config_entry,
+            cloud_api: api.CloudApi,
+            coordinators: List[PureI9Coordinator]
+        ):
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=config_entry,
+            name=config_entry.title,
+            update_interval=scheduler.poll_interval(None, 0, config_entry.options),
         )
+        self._api = cloud_api
+        self._coordinators = {coord.robot.getid(): coord for coord in coordinators}
+        self._options = config_entry.options
+        self._failures = 0
+        self._push_connected = False
+        self._metrics = metrics.Metrics()
+        self._stagger = scheduler.async_get_poll_stagger(hass)
+        self._unregister_stagger = self._stagger.register(self)
+
+    @property
+    def metrics(self) -> metrics.Metrics:
+        """Latency and outcome of the batched polls"""
+        return self._metrics
 
-        return (
-            purei9_cleaning_sessions[0]
-            if purei9_cleaning_sessions
-            else None
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Poll seldom while connected to the appliance event stream"""
+        self._push_connected = connected
+        self._update_poll_interval(self.data or {})
+
+    async def async_shutdown(self) -> None:
+        """Stop taking part in the staggering when the integration is unloaded"""
+        self._unregister_stagger()
+        await super().async_shutdown()
+
+    def _update_poll_interval(self, data: Dict[str, purei9.Params], min_delay: float = 0) -> None:
+        # Poll as often as the most active robot requires
+        interval = min(
+            (
+                scheduler.poll_interval(
+                    params,
+                    self._failures,
+                    self._options,
+                    self._push_connected
+                )
+                for params in data.values()
+            ),
+            default=scheduler.poll_interval(
+                None,
+                self._failures,
+                self._options,
+                self._push_connected
+            )
         )
+
+        self.update_interval = max(
+            self._stagger.delay(self, interval, time.monotonic()),
+            timedelta(seconds=min_delay)
+        )
+
+    async def _async_update_data(self):
+        """Fetch data for all robots from Pure i9."""
+        # Delay the poll while the cloud is rate limiting, instead of failing it
+        delay = self._api.governor.delay(governor.PRIORITY_POLL)
+
+        if delay > governor.POLL_MAX_WAIT and self.data is not None:
+            _LOGGER.debug("Rate limited, polling \"%s\" in %.0f seconds.", self.name, delay)
+            self._update_poll_interval(self.data, delay)
+            return self.data
+
+        data = self.data or {}
+        self._failures += 1
+
+        try:
+            async with self._stagger.semaphore:
+                async with self._metrics.async_measure(METRIC_POLL), timeout(10):
+                    data = await self.async_update_and_create_params()
+
+            self._failures = 0
+        except exception.CloudUnavailableException as ex:
+            # Entities keep showing the last known state, marked as stale
+            self._async_set_robots_failed()
+            raise UpdateFailed(str(ex)) from ex
+        except Exception:
+            self._async_set_robots_failed()
+            raise
+        finally:
+            self._update_poll_interval(data)
+
+            # Every robot was polled by this batch
+            stats = self._metrics.stats(METRIC_POLL)
+
+            if stats.last_latency is not None:
+                for coord in self._coordinators.values():
+                    coord.metrics.record(METRIC_POLL, stats.last_latency, stats.last_outcome)
+
+        for robot_id, params in data.items():
+            self._coordinators[robot_id].async_set_updated_data(params)
+
+        return data
+
+    def _async_set_robots_failed(self) -> None:
+        # The robots don't poll on their own, so they only know of failures from here
+        for coord in self._coordinators.values():
+            coord.last_update_success = False
+            coord.async_update_listeners()
+
+    async def async_update_and_create_params(self) -> Dict[str, purei9.Params]:
+        """Update and create the latest version of params for all robots."""
+        appliances = {
+            appliance["applianceId"]: appliance
+            for appliance in await self._api.async_get_appliances()
+        }
+
+        _LOGGER.debug("Downloaded \"%d\" appliances in one batch.", len(appliances))
+
+        robot_ids = list(self._coordinators)
+
+        params = await asyncio.gather(
+            *[
+                self._coordinators[robot_id].async_update_and_create_params(
+                    appliances.get(robot_id)
+                )
+                for robot_id in robot_ids
+            ]
+        )
+
+        return dict(zip(robot_ids, params))
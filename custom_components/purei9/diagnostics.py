@@ -0,0 +1,49 @@
+"""Diagnostics download with timing of cloud calls and polls"""
+from typing import Any, Dict
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, CONF_TOKEN
+from . import const, pool
+
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, CONF_TOKEN, const.CONF_LOCAL_PASSWORD}
+
+async def async_get_config_entry_diagnostics(hass, config_entry) -> Dict[str, Any]:
+    """Describe how the integration is talking to the cloud"""
+    data = hass.data[const.DOMAIN][config_entry.entry_id]
+    coords = data[const.COORDINATORS]
+    account_coord = data[const.ACCOUNT_COORDINATOR]
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(config_entry.data), TO_REDACT),
+            "options": async_redact_data(dict(config_entry.options), TO_REDACT),
+        },
+        "cloud_calls": coords[0].robot.api.metrics.as_dict() if coords else {},
+        "circuit_breaker": coords[0].robot.api.breaker.as_dict() if coords else None,
+        "rate_limit": coords[0].robot.api.governor.as_dict() if coords else None,
+        "robot_pool": pool.async_get_robot_pool(hass).as_dict(),
+        "lanes": (
+            {name: lane.as_dict() for name, lane in coords[0].robot.api.lanes.items()}
+            if coords
+            else {}
+        ),
+        "account": (
+            {
+                "update_interval": str(account_coord.update_interval),
+                "last_update_success": account_coord.last_update_success,
+                "metrics": account_coord.metrics.as_dict(),
+            }
+            if account_coord is not None
+            else None
+        ),
+        "robots": {
+            coord.robot.getid(): {
+                "update_interval": (
+                    str(coord.update_interval) if coord.update_interval is not None else None
+                ),
+                "last_update_success": coord.last_update_success,
+                "failures": coord.failures,
+                "metrics": coord.metrics.as_dict(),
+            }
+            for coord in coords
+        },
+    }
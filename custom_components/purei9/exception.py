@@ -12,3 +12,9 @@ class CommandParamException(PureI9Exception):
         super().__init__()
         self.param_name = param_name
         self.param_type = param_type
+
+class CloudUnavailableException(PureI9Exception):
+    """Exception indicating that calls to the cloud are paused during an outage"""
+
+class LocalCommandException(PureI9Exception):
+    """Exception indicating that a command may have reached the robot on the local network"""
@@ -0,0 +1,168 @@
+"""Keep the requests of an account within the rate limits of the cloud"""
+import asyncio
+import email.utils
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from . import exception
+
+PRIORITY_COMMAND = "command"
+PRIORITY_POLL = "poll"
+
+# Requests per second, on average, and how many can be sent in a burst
+RATE = 5
+BURST = 30
+# Polls leave this many requests in the bucket for commands
+COMMAND_RESERVE = 5
+# Commands fail instead of waiting longer than this many seconds
+COMMAND_MAX_WAIT = 10
+# Polls are skipped, instead of waiting, when they would wait longer than this many seconds
+POLL_MAX_WAIT = 5
+# Seconds to back off after HTTP 429 without a Retry-After header
+RETRY_AFTER_DEFAULT = 30
+# Never trust a Retry-After longer than this many seconds
+RETRY_AFTER_MAX = 900
+
+def parse_retry_after(value: Optional[str], now: float) -> Optional[float]:
+    """
+    Parse a Retry-After header, which is either seconds or an HTTP date,
+    into seconds from now
+    """
+    if not value:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - now
+        except (TypeError, ValueError):
+            return None
+
+    return min(max(seconds, 0), RETRY_AFTER_MAX)
+
+def parse_quota(headers: Mapping[str, str], now: float) -> Optional[Tuple[int, float]]:
+    """
+    Parse the remaining requests and the seconds until the quota resets
+    from the X-RateLimit or RateLimit headers, if the cloud sends them
+    """
+    for prefix in ("X-RateLimit-", "RateLimit-"):
+        remaining = headers.get(prefix + "Remaining")
+
+        if remaining is None:
+            continue
+
+        try:
+            reset = float(headers.get(prefix + "Reset") or 0)
+            remaining = int(remaining)
+        except ValueError:
+            return None
+
+        # The reset is either seconds from now or a point in time
+        if reset > now / 2:
+            reset -= now
+
+        return remaining, min(max(reset, 0), RETRY_AFTER_MAX)
+
+    return None
+
+# pylint: disable=too-many-instance-attributes
+class Governor:
+    """
+    A token bucket that every request to the cloud passes through. Commands
+    go before polls and polls never empty the bucket. When the cloud says
+    that it is rate limiting, all requests are held back until it allows more.
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+            self,
+            rate: float = RATE,
+            burst: int = BURST,
+            reserve: int = COMMAND_RESERVE,
+            clock: Callable[[], float] = time.monotonic,
+            wall_clock: Callable[[], float] = time.time
+        ):
+        self._rate = rate
+        self._burst = burst
+        self._reserve = reserve
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._waiting = {PRIORITY_COMMAND: 0, PRIORITY_POLL: 0}
+        self._throttled = 0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def delay(self, priority: str) -> float:
+        """Seconds until a request of the priority may be sent"""
+        self._refill()
+
+        # Polls wait for commands, and leave tokens for commands that arrive later
+        needed = 1 if priority == PRIORITY_COMMAND else self._reserve + 1
+        delay = max(0.0, (needed - self._tokens) / self._rate)
+
+        if priority == PRIORITY_POLL and self._waiting[PRIORITY_COMMAND] > 0:
+            delay = max(delay, 1 / self._rate)
+
+        return max(delay, self._paused_until - self._clock())
+
+    async def async_acquire(self, priority: str) -> None:
+        """Wait until a request of the priority may be sent"""
+        self._waiting[priority] += 1
+
+        try:
+            while (delay := self.delay(priority)) > 0:
+                if priority == PRIORITY_COMMAND and delay > COMMAND_MAX_WAIT:
+                    raise exception.CloudUnavailableException(
+                        f"The cloud is rate limiting requests, try again in {delay:.0f} seconds."
+                    )
+
+                await asyncio.sleep(delay)
+        finally:
+            self._waiting[priority] -= 1
+
+        self.take()
+
+    def take(self) -> None:
+        """Count a request that is sent right away, such as a retry"""
+        self._refill()
+        self._tokens -= 1
+
+    def record_response(self, status: int, headers: Mapping[str, str]) -> None:
+        """Learn the limits of the cloud from a response"""
+        quota = parse_quota(headers, self._wall_clock())
+
+        if quota is not None:
+            remaining, reset = quota
+
+            # Never send more than the cloud has said that it will accept
+            self._refill()
+            self._tokens = min(self._tokens, remaining)
+
+            if remaining <= 0:
+                self._pause(reset)
+
+        if status == 429:
+            self._throttled += 1
+            retry_after = parse_retry_after(headers.get("Retry-After"), self._wall_clock())
+            self._pause(RETRY_AFTER_DEFAULT if retry_after is None else retry_after)
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summarize the headroom for diagnostics"""
+        self._refill()
+
+        return {
+            "rate": self._rate,
+            "burst": self._burst,
+            "tokens": round(self._tokens, 1),
+            "paused_for": round(max(0.0, self._paused_until - self._clock()), 1),
+            "waiting": dict(self._waiting),
+            "throttled": self._throttled,
+        }
@@ -0,0 +1,112 @@
+"""Cleaning session history kept in a local store"""
+import datetime
+import logging
+from typing import Any, Dict, List, Optional
+from homeassistant.components.vacuum import VacuumActivity
+from homeassistant.helpers.storage import Store
+from purei9_unofficial.common import CleaningSession
+from . import const
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+# Do not keep the whole history of old robots
+MAX_SESSIONS = 50
+
+# A cleaning session is running while the robot is in any of these states
+CLEANING_STATES = [VacuumActivity.CLEANING, VacuumActivity.PAUSED, VacuumActivity.RETURNING]
+
+def should_fetch(
+        previous_state: Optional[VacuumActivity],
+        state: VacuumActivity,
+        fetched: bool
+    ) -> bool:
+    """
+    Only download the history once after startup, or when the robot has
+    finished cleaning since the last poll.
+    """
+    if not fetched:
+        return True
+
+    return previous_state in CLEANING_STATES and state not in CLEANING_STATES
+
+def merge_sessions(
+        known: List[CleaningSession],
+        downloaded: List[CleaningSession],
+        limit: int = MAX_SESSIONS
+    ) -> List[CleaningSession]:
+    """Add the downloaded sessions newer than the newest known session, newest first"""
+    newest = known[0].endtime if known else None
+
+    new_sessions = [
+        session for session in downloaded
+        if newest is None or session.endtime > newest
+    ]
+
+    new_sessions.sort(key=lambda session: session.endtime, reverse=True)
+
+    return (new_sessions + known)[:limit]
+
+def session_to_dict(session: CleaningSession) -> Dict[str, Any]:
+    """Serialize a cleaning session"""
+    return {
+        "endtime": session.endtime.isoformat(),
+        "duration": session.duration,
+        "cleandearea": session.cleandearea,
+    }
+
+def session_from_dict(data: Dict[str, Any]) -> CleaningSession:
+    """Deserialize a cleaning session"""
+    return CleaningSession(
+        endtime=datetime.datetime.fromisoformat(data["endtime"]),
+        duration=data["duration"],
+        cleandearea=data["cleandearea"],
+    )
+
+class CleaningHistory:
+    """The cleaning history of a robot, persisted between restarts"""
+    def __init__(self, hass, robot_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{const.DOMAIN}.{robot_id}.history")
+        self._sessions: List[CleaningSession] = None
+
+    @property
+    def loaded(self) -> bool:
+        """If the history has been read from the store"""
+        return self._sessions is not None
+
+    @property
+    def last(self) -> Optional[CleaningSession]:
+        """The latest cleaning session"""
+        return self._sessions[0] if self._sessions else None
+
+    async def async_load(self) -> None:
+        """Read the history from the store"""
+        data = await self._store.async_load()
+
+        self._sessions = (
+            [session_from_dict(session) for session in data["sessions"]]
+            if data is not None
+            else []
+        )
+
+    def merge(self, downloaded: List[CleaningSession]) -> bool:
+        """Merge newly downloaded sessions and return if any of them were new"""
+        known_last = self.last
+
+        self._sessions = merge_sessions(self._sessions, downloaded)
+
+        if self.last is known_last:
+            return False
+
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+        return True
+
+    async def async_remove(self) -> None:
+        """Remove the stored history"""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {"sessions": [session_to_dict(session) for session in self._sessions]}
@@ -0,0 +1,128 @@
+"""Separate lanes for polls and commands, and a dedicated executor for blocking work"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from . import const, metrics
+
+LANE_POLL = "poll"
+LANE_COMMAND = "command"
+
+# Bounds of how many requests a lane lets through at the same time
+LANE_LIMIT_MIN = 2
+LANE_LIMIT_MAX = 16
+
+# Logging in is the only blocking work, it does not need more threads than this
+EXECUTOR_WORKERS = 2
+# Robots on the local network get their own threads, so that they never hold up logging in
+LOCAL_EXECUTOR_WORKERS = 4
+
+DATA_EXECUTOR = f"{const.DOMAIN}_executor"
+DATA_LOCAL_EXECUTOR = f"{const.DOMAIN}_local_executor"
+
+def lane_limit(robot_count: int) -> int:
+    """How many requests a lane lets through, sized from the number of robots"""
+    return max(LANE_LIMIT_MIN, min(robot_count, LANE_LIMIT_MAX))
+
+class Lane:
+    """Lets a limited number of requests through, first come first served"""
+    def __init__(self, name: str, limit: int = LANE_LIMIT_MIN):
+        self.name = name
+        self._limit = limit
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._max_depth = 0
+        self._wait = metrics.CallStats()
+
+    @property
+    def depth(self) -> int:
+        """How many requests are waiting"""
+        return len(self._waiters)
+
+    def resize(self, limit: int) -> None:
+        """Change how many requests are let through"""
+        self._limit = limit
+        self._wake()
+
+    @asynccontextmanager
+    async def async_acquire(self) -> AsyncIterator[None]:
+        """Wait for a free slot in the lane and hold it"""
+        start = time.monotonic()
+
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._max_depth = max(self._max_depth, len(self._waiters))
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Give the slot back if it was handed over just before cancelling
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+                raise
+
+        self._wait.record(time.monotonic() - start, metrics.OUTCOME_SUCCESS)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe the lane for diagnostics"""
+        return {
+            "limit": self._limit,
+            "in_flight": self._in_flight,
+            "depth": self.depth,
+            "max_depth": self._max_depth,
+            "wait": self._wait.as_dict(),
+        }
+
+def _async_get_executor(hass, key: str, workers: int, name: str) -> ThreadPoolExecutor:
+    if key not in hass.data:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+        hass.data[key] = executor
+        hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP,
+            lambda _event: executor.shutdown(wait=False)
+        )
+
+    return hass.data[key]
+
+def async_get_executor(hass) -> ThreadPoolExecutor:
+    """
+    Get the executor for blocking work, shared by all config entries, so that
+    a slow cloud never ties up the threads of other integrations.
+    """
+    return _async_get_executor(hass, DATA_EXECUTOR, EXECUTOR_WORKERS, const.DOMAIN)
+
+def async_get_local_executor(hass) -> ThreadPoolExecutor:
+    """Get the executor for talking to robots on the local network"""
+    return _async_get_executor(
+        hass,
+        DATA_LOCAL_EXECUTOR,
+        LOCAL_EXECUTOR_WORKERS,
+        f"{const.DOMAIN}_local"
+    )
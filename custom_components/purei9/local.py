@@ -0,0 +1,447 @@
+"""Talk to robots directly on the local network, falling back to the cloud"""
+import asyncio
+import logging
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from purei9_unofficial.common import DustbinStates, PowerMode
+from purei9_unofficial.local import RobotClient, find_robots
+from purei9_unofficial.message import BinaryMessage
+from . import exception, lanes
+from .api import ApiRobot, CloudApi
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to wait for the robot before falling back to the cloud
+LOCAL_TIMEOUT = 5
+# Seconds to use only the cloud after the robot could not be reached locally
+LOCAL_RETRY_AFTER = 300
+# Seconds to wait for robots to answer the broadcast
+DISCOVERY_TIMEOUT = 1
+
+class TimeoutRobotClient(RobotClient):
+    """
+    The client of the library, except that every read and write on the
+    socket times out, and that disconnecting closes the socket
+    """
+    def __init__(self, address: str, timeout: float):
+        super().__init__(address)
+        self._timeout = timeout
+        self._socket: Optional[ssl.SSLSocket] = None
+
+    def _connect(self, localpw, version):
+        # Same as the library, which connects without a timeout
+        tcp_socket = socket.create_connection((self.addr, self.port), timeout=self._timeout)
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+
+        try:
+            self._socket = ctx.wrap_socket(tcp_socket)
+        except Exception:
+            tcp_socket.close()
+            raise
+
+        self.stream = self._socket.makefile("rwb")
+        pkt = self.sendrecv(BinaryMessage.Text(BinaryMessage.MSG_HELLO, "purei9-cli", version))
+
+        if pkt.user1 != version:
+            # The library connects again with the version of the robot
+            self.disconnect()
+            return False, pkt.user1
+
+        self.robot_id = pkt.parsed
+
+        if localpw is not None:
+            pkt = self.sendrecv(BinaryMessage.Text(BinaryMessage.MSG_LOGIN, localpw))
+
+            if pkt.user1 != 1:
+                raise PermissionError("The robot refused the local password.")
+
+            self.sendrecv(BinaryMessage.HeaderOnly(BinaryMessage.MSG_PING))
+
+        return True, version
+
+    def abort(self) -> None:
+        """
+        End the session with the robot without waiting. A call that is waiting
+        for the robot in another thread fails right away and disconnects.
+        """
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def disconnect(self) -> None:
+        try:
+            if self.stream is not None:
+                self.stream.close()
+        finally:
+            self.stream = None
+
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+class LocalCall:
+    """A call in the executor, which the caller may give up on while it's running"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._abandoned = False
+        self._sent = False
+
+    def send(self) -> None:
+        """Mark the request as sent to the robot, unless the caller has given up. Blocking."""
+        with self._lock:
+            if self._abandoned:
+                raise TimeoutError("Gave up on the robot before sending the request.")
+
+            self._sent = True
+
+    def abandon(self) -> bool:
+        """Give up on the call and return if the request may have reached the robot"""
+        with self._lock:
+            self._abandoned = True
+            return self._sent
+
+def read_static(client: RobotClient) -> Dict[str, Any]:
+    """Read the properties that don't change while connected. Blocking."""
+    return {
+        "applianceName": client.getname(),
+        "capabilities": client.getcapabilities()["Capabilities"],
+        "firmwareVersion": client.getfirmware(),
+    }
+
+def read_dynamic(client: RobotClient, capabilities) -> Dict[str, Any]:
+    """Read the properties that change while the robot is used. Blocking."""
+    reported = {
+        "robotStatus": client.getstatus().value,
+        "batteryStatus": client.getbattery().value,
+    }
+
+    # Robots without power levels don't answer with a power mode
+    if "PowerLevels" in capabilities:
+        reported["powerMode"] = client.getpowermode().value
+
+    return reported
+
+def find_robot_addresses(names: Dict[str, str]) -> Dict[str, str]:
+    """
+    Find robots on the local network, by robot id. Robots are matched on their
+    id, or on their name when the robot reports a different id locally. Blocking.
+    """
+    ids_by_name = {name: robot_id for robot_id, name in names.items()}
+    addresses = {}
+
+    for found in find_robots(DISCOVERY_TIMEOUT):
+        robot_id = found.id if found.id in names else ids_by_name.get(found.name)
+
+        if robot_id is not None:
+            addresses[robot_id] = found.address
+
+    return addresses
+
+# pylint: disable=too-many-instance-attributes
+class LocalRobot:
+    """A robot reached on the local network, one conversation at a time"""
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+            self,
+            hass,
+            robot_id: str,
+            address: str,
+            password: str,
+            port: Optional[int] = None
+        ):
+        self._hass = hass
+        self._id = robot_id
+        self._address = address
+        self._password = password
+        self._port = port
+        self._client: Optional[TimeoutRobotClient] = None
+        self._static: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def address(self) -> str:
+        """Where the robot is on the local network"""
+        return self._address
+
+    async def async_call(self, func: Callable[[RobotClient], Any]) -> Any:
+        """
+        Call the robot in the executor, connecting first if needed. Raises
+        LocalCommandException if the call failed after the request was sent.
+        """
+        call = LocalCall()
+
+        async with self._lock:
+            try:
+                async with asyncio.timeout(LOCAL_TIMEOUT):
+                    return await self._hass.loop.run_in_executor(
+                        lanes.async_get_local_executor(self._hass),
+                        self._call,
+                        func,
+                        call
+                    )
+            except Exception as ex:
+                if isinstance(ex, TimeoutError):
+                    # Wake up the blocked call so that it closes its connection. A call
+                    # that is still connecting closes it when it sees that it was abandoned.
+                    client, self._client = self._client, None
+
+                    if client is not None:
+                        client.abort()
+
+                if call.abandon():
+                    raise exception.LocalCommandException(
+                        f"The robot may have received the request before failing: {ex}"
+                    ) from ex
+
+                raise
+
+    def _call(self, func: Callable[[RobotClient], Any], call: LocalCall) -> Any:
+        client = self._client
+
+        try:
+            if client is None:
+                # Set first so that the connection is closed if the robot refuses the password
+                client = self._client = TimeoutRobotClient(self._address, LOCAL_TIMEOUT)
+
+                if self._port is not None:
+                    client.port = self._port
+
+                client.connect(self._password)
+                self._static = read_static(client)
+
+            call.send()
+
+            return func(client)
+        except Exception:
+            self._disconnect(client)
+            raise
+
+    def _disconnect(self, client: Optional[RobotClient]) -> None:
+        if self._client is client:
+            self._client = None
+
+        if client is not None:
+            try:
+                client.disconnect()
+            except OSError:
+                pass
+
+    async def async_close(self) -> None:
+        """Close the connection to the robot"""
+        async with self._lock:
+            await self._hass.loop.run_in_executor(
+                lanes.async_get_local_executor(self._hass),
+                self._disconnect,
+                self._client
+            )
+
+    async def async_getinfo(self) -> Dict[str, Any]:
+        """
+        Read a state document in the same shape as the cloud. The dustbin is
+        not reported locally.
+        """
+        dynamic = await self.async_call(
+            lambda client: read_dynamic(client, self._static["capabilities"])
+        )
+
+        return {
+            "applianceId": self._id,
+            "connectionState": "Connected",
+            "properties": {"reported": {**self._static, **dynamic}},
+        }
+
+    async def async_startclean(self) -> None:
+        """Tell the robot to start cleaning"""
+        await self.async_call(lambda client: client.startclean())
+
+    async def async_spotclean(self) -> None:
+        """Tell the robot to clean the spot around it"""
+        await self.async_call(lambda client: client.spotclean())
+
+    async def async_gohome(self) -> None:
+        """Tell the robot to return to the dock"""
+        await self.async_call(lambda client: client.gohome())
+
+    async def async_pauseclean(self) -> None:
+        """Tell the robot to pause"""
+        await self.async_call(lambda client: client.pauseclean())
+
+    async def async_stopclean(self) -> None:
+        """Tell the robot to stop"""
+        await self.async_call(lambda client: client.stopclean())
+
+    async def async_setpowermode(self, mode: PowerMode) -> None:
+        """Set the power mode of the robot"""
+        await self.async_call(lambda client: client.setpowermode(mode))
+
+class LocalFirstRobot:
+    """
+    Same interface as ApiRobot. Reads and commands go to the robot on the local
+    network when one has been found, falling back to the cloud if it can't be
+    reached. Maps, zones and the cleaning history are only in the cloud.
+    """
+    def __init__(self, cloud: ApiRobot):
+        self._cloud = cloud
+        self._local: Optional[LocalRobot] = None
+        self._local_failed_at: Optional[float] = None
+        # Fills in what the robot does not report locally
+        self._cloud_appliance: Optional[Dict[str, Any]] = None
+
+    @property
+    def api(self) -> CloudApi:
+        """Immutable API"""
+        return self._cloud.api
+
+    @property
+    def local(self) -> Optional[LocalRobot]:
+        """The robot on the local network, if found"""
+        return self._local
+
+    def attach_local(self, local: LocalRobot) -> None:
+        """Start talking to the robot on the local network"""
+        self._local = local
+        self._local_failed_at = None
+
+    def getid(self) -> str:
+        """Get the robot's id"""
+        return self._cloud.getid()
+
+    async def async_close(self) -> None:
+        """Close the connection to the robot on the local network, if any"""
+        if self._local is not None:
+            await self._local.async_close()
+
+    def _local_available(self) -> bool:
+        return self._local is not None and (
+            self._local_failed_at is None
+            or time.monotonic() - self._local_failed_at >= LOCAL_RETRY_AFTER
+        )
+
+    def _local_failed(self, ex: Exception) -> None:
+        _LOGGER.warning(
+            "Could not reach \"%s\" at \"%s\", using the cloud: %s",
+            self.getid(),
+            self._local.address,
+            ex
+        )
+        self._local_failed_at = time.monotonic()
+
+    async def _async_local_first(self, name: str, *args, resend: bool = False):
+        if self._local_available():
+            try:
+                result = await getattr(self._local, name)(*args)
+                self._local_failed_at = None
+                return result
+            except exception.LocalCommandException as ex:
+                self._local_failed(ex)
+
+                # Sending the command again could undo it, like a pause that toggles
+                if not resend:
+                    raise
+            # The library raises plain exceptions for protocol errors
+            # pylint: disable=broad-except
+            except Exception as ex:
+                self._local_failed(ex)
+
+        return await getattr(self._cloud, name)(*args)
+
+    async def async_getinfo(self) -> Dict[str, Any]:
+        """Read the appliance state document, from the robot if possible"""
+        if self._local_available():
+            try:
+                appliance = await self._local.async_getinfo()
+                self._local_failed_at = None
+            # pylint: disable=broad-except
+            except Exception as ex:
+                self._local_failed(ex)
+            else:
+                # Keep what only the cloud knows, like the dustbin
+                cloud_reported = (
+                    self._cloud_appliance["properties"]["reported"]
+                    if self._cloud_appliance is not None
+                    else {"dustbinStatus": DustbinStates.unset.name}
+                )
+
+                return {
+                    **appliance,
+                    "properties": {
+                        "reported": {**cloud_reported, **appliance["properties"]["reported"]}
+                    },
+                }
+
+        self._cloud_appliance = await self._cloud.async_getinfo()
+
+        return self._cloud_appliance
+
+    async def async_startclean(self) -> None:
+        """Tell the robot to start cleaning"""
+        await self._async_local_first("async_startclean")
+
+    async def async_spotclean(self) -> None:
+        """Tell the robot to clean the spot around it"""
+        await self._async_local_first("async_spotclean")
+
+    async def async_gohome(self) -> None:
+        """Tell the robot to return to the dock"""
+        await self._async_local_first("async_gohome")
+
+    async def async_pauseclean(self) -> None:
+        """Tell the robot to pause"""
+        await self._async_local_first("async_pauseclean")
+
+    async def async_stopclean(self) -> None:
+        """Tell the robot to stop"""
+        await self._async_local_first("async_stopclean")
+
+    async def async_setpowermode(self, mode: PowerMode) -> None:
+        """Set the power mode of the robot"""
+        await self._async_local_first("async_setpowermode", mode, resend=True)
+
+    async def async_clean_zones(self, map_id: str, zone_ids: List[str]) -> None:
+        """Tell the robot to clean zones, only possible through the cloud"""
+        await self._cloud.async_clean_zones(map_id, zone_ids)
+
+    async def async_get_cleaning_sessions(self):
+        """Get the cleaning history from the cloud"""
+        return await self._cloud.async_get_cleaning_sessions()
+
+    async def async_get_maps(self) -> List[Dict[str, Any]]:
+        """Get the interactive maps from the cloud"""
+        return await self._cloud.async_get_maps()
+
+async def async_discover(
+        hass,
+        robots: List[LocalFirstRobot],
+        names: Dict[str, str],
+        password: str
+    ) -> None:
+    """Find the robots on the local network and start talking to them directly"""
+    try:
+        addresses = await hass.loop.run_in_executor(
+            lanes.async_get_local_executor(hass),
+            find_robot_addresses,
+            names
+        )
+    except OSError as ex:
+        _LOGGER.warning("Could not search for robots on the local network: %s", ex)
+        return
+
+    for robot in robots:
+        address = addresses.get(robot.getid())
+
+        if address is None:
+            _LOGGER.info(
+                "Did not find \"%s\" on the local network, using the cloud.",
+                robot.getid()
+            )
+            continue
+
+        _LOGGER.info("Found \"%s\" on the local network at \"%s\".", robot.getid(), address)
+        robot.attach_local(LocalRobot(hass, robot.getid(), address, password))
@@ -0,0 +1,111 @@
+"""Maps and zones kept in a local cache"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from homeassistant.components.vacuum import VacuumActivity
+from homeassistant.helpers.storage import Store
+from . import const, purei9, history
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+# Download the maps at least this often, in seconds
+MAPS_MAX_AGE = 24 * 60 * 60
+
+def should_fetch(
+        previous_state: Optional[VacuumActivity],
+        state: VacuumActivity,
+        fetched_at: Optional[float],
+        now: float
+    ) -> bool:
+    """
+    Maps only change when the robot has been cleaning, so only download them
+    once after startup, when the robot has finished cleaning, or once a day.
+    """
+    if fetched_at is None or now - fetched_at > MAPS_MAX_AGE:
+        return True
+
+    return previous_state in history.CLEANING_STATES and state not in history.CLEANING_STATES
+
+def map_revision(interactive_map: Dict[str, Any]) -> Tuple[str, Any]:
+    """Identify a version of a map"""
+    return (interactive_map["id"], interactive_map.get("sequenceNumber"))
+
+class MapCache:
+    """The parsed maps of a robot, keyed on map id and revision, persisted between restarts"""
+    def __init__(self, hass, robot_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{const.DOMAIN}.{robot_id}.maps")
+        # Parsed maps by map id, together with the revision they were parsed from
+        self._entries: Dict[str, Tuple[Any, purei9.ParamsMap]] = None
+        self._maps: Tuple[purei9.ParamsMap, ...] = ()
+        self._fetched_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        """If the maps have been read from the store"""
+        return self._entries is not None
+
+    @property
+    def maps(self) -> Tuple[purei9.ParamsMap, ...]:
+        """The parsed maps. The same tuple is returned until a map changes."""
+        return self._maps
+
+    @property
+    def fetched_at(self) -> Optional[float]:
+        """When the maps were last downloaded, if ever since startup"""
+        return self._fetched_at
+
+    async def async_load(self) -> None:
+        """Read the maps from the store"""
+        data = await self._store.async_load()
+
+        self._entries = (
+            {entry["map"]["id"]: (entry["revision"], entry["map"]) for entry in data["maps"]}
+            if data is not None
+            else {}
+        )
+
+        self._maps = tuple(params_map for _, params_map in self._entries.values())
+
+    def update(self, interactive_maps: List[Dict[str, Any]]) -> bool:
+        """Update with downloaded maps and return if any map has changed"""
+        self._fetched_at = time.time()
+
+        entries = {}
+
+        for interactive_map in interactive_maps:
+            map_id, revision = map_revision(interactive_map)
+            entry = self._entries.get(map_id)
+
+            # Only parse maps that have changed since last time
+            if entry is None or revision is None or entry[0] != revision:
+                parsed = (revision, purei9.params_map_create(interactive_map))
+                # Maps without a revision can only be compared on their content
+                entry = entry if entry == parsed else parsed
+
+            entries[map_id] = entry
+
+        if entries == self._entries:
+            return False
+
+        _LOGGER.debug("Maps have changed, \"%d\" maps in total.", len(entries))
+
+        self._entries = entries
+        self._maps = tuple(params_map for _, params_map in entries.values())
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+        return True
+
+    async def async_remove(self) -> None:
+        """Remove the stored maps"""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {
+            "maps": [
+                {"revision": revision, "map": params_map}
+                for revision, params_map in self._entries.values()
+            ]
+        }
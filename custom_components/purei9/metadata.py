@@ -0,0 +1,71 @@
+"""Cache for robot properties that almost never change"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from homeassistant.helpers.storage import Store
+from . import const, purei9
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+# Parse static properties again at least this often, in seconds
+METADATA_MAX_AGE = 24 * 60 * 60
+
+@dataclass(frozen=True, slots=True)
+class RobotMetadata:
+    """Static properties of a robot, parsed once per firmware version"""
+    firmware: Optional[str]
+    fan_speed_list: Tuple[str, ...]
+    parsed_at: float
+
+def metadata_create(reported: Dict[str, Any], now: float) -> RobotMetadata:
+    """Parse the static properties from the reported properties"""
+    return RobotMetadata(
+        reported.get("firmwareVersion"),
+        tuple(purei9.fan_speed_list_create(reported["capabilities"])),
+        now,
+    )
+
+def metadata_valid(metadata: Optional[RobotMetadata], reported: Dict[str, Any], now: float) -> bool:
+    """If the cached properties still apply, i.e. the firmware is the same and they are fresh"""
+    return (
+        metadata is not None
+        and metadata.firmware == reported.get("firmwareVersion")
+        and now - metadata.parsed_at < METADATA_MAX_AGE
+    )
+
+class DeviceTypeCache:
+    """The device type of every appliance on an account, so discovery skips known appliances"""
+    def __init__(self, hass, entry_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{const.DOMAIN}.{entry_id}.device_types")
+        self._device_types: Dict[str, Dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Read the device types from the store"""
+        data = await self._store.async_load()
+        self._device_types = data["device_types"] if data is not None else {}
+
+    @property
+    def appliance_ids(self) -> List[str]:
+        """Every appliance seen on the account"""
+        return list(self._device_types)
+
+    def get(self, appliance_id: str, now: float) -> Optional[str]:
+        """Get the device type of an appliance, if known and fresh"""
+        entry = self._device_types.get(appliance_id)
+
+        if entry is None or now - entry["fetched_at"] >= METADATA_MAX_AGE:
+            return None
+
+        return entry["device_type"]
+
+    def set(self, appliance_id: str, device_type: str, now: float) -> None:
+        """Remember the device type of an appliance"""
+        self._device_types[appliance_id] = {"device_type": device_type, "fetched_at": now}
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the stored device types"""
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {"device_types": self._device_types}
@@ -0,0 +1,113 @@
+"""Timing and outcome counters for cloud calls and polls"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_FAILURE = "failure"
+OUTCOME_TIMEOUT = "timeout"
+
+# pylint: disable=too-many-instance-attributes
+class CallStats:
+    """Latency histogram and outcome counters of one kind of call"""
+    def __init__(self):
+        # The last bucket counts everything slower than the largest bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency: Optional[float] = None
+        self.last_outcome: Optional[str] = None
+
+    @property
+    def count(self) -> int:
+        """How many calls have been made"""
+        return self.successes + self.failures + self.timeouts
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        """The share of calls that failed or timed out, if any calls have been made"""
+        if self.count == 0:
+            return None
+
+        return (self.failures + self.timeouts) / self.count
+
+    def record(self, latency: float, outcome: str) -> None:
+        """Record a finished call"""
+        bucket = next(
+            (i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound),
+            len(LATENCY_BUCKETS)
+        )
+
+        self.buckets[bucket] += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_latency = latency
+        self.last_outcome = outcome
+
+        if outcome == OUTCOME_SUCCESS:
+            self.successes += 1
+        elif outcome == OUTCOME_TIMEOUT:
+            self.timeouts += 1
+        else:
+            self.failures += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe the stats for diagnostics"""
+        return {
+            "count": self.count,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "error_rate": self.error_rate,
+            "last_latency": self.last_latency,
+            "last_outcome": self.last_outcome,
+            "mean_latency": self.total_latency / self.count if self.count > 0 else None,
+            "max_latency": self.max_latency,
+            "histogram": {
+                **{f"<={bound}": n for bound, n in zip(LATENCY_BUCKETS, self.buckets)},
+                f">{LATENCY_BUCKETS[-1]}": self.buckets[-1],
+            },
+        }
+
+class Metrics:
+    """Stats for every kind of call, by name"""
+    def __init__(self):
+        self._stats: Dict[str, CallStats] = {}
+
+    def stats(self, name: str) -> CallStats:
+        """Get the stats of a kind of call"""
+        if name not in self._stats:
+            self._stats[name] = CallStats()
+
+        return self._stats[name]
+
+    def record(self, name: str, latency: float, outcome: str) -> None:
+        """Record a finished call"""
+        self.stats(name).record(latency, outcome)
+
+    @asynccontextmanager
+    async def async_measure(self, name: str) -> AsyncIterator[None]:
+        """Time the enclosed call and record its outcome"""
+        start = time.monotonic()
+        outcome = OUTCOME_FAILURE
+
+        try:
+            yield
+            outcome = OUTCOME_SUCCESS
+        # Calls are mostly cancelled by the timeout of the poll around them
+        except (TimeoutError, asyncio.CancelledError):
+            outcome = OUTCOME_TIMEOUT
+            raise
+        finally:
+            self.record(name, time.monotonic() - start, outcome)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe all stats for diagnostics"""
+        return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
@@ -0,0 +1,60 @@
+"""Robots shared by all config entries"""
+import logging
+from typing import Any, Dict, Iterable, List
+from . import const
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_ROBOT_POOL = f"{const.DOMAIN}_robot_pool"
+
+class RobotPool:
+    """
+    A robot seen by several accounts is only set up by the first config entry
+    that claims it. Every account has its own cloud client, since an account
+    can only be added once.
+    """
+    def __init__(self):
+        # Robot owners by robot id
+        self._owners: Dict[str, str] = {}
+
+    def release(self, entry_id: str) -> None:
+        """Stop using the robots of a config entry"""
+        for robot_id in [r for r, owner in self._owners.items() if owner == entry_id]:
+            del self._owners[robot_id]
+
+    def unclaimed(self, entry_id: str, robot_ids: Iterable[str]) -> List[str]:
+        """The robots that no other config entry has claimed"""
+        return [
+            robot_id for robot_id in robot_ids
+            if self._owners.get(robot_id, entry_id) == entry_id
+        ]
+
+    def claim_robots(self, entry_id: str, robot_ids: Iterable[str]) -> List[str]:
+        """Claim robots for a config entry and return those it may set up"""
+        robot_ids = list(robot_ids)
+        claimed = self.unclaimed(entry_id, robot_ids)
+
+        for robot_id in set(robot_ids) - set(claimed):
+            _LOGGER.info(
+                "Robot \"%s\" is already set up by another account, skipping it.",
+                robot_id
+            )
+
+        for robot_id in claimed:
+            self._owners[robot_id] = entry_id
+
+        return claimed
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summarize the pool for diagnostics"""
+        return {
+            "robots": len(self._owners),
+            "config_entries": len(set(self._owners.values())),
+        }
+
+def async_get_robot_pool(hass) -> RobotPool:
+    """Get the pool shared by all config entries"""
+    if DATA_ROBOT_POOL not in hass.data:
+        hass.data[DATA_ROBOT_POOL] = RobotPool()
+
+    return hass.data[DATA_ROBOT_POOL]
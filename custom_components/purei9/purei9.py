@@ -1,5 +1,6 @@
 """Pure i9 business logic"""
-from typing import List, TypedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypedDict
+from dataclasses import dataclass, replace
 from enum import Enum
 from purei9_unofficial.common import (
     BatteryStatus,
@@ -8,7 +9,6 @@ from purei9_unofficial.common import (
     DustbinStates,
     CleaningSession,
 )
-from purei9_unofficial.cloudv3 import CloudZone, CloudMap
 from homeassistant.components.vacuum import VacuumActivity
 from . import const
 
@@ -75,11 +75,11 @@ class ParamsZone(TypedDict):
     id: str
     name: str
 
-def params_zone_create(cloud_zone: CloudZone) -> ParamsZone:
-    """Create a map zone from a CloudZone"""
+def params_zone_create(zone: Dict[str, Any]) -> ParamsZone:
+    """Create a map zone from a zone in the interactive maps"""
     return {
-        "id": cloud_zone.id,
-        "name": cloud_zone.name
+        "id": zone["id"],
+        "name": zone["name"]
     }
 
 class ParamsMap(TypedDict):
@@ -88,17 +88,21 @@ class ParamsMap(TypedDict):
     name: str
     zones: List[ParamsZone]
 
-def params_map_create(cloud_map: CloudMap) -> ParamsMap:
-    """Create a map zone from a CloudRobot"""
+def params_map_create(interactive_map: Dict[str, Any]) -> ParamsMap:
+    """Create a map from an interactive map"""
     return {
-        "id": cloud_map.id,
-        "name": cloud_map.name,
-        "zones": list(map(params_zone_create, cloud_map.zones))
+        "id": interactive_map["id"],
+        "name": interactive_map.get("name"),
+        "zones": list(map(params_zone_create, interactive_map.get("zones") or []))
     }
 
 # pylint: disable=too-many-instance-attributes
+@dataclass(frozen=True, slots=True)
 class Params:
-    """Data available in the state"""
+    """Immutable snapshot of the data available in the state"""
+    unique_id: str
+    name: str
+    fan_speed_list: Tuple[str, ...]
     battery: int = 100
     state: VacuumActivity = VacuumActivity.IDLE
     available: bool = True
@@ -106,22 +110,36 @@ class Params:
     fan_speed: str = POWER_MODE_POWER
     dustbin: Dustbin = Dustbin.CONNECTED
     last_cleaning_session: CleaningSession = None
-    maps: List[ParamsMap] = []
+    maps: Tuple[ParamsMap, ...] = ()
+
+    def fingerprint(self, fields: Iterable[str]) -> Tuple:
+        """A cheap value to compare what has changed between two versions of params"""
+        return tuple(getattr(self, field) for field in fields)
+
+def params_changed(previous: Params, params: Params, fields: Iterable[str]) -> bool:
+    """If any of the fields differ between two versions of params"""
+    return params is not previous and params.fingerprint(fields) != previous.fingerprint(fields)
 
-    def __init__(self, unique_id: str, name: str, fan_speed_list: List[str]):
-        self._unique_id = unique_id
-        self.name = name
-        self._fan_speed_list = fan_speed_list
+def params_reuse(previous: Optional[Params], params: Params) -> Params:
+    """
+    Share unchanged parts with the previous version of params. Comparing
+    shared parts is then an identity check, and nothing needs to be copied.
+    """
+    if previous is None:
+        return params
 
-    @property
-    def unique_id(self) -> str:
-        """Immutable unique identifier"""
-        return self._unique_id
+    if previous == params:
+        return previous
 
-    @property
-    def fan_speed_list(self) -> str:
-        """Immutable fan speed list"""
-        return self._fan_speed_list
+    return replace(
+        params,
+        fan_speed_list=(
+            previous.fan_speed_list
+            if previous.fan_speed_list == params.fan_speed_list
+            else params.fan_speed_list
+        ),
+        maps=previous.maps if previous.maps == params.maps else params.maps,
+    )
 
 def is_power_mode_v2(fan_speed_list: List[str]) -> bool:
     """Determine if the robot supports the new or old fan speed list """
@@ -157,6 +175,18 @@ def fan_speed_to_hass(fan_speed_list: List[str], fan_speed_purei9: PowerMode) ->
 
     return POWER_MODE_POWER
 
+def dustbin_from_reported(dustbin: str) -> DustbinStates:
+    """Parse the dustbin status reported by the appliance"""
+    try:
+        return DustbinStates[dustbin]
+    except KeyError:
+        # The API sometimes returns "notConnected" instead of "empty"
+        # See: https://github.com/Phype/purei9_unofficial/issues/16
+        if dustbin == "notConnected":
+            return DustbinStates.empty
+
+        return DustbinStates.unset
+
 def dustbin_to_hass(dustbin: DustbinStates) -> Dustbin:
     """Conver the Pure i9 dustbin into an internal representation"""
     if dustbin == DustbinStates.unset:
@@ -170,6 +200,60 @@ def dustbin_to_hass(dustbin: DustbinStates) -> Dustbin:
 
     return Dustbin.FULL
 
+def supported_power_modes(capabilities: Dict[str, Any]) -> List[PowerMode]:
+    """Determine the supported power modes from the appliance capabilities"""
+    if "PowerLevels" in capabilities:
+        return list([PowerMode.LOW, PowerMode.MEDIUM, PowerMode.HIGH])
+
+    if "EcoMode" in capabilities:
+        return list([PowerMode.MEDIUM, PowerMode.HIGH])
+
+    return list([PowerMode.MEDIUM])
+
+def power_mode_from_reported(reported: Dict[str, Any]) -> PowerMode:
+    """Parse the power mode reported by the appliance"""
+    if reported.get("powerMode") is not None:
+        return PowerMode(reported["powerMode"])
+
+    if reported.get("ecoMode") is not None:
+        return PowerMode.MEDIUM if reported["ecoMode"] else PowerMode.HIGH
+
+    return PowerMode.MEDIUM
+
+def fan_speed_list_create(capabilities: Dict[str, Any]) -> List[str]:
+    """Create the fan speed list from the appliance capabilities"""
+    return fan_speed_list_to_hass(
+        [mode.name for mode in supported_power_modes(capabilities)]
+    )
+
+def params_create(
+        unique_id: str,
+        appliance: Dict[str, Any],
+        fan_speed_list: Tuple[str, ...] = None
+    ) -> Params:
+    """
+    Create params from a single snapshot of the appliance state document. The
+    fan speed list can be passed when it is already known.
+    """
+    reported = appliance["properties"]["reported"]
+
+    if fan_speed_list is None:
+        fan_speed_list = tuple(fan_speed_list_create(reported["capabilities"]))
+
+    pure_i9_battery = BatteryStatus(reported["batteryStatus"])
+
+    return Params(
+        unique_id,
+        reported["applianceName"],
+        fan_speed_list,
+        state=state_to_hass(RobotStates(reported["robotStatus"]), pure_i9_battery),
+        fan_speed=fan_speed_to_hass(fan_speed_list, power_mode_from_reported(reported)),
+        battery=battery_to_hass(pure_i9_battery),
+        available=appliance["connectionState"] == "Connected",
+        firmware=reported["firmwareVersion"],
+        dustbin=dustbin_to_hass(dustbin_from_reported(reported["dustbinStatus"])),
+    )
+
 def create_device_attrs(params: Params):
     """Return information for the device registry"""
     # See: https://developers.home-assistant.io/docs/device_registry_index/
@@ -0,0 +1,125 @@
+"""Decide how often to poll a robot"""
+import asyncio
+from datetime import timedelta
+from typing import Any, Callable, Iterator, List, Mapping
+from homeassistant.components.vacuum import VacuumActivity
+from . import const, purei9
+
+DEFAULT_POLL_INTERVAL_ACTIVE = 15
+DEFAULT_POLL_INTERVAL_IDLE = 60
+DEFAULT_POLL_INTERVAL_DOCKED = 600
+DEFAULT_POLL_INTERVAL_MAX = 1800
+
+# While updates are pushed, polling is only a slow reconciliation fallback
+POLL_INTERVAL_PUSH = 900
+
+# After a command, poll the robot with exponential spacing until it confirms
+CONFIRM_DELAY_FIRST = 2
+CONFIRM_DEADLINE = 60
+
+# At most this many polls are in flight at the same time, for all accounts
+MAX_CONCURRENT_POLLS = 8
+# Never schedule a poll sooner than this many seconds
+MIN_POLL_DELAY = 1
+
+DATA_POLL_STAGGER = f"{const.DOMAIN}_poll_stagger"
+
+ACTIVE_STATES = [VacuumActivity.CLEANING, VacuumActivity.RETURNING]
+
+def poll_interval(
+        params: purei9.Params,
+        failures: int,
+        options: Mapping[str, Any],
+        push: bool = False
+    ) -> timedelta:
+    """
+    Poll often while the robot is moving, seldom while it's docked and
+    fully charged, and back off exponentially after failed polls.
+    """
+    if push:
+        return timedelta(seconds=POLL_INTERVAL_PUSH)
+
+    interval_max = options.get(const.CONF_POLL_INTERVAL_MAX, DEFAULT_POLL_INTERVAL_MAX)
+
+    if params is None:
+        seconds = options.get(const.CONF_POLL_INTERVAL_IDLE, DEFAULT_POLL_INTERVAL_IDLE)
+    elif params.state in ACTIVE_STATES:
+        seconds = options.get(const.CONF_POLL_INTERVAL_ACTIVE, DEFAULT_POLL_INTERVAL_ACTIVE)
+    elif params.state == VacuumActivity.DOCKED and params.battery == 100:
+        seconds = options.get(const.CONF_POLL_INTERVAL_DOCKED, DEFAULT_POLL_INTERVAL_DOCKED)
+    else:
+        seconds = options.get(const.CONF_POLL_INTERVAL_IDLE, DEFAULT_POLL_INTERVAL_IDLE)
+
+    if failures > 0:
+        seconds = max(seconds, min(seconds * 2 ** failures, interval_max))
+
+    return timedelta(seconds=seconds)
+
+def confirm_delays(
+        first: float = CONFIRM_DELAY_FIRST,
+        deadline: float = CONFIRM_DEADLINE
+    ) -> Iterator[float]:
+    """Delays between confirmation polls, doubling until the deadline is reached"""
+    delay = first
+    elapsed = 0
+
+    while elapsed + delay <= deadline:
+        yield delay
+        elapsed += delay
+        delay *= 2
+
+def staggered_delay(interval: float, phase: float, now: float) -> float:
+    """
+    Seconds until the next poll when polls happen at a fixed phase of the
+    interval, i.e. at phase * interval, interval + phase * interval and so on.
+    """
+    delay = (phase * interval - now) % interval
+
+    if delay < MIN_POLL_DELAY:
+        delay += interval
+
+    return delay
+
+class PollStagger:
+    """
+    Spreads the polls of all coordinators, of all config entries, evenly over
+    their interval and limits how many polls are in flight at the same time.
+    """
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_POLLS):
+        self._pollers: List[Any] = []
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Hold while polling"""
+        return self._semaphore
+
+    def register(self, poller: Any) -> Callable[[], None]:
+        """Take part in the staggering, returns a function that stops taking part"""
+        self._pollers.append(poller)
+
+        def unregister() -> None:
+            if poller in self._pollers:
+                self._pollers.remove(poller)
+
+        return unregister
+
+    def phase(self, poller: Any) -> float:
+        """Where in the interval the poller should poll, between 0 and 1"""
+        if poller not in self._pollers:
+            return 0.0
+
+        return self._pollers.index(poller) / len(self._pollers)
+
+    def delay(self, poller: Any, interval: timedelta, now: float) -> timedelta:
+        """Time until the next poll of the poller"""
+        return timedelta(
+            seconds=staggered_delay(interval.total_seconds(), self.phase(poller), now)
+        )
+
+def async_get_poll_stagger(hass) -> PollStagger:
+    """Get the stagger shared by all config entries"""
+    if DATA_POLL_STAGGER not in hass.data:
+        hass.data[DATA_POLL_STAGGER] = PollStagger()
+
+    return hass.data[DATA_POLL_STAGGER]
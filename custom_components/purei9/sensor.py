@@ -2,8 +2,9 @@
 from datetime import timedelta
 import logging
 from homeassistant.components.sensor import (SensorEntity, SensorDeviceClass)
+from homeassistant.const import EntityCategory
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from . import purei9, const
+from . import purei9, const, coordinator as purei9_coordinator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,10 +35,21 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
             PureI9Battery(coord, coord.data)
         )
 
+        entities.append(
+            PureI9PollLatency(coord, coord.data)
+        )
+
+        entities.append(
+            PureI9PollErrorRate(coord, coord.data)
+        )
+
     async_add_entities(entities)
 
 class PureI9Sensor(CoordinatorEntity, SensorEntity):
     """Base class for Pure i9 sensor"""
+    # The fields of params that the sensor displays
+    _params_fields = ("name",)
+
     def __init__(
             self,
             coordinator,
@@ -45,22 +57,51 @@ class PureI9Sensor(CoordinatorEntity, SensorEntity):
         ):
         super().__init__(coordinator)
         self._params = params
+        self._last_update_success = coordinator.last_update_success
 
     @property
     def device_info(self):
         """Return information for the device registry"""
         return purei9.create_device_attrs(self._params)
 
+    @property
+    def available(self) -> bool:
+        """Keep showing the last known state when the cloud can't be reached"""
+        return self._params is not None
+
+    @property
+    def extra_state_attributes(self):
+        """If the state is the last known one, because the last update failed"""
+        return {"stale": not self._last_update_success}
+
     def _handle_coordinator_update(self):
         """
         Called by Home Assistant asking the vacuum to update to the latest state.
         Can contain IO code.
         """
-        self._params = self.coordinator.data
-        self.async_write_ha_state()
+        # Only write the state when something that the sensor displays has changed
+        if self._update_from_coordinator():
+            self.async_write_ha_state()
+
+    def _update_from_coordinator(self) -> bool:
+        """Take the latest params and return if anything that is displayed changed"""
+        params = self.coordinator.data
+        last_update_success = self.coordinator.last_update_success
+
+        changed = (
+            last_update_success != self._last_update_success
+            or purei9.params_changed(self._params, params, self._params_fields)
+        )
+
+        self._params = params
+        self._last_update_success = last_update_success
+
+        return changed
 
 class PureI9LastCleaningStart(PureI9Sensor):
     """The main Pure i9 last cleaning start sensor entity"""
+    _params_fields = ("name", "last_cleaning_session")
+
     @property
     def unique_id(self) -> str:
         """Unique identifier to the entity"""
@@ -87,6 +128,8 @@ class PureI9LastCleaningStart(PureI9Sensor):
 
 class PureI9LastCleaningStop(PureI9Sensor):
     """The main Pure i9 last cleaning stop sensor entity"""
+    _params_fields = ("name", "last_cleaning_session")
+
     @property
     def unique_id(self) -> str:
         """Unique identifier to the entity"""
@@ -112,6 +155,8 @@ class PureI9LastCleaningStop(PureI9Sensor):
 
 class PureI9LastCleaningDuration(PureI9Sensor):
     """The main Pure i9 last cleaning duration sensor entity"""
+    _params_fields = ("name", "last_cleaning_session")
+
     @property
     def unique_id(self) -> str:
         """Unique identifier to the entity"""
@@ -141,6 +186,8 @@ class PureI9LastCleaningDuration(PureI9Sensor):
 
 class PureI9Dustbin(PureI9Sensor):
     """The main Pure i9 dustin status"""
+    _params_fields = ("name", "dustbin")
+
     @property
     def unique_id(self) -> str:
         """Unique identifier to the entity"""
@@ -168,6 +215,8 @@ class PureI9Dustbin(PureI9Sensor):
 
 class PureI9Battery(PureI9Sensor):
     """The main Pure i9 battery level"""
+    _params_fields = ("name", "battery")
+
     @property
     def unique_id(self) -> str:
         """Unique identifier to the entity"""
@@ -191,3 +240,82 @@ class PureI9Battery(PureI9Sensor):
     @property
     def native_unit_of_measurement(self):
         return "%"
+
+class PureI9DiagnosticSensor(PureI9Sensor):
+    """Base class for sensors that describe how well the cloud is responding"""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+            self,
+            coordinator,
+            params: purei9.Params,
+        ):
+        super().__init__(coordinator, params)
+        self._last_value = self.native_value
+
+    @property
+    def _poll_stats(self):
+        return self.coordinator.metrics.stats(purei9_coordinator.METRIC_POLL)
+
+    def _update_from_coordinator(self) -> bool:
+        """The measured value changes with every poll, not only when params do"""
+        changed = super()._update_from_coordinator()
+        value = self.native_value
+
+        if value != self._last_value:
+            self._last_value = value
+            changed = True
+
+        return changed
+
+class PureI9PollLatency(PureI9DiagnosticSensor):
+    """How long the last update from the cloud took"""
+
+    @property
+    def unique_id(self) -> str:
+        """Unique identifier to the entity"""
+        return f"{self._params.unique_id}_poll_latency"
+
+    @property
+    def name(self):
+        """The sensor name"""
+        return f"{self._params.name} poll latency"
+
+    @property
+    def device_class(self):
+        """The device class of the entity"""
+        return SensorDeviceClass.DURATION
+
+    @property
+    def native_unit_of_measurement(self):
+        return "ms"
+
+    @property
+    def native_value(self):
+        """The latency of the last poll"""
+        latency = self._poll_stats.last_latency
+        return round(latency * 1000) if latency is not None else None
+
+class PureI9PollErrorRate(PureI9DiagnosticSensor):
+    """The share of updates from the cloud that have failed"""
+
+    @property
+    def unique_id(self) -> str:
+        """Unique identifier to the entity"""
+        return f"{self._params.unique_id}_poll_error_rate"
+
+    @property
+    def name(self):
+        """The sensor name"""
+        return f"{self._params.name} poll error rate"
+
+    @property
+    def native_unit_of_measurement(self):
+        return "%"
+
+    @property
+    def native_value(self):
+        """The share of failed polls since startup"""
+        error_rate = self._poll_stats.error_rate
+        return round(error_rate * 100, 1) if error_rate is not None else None
@@ -0,0 +1,131 @@
+"""Services that act on several robots at once"""
+import asyncio
+import logging
+from typing import Any, Dict, List
+import voluptuous as vol
+from aiohttp import ClientError
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from . import const, exception, vacuum_command
+
+_LOGGER = logging.getLogger(__name__)
+
+# Send at most this many commands to the cloud at the same time
+BULK_CONCURRENCY = 4
+
+ATTR_ACTION = "action"
+ATTR_FAN_SPEED = "fan_speed"
+ATTR_MAP = "map"
+ATTR_ZONES = "zones"
+
+ACTION_START = "start"
+ACTION_PAUSE = "pause"
+ACTION_STOP = "stop"
+ACTION_RETURN_TO_BASE = "return_to_base"
+ACTION_SET_FAN_SPEED = "set_fan_speed"
+ACTION_CLEAN_ZONES = vacuum_command.COMMAND_CLEAN_ZONES
+
+BULK_COMMAND_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Required(ATTR_ACTION): vol.In([
+        ACTION_START,
+        ACTION_PAUSE,
+        ACTION_STOP,
+        ACTION_RETURN_TO_BASE,
+        ACTION_SET_FAN_SPEED,
+        ACTION_CLEAN_ZONES,
+    ]),
+    vol.Optional(ATTR_FAN_SPEED): cv.string,
+    vol.Optional(ATTR_MAP): cv.string,
+    vol.Optional(ATTR_ZONES): vol.All(cv.ensure_list, [cv.string]),
+})
+
+def async_setup_services(hass) -> None:
+    """Register the integration services"""
+    async def async_bulk_command(call: ServiceCall) -> ServiceResponse:
+        return await async_handle_bulk_command(hass, call.data)
+
+    hass.services.async_register(
+        const.DOMAIN,
+        const.SERVICE_BULK_COMMAND,
+        async_bulk_command,
+        schema=BULK_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL
+    )
+
+def find_vacuums(hass, entity_ids: List[str]) -> Dict[str, Any]:
+    """Find the vacuum entities of all config entries, by entity id"""
+    vacuums = {
+        vacuum.entity_id: vacuum
+        for data in hass.data.get(const.DOMAIN, {}).values()
+        for vacuum in data.get(const.VACUUMS, [])
+    }
+
+    unknown = [entity_id for entity_id in entity_ids if entity_id not in vacuums]
+
+    if unknown:
+        raise ServiceValidationError(f"Unknown Pure i9 vacuums: {', '.join(unknown)}")
+
+    return {entity_id: vacuums[entity_id] for entity_id in entity_ids}
+
+def validate_fan_speed(vacuums: Dict[str, Any], fan_speed: str) -> None:
+    """Reject a fan speed that any of the vacuums does not have, before sending anything"""
+    unsupported = [
+        entity_id for entity_id, vacuum in vacuums.items()
+        if fan_speed not in vacuum.fan_speed_list
+    ]
+
+    if unsupported:
+        raise ServiceValidationError(
+            f"Fan speed \"{fan_speed}\" is not supported by: {', '.join(unsupported)}"
+        )
+
+async def async_execute(vacuum, data: Dict[str, Any]) -> None:
+    """Execute an action on one vacuum"""
+    action = data[ATTR_ACTION]
+
+    if action == ACTION_START:
+        await vacuum.async_start()
+    elif action == ACTION_PAUSE:
+        await vacuum.async_pause()
+    elif action == ACTION_STOP:
+        await vacuum.async_stop()
+    elif action == ACTION_RETURN_TO_BASE:
+        await vacuum.async_return_to_base()
+    elif action == ACTION_SET_FAN_SPEED:
+        if ATTR_FAN_SPEED not in data:
+            raise exception.CommandParamException(ATTR_FAN_SPEED, "string")
+
+        await vacuum.async_set_fan_speed(data[ATTR_FAN_SPEED])
+    elif action == ACTION_CLEAN_ZONES:
+        await vacuum.async_execute_command(
+            action,
+            {key: data[key] for key in (ATTR_MAP, ATTR_ZONES) if key in data}
+        )
+
+async def async_handle_bulk_command(hass, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Send the same action to several robots concurrently and report the result of each"""
+    vacuums = find_vacuums(hass, data[ATTR_ENTITY_ID])
+
+    if data[ATTR_ACTION] == ACTION_SET_FAN_SPEED and ATTR_FAN_SPEED in data:
+        validate_fan_speed(vacuums, data[ATTR_FAN_SPEED])
+
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def async_execute_one(vacuum) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                await async_execute(vacuum, data)
+            except exception.CommandParamException as ex:
+                return {"success": False, "error": f"Missing parameter \"{ex.param_name}\""}
+            except (exception.PureI9Exception, HomeAssistantError, ClientError, TimeoutError) as ex:
+                _LOGGER.warning("Bulk command failed for \"%s\": %s", vacuum.entity_id, ex)
+                return {"success": False, "error": str(ex) or type(ex).__name__}
+
+        return {"success": True}
+
+    results = await asyncio.gather(*[async_execute_one(vacuum) for vacuum in vacuums.values()])
+
+    return {"results": dict(zip(vacuums, results))}
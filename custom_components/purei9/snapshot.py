@@ -0,0 +1,99 @@
+"""Last known state of the robots, persisted between restarts"""
+from typing import Any, Callable, Dict, List
+from homeassistant.components.vacuum import VacuumActivity
+from homeassistant.helpers.storage import Store
+from . import const, purei9, history
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30
+
+def params_to_dict(params: purei9.Params) -> Dict[str, Any]:
+    """Serialize params"""
+    return {
+        "unique_id": params.unique_id,
+        "name": params.name,
+        "fan_speed_list": params.fan_speed_list,
+        "battery": params.battery,
+        "state": params.state.value,
+        "available": params.available,
+        "firmware": params.firmware,
+        "fan_speed": params.fan_speed,
+        "dustbin": params.dustbin.name,
+        "last_cleaning_session": (
+            history.session_to_dict(params.last_cleaning_session)
+            if params.last_cleaning_session is not None
+            else None
+        ),
+        "maps": params.maps,
+    }
+
+def params_from_dict(data: Dict[str, Any]) -> purei9.Params:
+    """Deserialize params"""
+    return purei9.Params(
+        data["unique_id"],
+        data["name"],
+        tuple(data["fan_speed_list"]),
+        battery=data["battery"],
+        state=VacuumActivity(data["state"]),
+        available=data["available"],
+        firmware=data["firmware"],
+        fan_speed=data["fan_speed"],
+        dustbin=purei9.Dustbin[data["dustbin"]],
+        last_cleaning_session=(
+            history.session_from_dict(data["last_cleaning_session"])
+            if data["last_cleaning_session"] is not None
+            else None
+        ),
+        maps=tuple(data["maps"]),
+    )
+
+class SnapshotStore:
+    """The last known params of every robot in a config entry"""
+    def __init__(self, hass, entry_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{const.DOMAIN}.{entry_id}.snapshot")
+        self._coordinators = []
+
+    async def async_load(self) -> Dict[str, purei9.Params]:
+        """Read the last known params, by robot id"""
+        data = await self._store.async_load()
+
+        if data is None:
+            return {}
+
+        return {
+            robot["unique_id"]: params_from_dict(robot)
+            for robot in data["robots"]
+        }
+
+    def async_track(self, coordinators: List) -> Callable[[], None]:
+        """Save the params of the coordinators whenever they change. Returns a function to stop."""
+        self._coordinators = coordinators
+
+        unsubscribes = [
+            coord.async_add_listener(self._async_schedule_save)
+            for coord in coordinators
+        ]
+
+        def unsubscribe() -> None:
+            for unsub in unsubscribes:
+                unsub()
+
+        return unsubscribe
+
+    def _async_schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {
+            "robots": [
+                params_to_dict(coord.data)
+                for coord in self._coordinators
+                if coord.data is not None
+            ]
+        }
+
+    async def async_remove(self) -> None:
+        """Forget the last known state"""
+        # A save that is scheduled later must not bring back the robots
+        self._coordinators = []
+        await self._store.async_remove()
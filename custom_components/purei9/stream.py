@@ -0,0 +1,111 @@
+"""Push updates from the Electrolux appliance event stream"""
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from aiohttp import ClientError, ClientSession, WSMsgType
+
+_LOGGER = logging.getLogger(__name__)
+
+HEARTBEAT = 30
+RECONNECT_DELAY_MIN = 5
+RECONNECT_DELAY_MAX = 600
+
+def websocket_url(base_url: str) -> str:
+    """
+    Get the websocket URL for a regional base URL, i.e.
+    https://api.eu.ocp.electrolux.one becomes wss://ws.eu.ocp.electrolux.one
+    """
+    return base_url.replace("https://api.", "wss://ws.", 1)
+
+def parse_message(message: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parse a stream message into changed reported properties, by appliance id"""
+    appliances = (message.get("Payload") or {}).get("Appliances") or []
+
+    return [
+        (
+            appliance["ApplianceId"],
+            {metric["Name"]: metric["Value"] for metric in appliance.get("Metrics") or []}
+        )
+        for appliance in appliances
+        if "ApplianceId" in appliance and appliance.get("Metrics")
+    ]
+
+# pylint: disable=too-few-public-methods
+class ApplianceStream:
+    """A long-lived connection to the appliance event stream"""
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+            self,
+            session: ClientSession,
+            auth,
+            url: str,
+            appliance_ids: List[str],
+            on_delta: Callable[[str, Dict[str, Any]], Awaitable[None]],
+            on_connection: Callable[[bool], None]
+        ):
+        self._session = session
+        self._auth = auth
+        self._url = url
+        self._appliance_ids = appliance_ids
+        self._on_delta = on_delta
+        self._on_connection = on_connection
+
+    async def async_run(self) -> None:
+        """Listen to the stream until cancelled, reconnecting when the connection is lost"""
+        delay = RECONNECT_DELAY_MIN
+
+        while True:
+            try:
+                await self._async_listen()
+                delay = RECONNECT_DELAY_MIN
+            except (ClientError, TimeoutError) as ex:
+                _LOGGER.warning("Lost the appliance event stream: %s", ex)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+            # A failed login or token refresh must not end the stream for good
+            # pylint: disable=broad-except
+            except Exception as ex:
+                _LOGGER.warning("Could not connect to the appliance event stream: %s", ex)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+            finally:
+                # Polls speed up again while disconnected
+                self._on_connection(False)
+
+            await asyncio.sleep(delay)
+
+    async def _async_listen(self) -> None:
+        headers = {
+            **await self._auth.async_get_headers(),
+            "appliances": json.dumps(
+                [{"applianceId": appliance_id} for appliance_id in self._appliance_ids]
+            ),
+            "version": "2",
+        }
+
+        async with self._session.ws_connect(
+            self._url,
+            headers=headers,
+            heartbeat=HEARTBEAT
+        ) as websocket:
+            self._on_connection(True)
+
+            async for message in websocket:
+                if message.type == WSMsgType.TEXT:
+                    await self._async_handle(message.data)
+
+    async def _async_handle(self, data: str) -> None:
+        # A bad message is skipped, only a lost connection reconnects
+        try:
+            deltas = parse_message(json.loads(data))
+        except (ValueError, TypeError, KeyError, AttributeError) as ex:
+            _LOGGER.warning("Skipping a malformed message from the appliance event stream: %s", ex)
+            return
+
+        for appliance_id, delta in deltas:
+            _LOGGER.debug("Pushed \"%s\" for \"%s\".", delta, appliance_id)
+
+            try:
+                await self._on_delta(appliance_id, delta)
+            # pylint: disable=broad-except
+            except Exception:
+                _LOGGER.exception("Could not apply \"%s\" pushed for \"%s\".", delta, appliance_id)
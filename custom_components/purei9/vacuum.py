@@ -1,6 +1,8 @@
 """Home Assistant vacuum entity"""
-from typing import List, Optional, Any, Mapping, Dict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Any, Mapping, Dict
 import logging
+import time
 import voluptuous as vol
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.components.vacuum import (
@@ -9,10 +11,20 @@ from homeassistant.components.vacuum import (
     VacuumActivity,
     VacuumEntityFeature
 )
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.const import CONF_PASSWORD, CONF_EMAIL, CONF_COUNTRY_CODE
-from purei9_unofficial.cloudv3 import CloudRobot
-from . import purei9, const, vacuum_command, exception, utility
+from . import (
+    purei9,
+    const,
+    vacuum_command,
+    exception,
+    utility,
+    api,
+    zones,
+    command_queue,
+    scheduler,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,22 +38,51 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     """Initial setup for the workers. Download and identify all workers."""
     data = hass.data[const.DOMAIN][config_entry.entry_id]
 
-    async_add_entities(
-        [PureI9(coord, coord.robot, coord.data) for coord in data[const.COORDINATORS]]
-    )
+    vacuums = [PureI9(coord, coord.robot, coord.data) for coord in data[const.COORDINATORS]]
+
+    # Keep the entities around for the integration services
+    data[const.VACUUMS] = vacuums
+
+    async_add_entities(vacuums)
 
-# pylint: disable=R0904
+@contextmanager
+def command_errors() -> Iterator[None]:
+    """Explain to the user why a command could not be sent"""
+    try:
+        yield
+    except (exception.CloudUnavailableException, exception.LocalCommandException) as ex:
+        raise HomeAssistantError(str(ex)) from ex
+
+# pylint: disable=R0902,R0904
 class PureI9(CoordinatorEntity, StateVacuumEntity):
     """The main Pure i9 vacuum entity"""
+    # The fields of params that the vacuum displays
+    _params_fields = (
+        "state",
+        "fan_speed",
+        "name",
+        "available",
+        "firmware",
+        "dustbin",
+        "maps",
+    )
+
     def __init__(
             self,
             coordinator,
-            robot: CloudRobot,
+            robot: api.ApiRobot,
             params: purei9.Params,
         ):
         super().__init__(coordinator)
         self._robot = robot
         self._params = params
+        # Optimistic values after a command, held until the cloud agrees or the deadline passes
+        self._state_override: Optional[VacuumActivity] = None
+        self._fan_speed_override: Optional[str] = None
+        self._state_override_deadline = 0.0
+        self._fan_speed_override_deadline = 0.0
+        self._last_update_success = coordinator.last_update_success
+        self._zone_index = zones.ZoneIndex(params.maps)
 
     @property
     def supported_features(self) -> int:
@@ -76,6 +117,9 @@ class PureI9(CoordinatorEntity, StateVacuumEntity):
     @property
     def activity(self) -> VacuumActivity:
         """Return the current vacuum activity"""
+        if self._state_override is not None:
+            return self._state_override
+
         return self._params.state
 
     @property
@@ -99,6 +143,9 @@ class PureI9(CoordinatorEntity, StateVacuumEntity):
     @property
     def fan_speed(self) -> Optional[str]:
         """Return the fan speed of the vacuum cleaner."""
+        if self._fan_speed_override is not None:
+            return self._fan_speed_override
+
         return self._params.fan_speed
 
     @property
@@ -115,67 +162,102 @@ class PureI9(CoordinatorEntity, StateVacuumEntity):
             ),
             "zones": utility.array_join(
                 [zone["name"] for _map in self._params.maps for zone in _map["zones"]]
-            )
+            ),
+            # The last known state is kept when the cloud can't be reached
+            "stale": not self._last_update_success,
         }
 
     async def async_start(self):
         """Start cleaning"""
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_TRANSITION,
+                self._async_execute_start
+            )
+
+    async def _async_execute_start(self):
         # If you click on start after clicking return, it will continue
         # returning. So we'll need to call stop first, then start in order
         # to start a clean.
-        if self._params.state == VacuumActivity.RETURNING:
-            await self.hass.async_add_executor_job(self._robot.stopclean)
+        if self.activity == VacuumActivity.RETURNING:
+            await self._robot.async_stopclean()
 
         # According to Home Assistant, pause should be an idempotent action.
         # However, the Pure i9 will toggle pause on/off if called multiple
         # times. Circumvent that.
-        if self._params.state != VacuumActivity.CLEANING:
-            await self.hass.async_add_executor_job(self._robot.startclean)
-            self._params.state = VacuumActivity.CLEANING
-            self.async_write_ha_state()
+        if self.activity != VacuumActivity.CLEANING:
+            await self._robot.async_startclean()
+            self._async_hold(state=VacuumActivity.CLEANING)
 
     def start(self):
         raise NotImplementedError
 
     async def async_return_to_base(self, **kwargs):
         """Return to the dock"""
-        await self.hass.async_add_executor_job(self._robot.gohome)
-        self._params.state = VacuumActivity.RETURNING
-        self.async_write_ha_state()
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_TRANSITION,
+                self._async_execute_return_to_base
+            )
+
+    async def _async_execute_return_to_base(self):
+        await self._robot.async_gohome()
+        self._async_hold(state=VacuumActivity.RETURNING)
 
     def return_to_base(self, **kwargs):
         raise NotImplementedError
 
     async def async_stop(self, **kwargs):
         """Stop cleaning"""
-        await self.hass.async_add_executor_job(self._robot.stopclean)
-        self._params.state = VacuumActivity.IDLE
-        self.async_write_ha_state()
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_TRANSITION,
+                self._async_execute_stop
+            )
+
+    async def _async_execute_stop(self):
+        await self._robot.async_stopclean()
+        self._async_hold(state=VacuumActivity.IDLE)
 
     def stop(self, **kwargs):
         raise NotImplementedError
 
     async def async_pause(self):
         """Pause cleaning"""
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_TRANSITION,
+                self._async_execute_pause
+            )
+
+    async def _async_execute_pause(self):
         # According to Home Assistant, pause should be an idempotent
         # action. However, the Pure i9 will toggle pause on/off if
-        # called multiple times. Circumvent that.
-        if self._params.state != VacuumActivity.PAUSED:
-            await self.hass.async_add_executor_job(self._robot.pauseclean)
-            self._params.state = VacuumActivity.PAUSED
-            self.async_write_ha_state()
+        # called multiple times. Circumvent that. The check happens
+        # right before sending so that queued pauses can't race.
+        if self.activity != VacuumActivity.PAUSED:
+            await self._robot.async_pauseclean()
+            self._async_hold(state=VacuumActivity.PAUSED)
 
     def pause(self):
         raise NotImplementedError
 
     async def async_set_fan_speed(self, fan_speed: str, **kwargs: Any):
         """Set the fan speed of the robot"""
-        await self.hass.async_add_executor_job(
-            self._robot.setpowermode,
-            purei9.fan_speed_to_purei9(fan_speed)
-        )
-        self._params.fan_speed = fan_speed
-        self.async_write_ha_state()
+        if fan_speed not in self.fan_speed_list:
+            raise ServiceValidationError(
+                f"Fan speed \"{fan_speed}\" is not one of: {', '.join(self.fan_speed_list)}"
+            )
+
+        async def async_execute():
+            await self._robot.async_setpowermode(purei9.fan_speed_to_purei9(fan_speed))
+            self._async_hold(fan_speed=fan_speed)
+
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_POWER_MODE,
+                async_execute
+            )
 
     def set_fan_speed(self, fan_speed, **kwargs):
         raise NotImplementedError
@@ -187,25 +269,43 @@ class PureI9(CoordinatorEntity, StateVacuumEntity):
         **kwargs: Any
     ) -> None:
         """Send a custom command to the robot. Currently only used to clean specific zones."""
-        cmd = vacuum_command.create_command(command, self.hass, self._robot, self._params)
+        try:
+            await self.async_execute_command(command, params)
+        except exception.CommandParamException as ex:
+            raise ServiceValidationError(
+                f"Need parameter \"{ex.param_name}\" of type \"{ex.param_type}\" "
+                f"for command \"{command}\"."
+            ) from ex
+        except exception.CommandException as ex:
+            raise HomeAssistantError(
+                f"Could not execute command \"{command}\" due to: {ex}"
+            ) from ex
+
+    async def async_execute_command(
+        self,
+        command: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Send a custom command to the robot, raising if it can't be executed"""
+        cmd = vacuum_command.get_command(command)
 
         if cmd is None:
-            _LOGGER.error("Command \"%s\" not implemented.", command)
-            return
+            raise ServiceValidationError(f"Command \"{command}\" not implemented.")
 
-        try:
-            cmd.input_valid_or_throw(params)
+        params = cmd.validate(params)
 
-            await cmd.execute(params)
-        except exception.CommandParamException as ex:
-            _LOGGER.error(
-                "Need parameter \"%s\" of type \"%s\" for command \"%s\".",
-                ex.param_name,
-                ex.param_type,
-                command
+        # Maps are immutable, so the index only has to be rebuilt when they are replaced
+        if self._zone_index.maps is not self._params.maps:
+            self._zone_index = zones.ZoneIndex(self._params.maps)
+
+        target = vacuum_command.CommandTarget(self._robot, self._params, self._zone_index)
+
+        # Commands replace any other queued transition
+        with command_errors():
+            await self.coordinator.commands.async_enqueue(
+                command_queue.KIND_TRANSITION,
+                lambda: cmd.execute(target, params)
             )
-        except exception.CommandException as ex:
-            _LOGGER.error("Could not execute command \"%s\" due to: %s", command, ex)
 
     def send_command(
         self,
@@ -215,23 +315,72 @@ class PureI9(CoordinatorEntity, StateVacuumEntity):
     ):
         raise NotImplementedError
 
+    def _async_hold(
+            self,
+            state: Optional[VacuumActivity] = None,
+            fan_speed: Optional[str] = None
+        ) -> None:
+        """Show the result of a command right away and poll until the cloud confirms it"""
+        # Each value is held for as long as its own command may take
+        deadline = time.monotonic() + scheduler.CONFIRM_DEADLINE
+
+        if state is not None:
+            self._state_override = state
+            self._state_override_deadline = deadline
+
+        if fan_speed is not None:
+            self._fan_speed_override = fan_speed
+            self._fan_speed_override_deadline = deadline
+
+        self.async_write_ha_state()
+
+        # Keep polling until every value that is still held has been confirmed
+        self.coordinator.async_confirm(
+            lambda params: (
+                (self._state_override is None or params.state == self._state_override)
+                and (
+                    self._fan_speed_override is None
+                    or params.fan_speed == self._fan_speed_override
+                )
+            )
+        )
+
     def _handle_coordinator_update(self):
         """
         Called by Home Assistant asking the vacuum to update to the latest state.
         Can contain IO code.
         """
         params = self.coordinator.data
+        last_update_success = self.coordinator.last_update_success
 
-        self._params.state = params.state
-        self._params.fan_speed = params.fan_speed
-        self._params.name = params.name
-        self._params.available = params.available
-        self._params.firmware = params.firmware
-        self._params.dustbin = params.dustbin
-        self._params.last_cleaning_session = params.last_cleaning_session
-        self._params.maps = params.maps
+        # A failed update changes the stale attribute
+        changed = (
+            purei9.params_changed(self._params, params, self._params_fields)
+            or last_update_success != self._last_update_success
+        )
+        now = time.monotonic()
+
+        # Hold optimistic values against stale data until the cloud agrees
+        if self._state_override is not None and (
+                now >= self._state_override_deadline
+                or params.state == self._state_override
+            ):
+            self._state_override = None
+            changed = True
+
+        if self._fan_speed_override is not None and (
+                now >= self._fan_speed_override_deadline
+                or params.fan_speed == self._fan_speed_override
+            ):
+            self._fan_speed_override = None
+            changed = True
 
-        self.async_write_ha_state()
+        self._params = params
+        self._last_update_success = last_update_success
+
+        # Only write the state when something that the vacuum displays has changed
+        if changed:
+            self.async_write_ha_state()
 
     def locate(self, **kwargs):
         raise NotImplementedError
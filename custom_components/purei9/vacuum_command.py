@@ -1,63 +1,88 @@
 """Vacuum commands"""
-from typing import Dict, Any
-from . import exception, utility
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import voluptuous as vol
+from . import exception, purei9, zones
 
 COMMAND_CLEAN_ZONES = "clean_zones"
 
+@dataclass(frozen=True, slots=True)
+class CommandTarget:
+    """The robot that a command is executed on, and what is known about it"""
+    robot: Any
+    params: purei9.Params
+    zone_index: zones.ZoneIndex
+
 class CommandBase:
-    """Base class for all vacuum commands"""
-    def __init__(self, hass, robot, params):
-        super().__init__()
-        self.hass = hass
-        self.robot = robot
-        self.params = params
+    """
+    Base class for all vacuum commands. Commands are stateless, so a single
+    instance of each command is registered and reused.
+    """
+    name: str = None
+    # Compiled once, validates and normalizes the command parameters
+    schema: vol.Schema = vol.Schema(vol.Any(None, dict))
+    # Type names of the parameters, to explain what is missing
+    param_types: Dict[str, str] = {}
 
-    # pylint: disable=unused-argument
-    def input_valid_or_throw(self, params: Dict[str, Any]) -> None:
-        """Check for required input data"""
+    def validate(self, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Check for required input data and return the normalized parameters"""
+        try:
+            return self.schema(params)
+        except vol.Invalid as ex:
+            param_name = str(ex.path[0]) if ex.path else "params"
+
+            raise exception.CommandParamException(
+                param_name,
+                self.param_types.get(param_name, "Dict")
+            ) from ex
 
     # pylint: disable=unused-argument
-    async def execute(self, params: Dict[str, Any]) -> None:
+    async def execute(self, target: CommandTarget, params: Dict[str, Any]) -> None:
         """Execute the command"""
         return None
 
-class CommandCleanZones(CommandBase):
-    """Command to clean zones"""
-    def input_valid_or_throw(self, params: Dict[str, Any]) -> None:
-        if params is None:
-            raise exception.CommandParamException("params", "Dict")
+COMMANDS: Dict[str, CommandBase] = {}
 
-        if not "map" in params:
-            raise exception.CommandParamException("map", "string")
+def register(command: CommandBase) -> CommandBase:
+    """Make a command available by its name"""
+    COMMANDS[command.name] = command
+    return command
 
-        if not "zones" in params:
-            raise exception.CommandParamException("zones", "List")
+def get_command(command_name: str) -> Optional[CommandBase]:
+    """Find a registered command by its name"""
+    return COMMANDS.get(command_name)
 
-    async def execute(self, params: Dict[str, Any]) -> None:
-        map_name = params["map"]
+class CommandCleanZones(CommandBase):
+    """Command to clean zones"""
+    name = COMMAND_CLEAN_ZONES
+    schema = vol.Schema(
+        {
+            vol.Required("map"): vol.Coerce(str),
+            vol.Required("zones"): vol.All(
+                lambda zones: [zones] if isinstance(zones, str) else zones,
+                [vol.Coerce(str)]
+            ),
+        },
+        extra=vol.ALLOW_EXTRA
+    )
+    param_types = {"map": "string", "zones": "List"}
 
-        _map = utility.first_or_default(
-            self.params.maps,
-            lambda _map: _map["name"] == map_name
-        )
+    async def execute(self, target: CommandTarget, params: Dict[str, Any]) -> None:
+        map_name = params["map"]
+        map_id = target.zone_index.find_map_id(map_name)
 
-        if _map is None:
+        if map_id is None:
             raise exception.CommandException(
-                f"Map \"{map_name}\" does not exist for robot \"{self.params.name}\"."
+                f"Map \"{map_name}\" does not exist for robot \"{target.params.name}\"."
             )
 
-        # Search all zones inside this map for the ones we are looking for
-        zone_ids = [zone["id"] for zone in _map["zones"] if zone["name"] in params["zones"]]
+        # Zones can be given by name, in any case, or by id
+        zone_ids = target.zone_index.find_zone_ids(map_id, params["zones"])
 
         if len(zone_ids) == 0:
             raise exception.CommandException(f"Could not find any zones in map \"{map_name}\".")
 
         # Everything done, now send the robot to clean those maps and zones we found
-        await self.hass.async_add_executor_job(self.robot.cleanZones, _map["id"], zone_ids)
-
-def create_command(command_name, hass, robot, params) -> CommandBase:
-    """Creates a command object from a command name"""
-    if command_name == COMMAND_CLEAN_ZONES:
-        return CommandCleanZones(hass, robot, params)
+        await target.robot.async_clean_zones(map_id, zone_ids)
 
-    return None
+register(CommandCleanZones())
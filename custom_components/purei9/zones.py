@@ -0,0 +1,64 @@
+"""Index of maps and zones, to look them up by name or id"""
+from typing import Dict, List, Optional, Tuple
+from . import purei9
+
+def zone_key(name: str) -> str:
+    """Names are matched case-insensitively"""
+    return name.strip().casefold()
+
+class ZoneIndex:
+    """Maps and zones indexed on name and id. Build a new index when the maps change."""
+    def __init__(self, maps: Tuple[purei9.ParamsMap, ...]):
+        self._maps = maps
+        self._map_ids_by_id: Dict[str, str] = {}
+        self._map_ids_by_name: Dict[str, str] = {}
+        self._zone_ids_by_id: Dict[Tuple[str, str], str] = {}
+        self._zone_ids_by_name: Dict[Tuple[str, str], str] = {}
+
+        for _map in maps:
+            map_id = _map["id"]
+            self._map_ids_by_id[map_id] = map_id
+
+            if _map["name"] is not None:
+                self._map_ids_by_name.setdefault(zone_key(_map["name"]), map_id)
+
+            for zone in _map["zones"]:
+                self._zone_ids_by_id[(map_id, zone["id"])] = zone["id"]
+
+                if zone["name"] is not None:
+                    self._zone_ids_by_name.setdefault((map_id, zone_key(zone["name"])), zone["id"])
+
+    @property
+    def maps(self) -> Tuple[purei9.ParamsMap, ...]:
+        """The maps that the index was built from"""
+        return self._maps
+
+    def find_map_id(self, map_name_or_id: str) -> Optional[str]:
+        """Find a map by its id or name"""
+        map_id = self._map_ids_by_id.get(map_name_or_id)
+
+        if map_id is not None:
+            return map_id
+
+        return self._map_ids_by_name.get(zone_key(map_name_or_id))
+
+    def find_zone_id(self, map_id: str, zone_name_or_id: str) -> Optional[str]:
+        """Find a zone inside a map by its id or name"""
+        zone_id = self._zone_ids_by_id.get((map_id, zone_name_or_id))
+
+        if zone_id is not None:
+            return zone_id
+
+        return self._zone_ids_by_name.get((map_id, zone_key(zone_name_or_id)))
+
+    def find_zone_ids(self, map_id: str, zone_names_or_ids: List[str]) -> List[str]:
+        """Find zones inside a map, in the requested order and skipping unknown zones"""
+        zone_ids = []
+
+        for zone_name_or_id in zone_names_or_ids:
+            zone_id = self.find_zone_id(map_id, str(zone_name_or_id))
+
+            if zone_id is not None and zone_id not in zone_ids:
+                zone_ids.append(zone_id)
+
+        return zone_ids
@@ -0,0 +1,225 @@
+"""Fakes shared by the tests and the benchmarks"""
+import asyncio
+import random
+import zlib
+from aiohttp import web
+from custom_components.purei9 import api
+
+# Robot states that the simulated robots cycle through, as reported by the cloud
+CLEANING = 1
+RETURNING = 5
+CHARGING = 9
+
+def fraction(key: str) -> float:
+    """A stable number between 0 and 1 for a key, so that failures are repeatable"""
+    return zlib.crc32(key.encode()) / 0xFFFFFFFF
+
+class FakeHass:
+    """Just enough of Home Assistant to run the integration's helpers"""
+    def __init__(self, data=None, config_entries=None):
+        self.data = {} if data is None else data
+        self.config_entries = config_entries
+
+    @property
+    def loop(self):
+        """The running event loop"""
+        return asyncio.get_running_loop()
+
+    def async_create_task(self, coroutine):
+        """Run a coroutine in the background"""
+        return self.loop.create_task(coroutine)
+
+class FakeAuth:
+    """Authentication that never logs in"""
+    async def async_get_headers(self):
+        """Get fake headers"""
+        return {"Authorization": "Bearer foo"}
+
+    def invalidate_token(self):
+        """Pretend to forget the token"""
+
+# pylint: disable=too-many-instance-attributes
+class FakeCloud:
+    """
+    A local stand-in for the Electrolux cloud API with simulated robots. Latency
+    and failures are configurable and deterministic for a given seed.
+
+    The appliances "broken" and "slow" answer with invalid JSON and after ten
+    seconds, respectively.
+    """
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self,
+            robot_ids=("robot",),
+            other_ids=("oven",),
+            *,
+            latency: float = 0.0,
+            failure_rate: float = 0.0,
+            change_rate: float = 0.2,
+            seed: int = 0,
+            sessions: int = 1
+        ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.change_rate = change_rate
+        self.sessions = sessions
+        self.rate_limited = False
+        self.token_lifetime = 3600
+        self.requests = []
+        self.request_count = 0
+        self.failures = 0
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._calls = {}
+        self._other_ids = list(other_ids)
+        self.robots = {
+            robot_id: {
+                "robotStatus": CHARGING,
+                "batteryStatus": 6,
+                "powerMode": 2,
+            }
+            for robot_id in robot_ids
+        }
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.get("/appliance/api/v2/appliances", self.appliances),
+            web.get("/appliance/api/v2/appliances/{id}", self.appliance),
+            web.get("/appliance/api/v2/appliances/{id}/info", self.info),
+            web.put("/appliance/api/v2/appliances/{id}", self.update),
+            web.put("/appliance/api/v2/appliances/{id}/command", self.command),
+            web.get("/purei/api/v2/appliances/{id}/history", self.history),
+            web.get("/purei/api/v2/appliances/{id}/interactive-maps", self.maps),
+            web.post("/one-account-authorization/api/v1/token", self.token),
+        ])
+
+    @property
+    def robot_ids(self):
+        """The identifiers of all robots"""
+        return list(self.robots)
+
+    def tick(self) -> None:
+        """Let time pass, some robots start cleaning, return or go back to charging"""
+        for robot in self.robots.values():
+            if self._random.random() >= self.change_rate:
+                continue
+
+            if robot["robotStatus"] == CLEANING:
+                robot["robotStatus"] = RETURNING
+                robot["batteryStatus"] = max(1, robot["batteryStatus"] - 1)
+            elif robot["robotStatus"] == RETURNING:
+                robot["robotStatus"] = CHARGING
+            else:
+                robot["robotStatus"] = CLEANING
+                robot["batteryStatus"] = 6
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.request_count += 1
+
+        # Count the calls to each path so that the same call fails on every run
+        call = self._calls.get(request.path, 0)
+        self._calls[request.path] = call + 1
+
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        if fraction(f"{self._seed}:{request.path}:{call}") < self.failure_rate:
+            self.failures += 1
+            return web.Response(status=503)
+
+        return await handler(request)
+
+    def _appliance(self, appliance_id: str):
+        if appliance_id not in self.robots:
+            return {"applianceId": appliance_id}
+
+        return {
+            "applianceId": appliance_id,
+            "connectionState": "Connected",
+            "properties": {
+                "reported": {
+                    "applianceName": appliance_id,
+                    "capabilities": {"PowerLevels": {}},
+                    "firmwareVersion": "42.0",
+                    "dustbinStatus": "normal",
+                    **self.robots[appliance_id],
+                },
+            },
+        }
+
+    async def appliances(self, _request):
+        """List all appliances"""
+        if self.rate_limited:
+            self.requests.append(("appliances", None, None))
+            return web.Response(status=429, headers={"Retry-After": "120"})
+
+        return web.json_response([
+            self._appliance(appliance_id)
+            for appliance_id in [*self.robots, *self._other_ids]
+        ])
+
+    async def appliance(self, request):
+        """Get the state document of an appliance"""
+        if request.match_info["id"] == "broken":
+            return web.Response(text="{")
+
+        if request.match_info["id"] == "slow":
+            await asyncio.sleep(10)
+
+        return web.json_response(self._appliance(request.match_info["id"]))
+
+    async def info(self, request):
+        """Get static information about an appliance"""
+        self.requests.append(("info", request.match_info["id"], None))
+        device_type = (
+            api.DEVICE_TYPE_ROBOT
+            if request.match_info["id"] in self.robots
+            else "OVEN"
+        )
+        return web.json_response({"deviceType": device_type})
+
+    async def update(self, request):
+        """Update an appliance"""
+        self.requests.append(("update", request.headers["Authorization"], await request.json()))
+        return web.Response()
+
+    async def command(self, request):
+        """Send a command to an appliance"""
+        self.requests.append(("command", request.headers["Authorization"], await request.json()))
+        return web.Response()
+
+    async def history(self, _request):
+        """Get the cleaning history"""
+        return web.json_response([
+            {
+                "timeStamp": f"2024-01-{day:02d}T03:04:05.678",
+                "cleaningSession": {"cleaningDuration": 600000000},
+                "cleanedArea": 42,
+            }
+            for day in range(1, self.sessions + 1)
+        ])
+
+    async def maps(self, _request):
+        """Get the interactive maps"""
+        return web.json_response([
+            {
+                "id": f"map-{i}",
+                "name": f"Floor {i}",
+                "sequenceNumber": 1,
+                "zones": [
+                    {"id": f"zone-{i}-{j}", "name": f"Room {j}", "zoneType": "clean"}
+                    for j in range(10)
+                ],
+            }
+            for i in range(2)
+        ])
+
+    async def token(self, request):
+        """Refresh a token"""
+        self.requests.append(("token", None, await request.json()))
+        token = {"accessToken": "new", "refreshToken": "bar"}
+
+        if self.token_lifetime is not None:
+            token["expiresIn"] = self.token_lifetime
+
+        return web.json_response(token)
@@ -0,0 +1,186 @@
+"""Test the api module"""
+import asyncio
+import json
+import time
+import unittest
+import unittest.mock
+from aiohttp import ClientSession, ClientResponseError
+from aiohttp.test_utils import TestServer
+from purei9_unofficial.cloudv3 import CloudClient
+from purei9_unofficial.common import PowerMode
+from custom_components.purei9 import api, breaker, exception, governor
+from tests.fakes import FakeAuth, FakeCloud
+
+class FakeDeviceTypes:
+    """A device type cache that never expires"""
+    def __init__(self, device_types):
+        self.device_types = device_types
+
+    def get(self, appliance_id, _now):
+        """Get a known device type"""
+        return self.device_types.get(appliance_id)
+
+    def set(self, appliance_id, device_type, _now):
+        """Remember a device type"""
+        self.device_types[appliance_id] = device_type
+
+class TestApi(unittest.IsolatedAsyncioTestCase):
+    """Tests for the api module"""
+    async def asyncSetUp(self):
+        self.cloud = FakeCloud()
+        self.server = TestServer(self.cloud.app)
+        await self.server.start_server()
+        self.session = ClientSession()
+        base_url = str(self.server.make_url("")).rstrip("/")
+        self.api = api.CloudApi(self.session, FakeAuth(), base_url)
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def test_get_robot_ids(self):
+        """Test that only robot vacuums are discovered"""
+        self.assertEqual(["robot"], await self.api.async_get_robot_ids())
+
+    async def test_get_robot_ids_cached(self):
+        """Test that appliances with a known device type are not looked up again"""
+        device_types = FakeDeviceTypes({"oven": "OVEN"})
+
+        self.assertEqual(["robot"], await self.api.async_get_robot_ids(device_types))
+        self.assertEqual([("info", "robot", None)], self.cloud.requests)
+        self.assertEqual(api.DEVICE_TYPE_ROBOT, device_types.device_types["robot"])
+
+    async def test_command(self):
+        """Test that commands are sent with authentication"""
+        robot = api.ApiRobot(self.api, "robot")
+        await robot.async_startclean()
+
+        self.assertEqual(
+            [("command", "Bearer foo", {"CleaningCommand": "play"})],
+            self.cloud.requests
+        )
+
+    async def test_setpowermode(self):
+        """Test that robots using eco mode are updated correctly"""
+        self.cloud.robots["robot"] = {"ecoMode": True}
+        robot = api.ApiRobot(self.api, "robot")
+        await robot.async_setpowermode(PowerMode.HIGH)
+
+        self.assertEqual([("update", "Bearer foo", {"ecoMode": False})], self.cloud.requests)
+
+    async def test_get_cleaning_sessions(self):
+        """Test to parse the cleaning history"""
+        robot = api.ApiRobot(self.api, "robot")
+        sessions = await robot.async_get_cleaning_sessions()
+
+        self.assertEqual(1, len(sessions))
+        self.assertEqual(60, sessions[0].duration)
+        self.assertEqual(2024, sessions[0].endtime.year)
+
+    async def test_rate_limited(self):
+        """Test that requests are held back for as long as the cloud asks"""
+        self.cloud.rate_limited = True
+
+        with self.assertRaises(ClientResponseError):
+            await self.api.async_get_appliances()
+
+        # Not retried, and the cloud is not considered to be down
+        self.assertEqual(1, len(self.cloud.requests))
+        self.assertEqual(breaker.STATE_CLOSED, self.api.breaker.state)
+        self.assertGreater(self.api.governor.delay(governor.PRIORITY_POLL), 100)
+
+        # Commands fail right away instead of waiting
+        with self.assertRaises(exception.CloudUnavailableException):
+            await api.ApiRobot(self.api, "robot").async_startclean()
+
+        self.assertEqual(1, len(self.cloud.requests))
+
+    async def test_rate_limited_timeouts(self):
+        """Test that polls timing out while held back don't open the breaker"""
+        self.api.governor.record_response(429, {"Retry-After": "60"})
+
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            with self.assertRaises(TimeoutError):
+                async with asyncio.timeout(0.01):
+                    await self.api.async_get_appliances()
+
+        self.assertEqual(breaker.STATE_CLOSED, self.api.breaker.state)
+        self.assertEqual([], self.cloud.requests)
+
+    async def test_breaker_probe_error(self):
+        """Test that a probe failing for other reasons than the cloud does not block calls"""
+        # pylint: disable=protected-access
+        self.api._breaker = breaker.CircuitBreaker(
+            failure_threshold=1,
+            open_duration_min=0,
+            open_duration_max=0
+        )
+        self.api.breaker.record_failure()
+
+        with self.assertRaises(json.JSONDecodeError):
+            await self.api.async_get_appliance("broken")
+
+        self.assertEqual(breaker.STATE_HALF_OPEN, self.api.breaker.state)
+        await self.api.async_get_appliance("robot")
+        self.assertEqual(breaker.STATE_CLOSED, self.api.breaker.state)
+
+    async def test_breaker_cancelled(self):
+        """Test that a cancelled call is not counted as the cloud being down"""
+        # pylint: disable=protected-access
+        self.api._breaker = breaker.CircuitBreaker(failure_threshold=1)
+
+        task = asyncio.create_task(self.api.async_get_appliance("slow"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertEqual(breaker.STATE_CLOSED, self.api.breaker.state)
+        self.assertEqual(0, self.api.breaker.as_dict()["failures"])
+
+    async def test_refresh_token(self):
+        """Test that the token is refreshed without logging in again"""
+        client = CloudClient(token=json.dumps({
+            "accessToken": "old",
+            "refreshToken": "foo",
+            "expires": time.time() + 60,
+        }))
+        client.authorizationurl = str(self.server.make_url("/one-account-authorization/api/v1"))
+
+        tokens = []
+        auth = api.CloudAuth(None, client, self.session, tokens.append)
+
+        await auth.async_refresh_token()
+
+        self.assertEqual("foo", self.cloud.requests[0][2]["refreshToken"])
+        self.assertEqual("new", client.token["accessToken"])
+        self.assertTrue(auth.is_token_valid())
+        self.assertEqual(1, len(tokens))
+
+    async def test_refresh_token_backoff(self):
+        """Test that refreshing backs off while the cloud gives no usable expiry"""
+        self.cloud.token_lifetime = None
+        client = CloudClient(token=json.dumps({
+            "accessToken": "old",
+            "refreshToken": "foo",
+            "expires": time.time() + 60,
+        }))
+        client.authorizationurl = str(self.server.make_url("/one-account-authorization/api/v1"))
+        auth = api.CloudAuth(None, client, self.session)
+
+        with unittest.mock.patch.object(api, "async_call_later") as call_later:
+            auth.async_schedule_refresh()
+
+            for _ in range(3):
+                await call_later.call_args.args[2](None)
+
+            self.cloud.token_lifetime = 3600
+            await call_later.call_args.args[2](None)
+
+        delays = [call.args[1] for call in call_later.call_args_list]
+        self.assertEqual([0, 120, 240, 480], delays[:4])
+        self.assertGreater(delays[4], 3000)
+
+if __name__ == '__main__':
+    unittest.main()
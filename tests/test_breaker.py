@@ -0,0 +1,101 @@
+"""Test the breaker module"""
+import unittest
+from custom_components.purei9 import breaker, exception
+
+# pylint: disable=too-few-public-methods
+class FakeClock:
+    """A clock that only moves when told to"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestBreaker(unittest.TestCase):
+    """Tests for the breaker module"""
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = breaker.CircuitBreaker(
+            failure_threshold=3,
+            open_duration_min=10,
+            open_duration_max=100,
+            clock=self.clock,
+            rand=lambda: 0.5
+        )
+
+    def fail_calls(self, times):
+        """Fail a number of calls"""
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_open(self):
+        """Test that the breaker opens after repeated failures"""
+        self.fail_calls(2)
+        self.assertEqual(breaker.STATE_CLOSED, self.breaker.state)
+
+        self.fail_calls(1)
+        self.assertEqual(breaker.STATE_OPEN, self.breaker.state)
+
+        with self.assertRaises(exception.CloudUnavailableException):
+            self.breaker.before_call()
+
+    def test_half_open(self):
+        """Test that a single probe is let through after the backoff"""
+        self.fail_calls(3)
+        self.clock.now = 10
+
+        self.assertEqual(breaker.STATE_HALF_OPEN, self.breaker.state)
+        self.breaker.before_call()
+
+        # Only one probe at a time
+        with self.assertRaises(exception.CloudUnavailableException):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(breaker.STATE_CLOSED, self.breaker.state)
+        self.breaker.before_call()
+
+    def test_failed_probe(self):
+        """Test that a failed probe opens the breaker for longer"""
+        self.fail_calls(3)
+        self.clock.now = 10
+        self.fail_calls(1)
+
+        self.assertEqual(breaker.STATE_OPEN, self.breaker.state)
+
+        self.clock.now = 29
+        self.assertEqual(breaker.STATE_OPEN, self.breaker.state)
+
+        self.clock.now = 30
+        self.assertEqual(breaker.STATE_HALF_OPEN, self.breaker.state)
+
+    def test_released_probe(self):
+        """Test that a probe which ends without an answer lets another call probe"""
+        self.fail_calls(3)
+        self.clock.now = 10
+        self.breaker.before_call()
+        self.breaker.release_probe()
+
+        self.assertEqual(breaker.STATE_HALF_OPEN, self.breaker.state)
+        self.breaker.before_call()
+
+    data_backoff = [
+        (0, 0.5, 10),
+        (1, 0.5, 20),
+        (5, 0.5, 100),
+        (0, 0.0, 8),
+        (0, 1.0, 12),
+    ]
+
+    def test_backoff(self):
+        """Test that the backoff is exponential, capped and jittered"""
+        for attempt, rand, expected in self.data_backoff:
+            with self.subTest():
+                self.assertAlmostEqual(
+                    expected,
+                    breaker.backoff(attempt, 10, 100, lambda rand=rand: rand)
+                )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Test the command queue"""
+import asyncio
+import unittest
+from custom_components.purei9 import command_queue
+from tests.fakes import FakeHass
+
+# pylint: disable=too-few-public-methods
+class TestCommandQueue(unittest.IsolatedAsyncioTestCase):
+    """Tests for the command queue"""
+    async def asyncSetUp(self):
+        self.sent = []
+        self.queue = command_queue.CommandQueue(FakeHass(), debounce=0)
+
+    def action(self, name):
+        """Create an action that records when it is sent"""
+        async def async_action():
+            self.sent.append(name)
+
+        return async_action
+
+    async def test_coalesce(self):
+        """Only the last command of each kind is sent"""
+        await asyncio.gather(
+            self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("stop")),
+            self.queue.async_enqueue(command_queue.KIND_POWER_MODE, self.action("quiet")),
+            self.queue.async_enqueue(command_queue.KIND_POWER_MODE, self.action("power")),
+            self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("start")),
+        )
+
+        self.assertEqual(["power", "start"], self.sent)
+
+    async def test_serialize(self):
+        """Commands queued while sending are sent afterwards"""
+        await self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("start"))
+        await self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("pause"))
+
+        self.assertEqual(["start", "pause"], self.sent)
+
+    async def test_exception(self):
+        """Everyone waiting for a failed command gets the exception"""
+        async def async_fail():
+            raise ValueError("Failed")
+
+        results = await asyncio.gather(
+            self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("start")),
+            self.queue.async_enqueue(command_queue.KIND_TRANSITION, async_fail),
+            return_exceptions=True
+        )
+
+        self.assertEqual(2, len([result for result in results if isinstance(result, ValueError)]))
+
+        # The queue still works after a failure
+        await self.queue.async_enqueue(command_queue.KIND_TRANSITION, self.action("stop"))
+        self.assertEqual(["stop"], self.sent)
+
+    async def test_cancel_while_sending(self):
+        """Callers waiting for a command that is being sent are released on cancel"""
+        started = asyncio.Event()
+
+        async def async_slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        caller = asyncio.create_task(
+            self.queue.async_enqueue(command_queue.KIND_TRANSITION, async_slow)
+        )
+        await started.wait()
+        self.queue.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            async with asyncio.timeout(1):
+                await caller
+
+if __name__ == '__main__':
+    unittest.main()
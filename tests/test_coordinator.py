@@ -0,0 +1,159 @@
+"""Test the coordinator module"""
+import tempfile
+import unittest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from purei9_unofficial.common import BatteryStatus, PowerMode, RobotStates
+from custom_components.purei9 import const, coordinator, exception, governor
+
+def create_appliance(robot_id, status=RobotStates.Charging):
+    """Create an appliance state document, like the one from the cloud"""
+    return {
+        "applianceId": robot_id,
+        "connectionState": "Connected",
+        "properties": {
+            "reported": {
+                "applianceName": robot_id,
+                "capabilities": {"PowerLevels": {}},
+                "firmwareVersion": "1.0",
+                "batteryStatus": BatteryStatus.High.value,
+                "robotStatus": status.value,
+                "powerMode": PowerMode.MEDIUM.value,
+                "dustbinStatus": "notFull",
+            }
+        }
+    }
+
+# pylint: disable=too-few-public-methods
+class FakeCloudApi:
+    """Serves the appliances of an account in one batch"""
+    def __init__(self):
+        self.governor = governor.Governor()
+        self.appliances = []
+        self.error = None
+        self.calls = 0
+
+    async def async_get_appliances(self):
+        """Get every appliance of the account"""
+        self.calls += 1
+
+        if self.error is not None:
+            raise self.error
+
+        return self.appliances
+
+class FakeRobot:
+    """Serves a single appliance"""
+    def __init__(self, cloud_api, robot_id):
+        self.api = cloud_api
+        self._id = robot_id
+        self.calls = 0
+
+    def getid(self):
+        """Get the robot's id"""
+        return self._id
+
+    async def async_getinfo(self):
+        """Get the appliance state document"""
+        self.calls += 1
+        return create_appliance(self._id)
+
+    async def async_get_cleaning_sessions(self):
+        """Get the cleaning history"""
+        return []
+
+    async def async_get_maps(self):
+        """Get the interactive maps"""
+        return []
+
+class TestAccountCoordinator(unittest.IsolatedAsyncioTestCase):
+    """Tests for the account coordinator"""
+    async def asyncSetUp(self):
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+        self.config_entry = ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=const.DOMAIN,
+            title="Account",
+            data={},
+            options={const.CONF_BATCHED_POLLING: True},
+            source="user",
+            unique_id=None,
+            discovery_keys={}
+        )
+        self.cloud_api = FakeCloudApi()
+        self.robots = [FakeRobot(self.cloud_api, "1"), FakeRobot(self.cloud_api, "2")]
+        self.coords = [
+            coordinator.PureI9Coordinator(self.hass, self.config_entry, robot, polling=False)
+            for robot in self.robots
+        ]
+        self.account_coord = coordinator.PureI9AccountCoordinator(
+            self.hass,
+            self.config_entry,
+            self.cloud_api,
+            self.coords
+        )
+
+    async def asyncTearDown(self):
+        for coord in [self.account_coord, *self.coords]:
+            await coord.async_shutdown()
+
+        await self.hass.async_stop(force=True)
+        self.directory.cleanup()
+
+    async def test_batch(self):
+        """Test that every robot is updated from one request"""
+        self.cloud_api.appliances = [
+            create_appliance("1", RobotStates.Cleaning),
+            create_appliance("2"),
+        ]
+        await self.account_coord.async_refresh()
+
+        self.assertEqual(1, self.cloud_api.calls)
+        self.assertEqual([0, 0], [robot.calls for robot in self.robots])
+        self.assertEqual(["1", "2"], [coord.data.unique_id for coord in self.coords])
+        self.assertEqual(
+            self.account_coord.data["1"].state,
+            self.coords[0].data.state
+        )
+        self.assertNotEqual(self.coords[0].data.state, self.coords[1].data.state)
+
+    async def test_batch_missing_robot(self):
+        """Test that a robot missing from the batch is fetched on its own"""
+        self.cloud_api.appliances = [create_appliance("1")]
+        await self.account_coord.async_refresh()
+
+        self.assertEqual([0, 1], [robot.calls for robot in self.robots])
+        self.assertEqual("2", self.coords[1].data.unique_id)
+
+    async def test_robots_dont_poll(self):
+        """Test that the robots leave polling to the account"""
+        self.assertIsNotNone(self.account_coord.update_interval)
+        self.assertEqual([None, None], [coord.update_interval for coord in self.coords])
+
+        self.cloud_api.appliances = [create_appliance("1"), create_appliance("2")]
+        await self.account_coord.async_refresh()
+
+        self.assertEqual([None, None], [coord.update_interval for coord in self.coords])
+
+    async def test_failure_marks_robots_stale(self):
+        """Test that a failed batch marks every robot as stale"""
+        self.cloud_api.appliances = [create_appliance("1"), create_appliance("2")]
+        await self.account_coord.async_refresh()
+
+        updates = []
+        self.coords[0].async_add_listener(lambda: updates.append(True))
+
+        self.cloud_api.error = exception.CloudUnavailableException("The cloud is down.")
+        await self.account_coord.async_refresh()
+
+        self.assertFalse(self.account_coord.last_update_success)
+        self.assertFalse(any(coord.last_update_success for coord in self.coords))
+        self.assertEqual([True], updates)
+        # The last known state is kept
+        self.assertEqual("1", self.coords[0].data.unique_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Test the diagnostics module"""
+import unittest
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from custom_components.purei9 import const, diagnostics
+from tests.fakes import FakeHass
+
+# pylint: disable=too-few-public-methods
+class FakeConfigEntry:
+    """Only what the diagnostics need"""
+    entry_id = "entry"
+    data = {CONF_EMAIL: "me@example.com", CONF_PASSWORD: "secret", "country_code": "SE"}
+    options = {const.CONF_LOCAL_PASSWORD: "local-secret", const.CONF_POLL_INTERVAL_IDLE: 60}
+
+class TestDiagnostics(unittest.IsolatedAsyncioTestCase):
+    """Tests for the diagnostics module"""
+    async def test_redacts_passwords(self):
+        """Test that no credentials end up in the download"""
+        config_entry = FakeConfigEntry()
+        result = await diagnostics.async_get_config_entry_diagnostics(
+            FakeHass({
+                const.DOMAIN: {
+                    config_entry.entry_id: {
+                        const.COORDINATORS: [],
+                        const.ACCOUNT_COORDINATOR: None,
+                    }
+                }
+            }),
+            config_entry
+        )
+
+        self.assertNotIn("secret", str(result["entry"]))
+        self.assertNotIn("me@example.com", str(result["entry"]))
+        self.assertEqual("SE", result["entry"]["data"]["country_code"])
+        self.assertEqual(60, result["entry"]["options"][const.CONF_POLL_INTERVAL_IDLE])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Test the governor module"""
+import asyncio
+import unittest
+from custom_components.purei9 import governor, exception
+
+# pylint: disable=too-few-public-methods
+class FakeClock:
+    """A clock that only moves when told to"""
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestGovernor(unittest.IsolatedAsyncioTestCase):
+    """Tests for the governor module"""
+    def setUp(self):
+        self.clock = FakeClock()
+        self.wall_clock = FakeClock(1700000000.0)
+        self.governor = governor.Governor(
+            rate=1,
+            burst=4,
+            reserve=2,
+            clock=self.clock,
+            wall_clock=self.wall_clock
+        )
+
+    data_parse_retry_after = [
+        (None, None),
+        ("", None),
+        ("120", 120),
+        ("-5", 0),
+        ("99999", governor.RETRY_AFTER_MAX),
+        ("Tue, 14 Nov 2023 22:14:20 GMT", 60),
+        ("soon", None),
+    ]
+
+    def test_parse_retry_after(self):
+        """Test that Retry-After is parsed from seconds and HTTP dates"""
+        for value, expected in self.data_parse_retry_after:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    expected,
+                    governor.parse_retry_after(value, self.wall_clock())
+                )
+
+    data_parse_quota = [
+        ({}, None),
+        ({"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "30"}, (10, 30)),
+        ({"RateLimit-Remaining": "0", "RateLimit-Reset": "1700000060"}, (0, 60)),
+        ({"X-RateLimit-Remaining": "many"}, None),
+    ]
+
+    def test_parse_quota(self):
+        """Test that quota headers are parsed"""
+        for headers, expected in self.data_parse_quota:
+            with self.subTest(headers=headers):
+                self.assertEqual(expected, governor.parse_quota(headers, self.wall_clock()))
+
+    async def test_polls_leave_reserve(self):
+        """Test that polls leave requests in the bucket for commands"""
+        await self.governor.async_acquire(governor.PRIORITY_POLL)
+        await self.governor.async_acquire(governor.PRIORITY_POLL)
+
+        self.assertEqual(1, self.governor.delay(governor.PRIORITY_POLL))
+        self.assertEqual(0, self.governor.delay(governor.PRIORITY_COMMAND))
+
+        await self.governor.async_acquire(governor.PRIORITY_COMMAND)
+        await self.governor.async_acquire(governor.PRIORITY_COMMAND)
+
+        self.assertEqual(1, self.governor.delay(governor.PRIORITY_COMMAND))
+
+        self.clock.now = 3
+        self.assertEqual(0, self.governor.delay(governor.PRIORITY_POLL))
+
+    async def test_commands_first(self):
+        """Test that polls wait while commands are waiting"""
+        self.governor = governor.Governor(rate=100, burst=1, reserve=0)
+        order = []
+
+        async def acquire(priority):
+            await self.governor.async_acquire(priority)
+            order.append(priority)
+
+        await acquire(governor.PRIORITY_COMMAND)
+        await asyncio.gather(
+            acquire(governor.PRIORITY_POLL),
+            acquire(governor.PRIORITY_COMMAND),
+        )
+
+        self.assertEqual(
+            [governor.PRIORITY_COMMAND, governor.PRIORITY_COMMAND, governor.PRIORITY_POLL],
+            order
+        )
+
+    async def test_retry_after(self):
+        """Test that every request is held back after HTTP 429"""
+        self.governor.record_response(429, {"Retry-After": "60"})
+
+        self.assertEqual(60, self.governor.delay(governor.PRIORITY_POLL))
+        self.assertEqual(1, self.governor.as_dict()["throttled"])
+
+        with self.assertRaises(exception.CloudUnavailableException):
+            await self.governor.async_acquire(governor.PRIORITY_COMMAND)
+
+        self.clock.now = 60
+        self.assertEqual(0, self.governor.delay(governor.PRIORITY_COMMAND))
+
+    def test_retry_after_default(self):
+        """Test that HTTP 429 without Retry-After backs off anyway"""
+        self.governor.record_response(429, {})
+
+        self.assertEqual(
+            governor.RETRY_AFTER_DEFAULT,
+            self.governor.delay(governor.PRIORITY_COMMAND)
+        )
+
+    def test_quota(self):
+        """Test that no more requests are sent than the cloud accepts"""
+        self.governor.record_response(200, {"X-RateLimit-Remaining": "1"})
+        self.assertEqual(2, self.governor.delay(governor.PRIORITY_POLL))
+
+        self.governor.record_response(
+            200,
+            {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"}
+        )
+        self.assertEqual(30, self.governor.delay(governor.PRIORITY_COMMAND))
+        self.assertEqual(30, self.governor.as_dict()["paused_for"])
+
+if __name__ == '__main__':
+    unittest.main()
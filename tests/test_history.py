@@ -0,0 +1,57 @@
+"""Test the history module"""
+import unittest
+from datetime import datetime
+from homeassistant.components.vacuum import VacuumActivity
+from purei9_unofficial.common import CleaningSession
+from custom_components.purei9 import history
+
+def create_session(day):
+    """Create a cleaning session that ended on a specific day"""
+    return CleaningSession(endtime=datetime(2024, 1, day), duration=60, cleandearea=10)
+
+class TestHistory(unittest.TestCase):
+    """Tests for the history module"""
+    data_should_fetch = [
+        (None, VacuumActivity.DOCKED, False, True),
+        (VacuumActivity.CLEANING, VacuumActivity.DOCKED, True, True),
+        (VacuumActivity.RETURNING, VacuumActivity.IDLE, True, True),
+        (VacuumActivity.CLEANING, VacuumActivity.PAUSED, True, False),
+        (VacuumActivity.DOCKED, VacuumActivity.DOCKED, True, False),
+        (VacuumActivity.DOCKED, VacuumActivity.CLEANING, True, False),
+    ]
+
+    def test_should_fetch(self):
+        """Test the should_fetch function"""
+        for previous_state, state, fetched, expected in self.data_should_fetch:
+            with self.subTest():
+                self.assertEqual(expected, history.should_fetch(previous_state, state, fetched))
+
+    def test_merge_sessions(self):
+        """Test that only newer sessions are added, newest first"""
+        known = [create_session(3), create_session(2)]
+        downloaded = [create_session(5), create_session(3), create_session(4), create_session(1)]
+
+        merged = history.merge_sessions(known, downloaded)
+
+        self.assertEqual([5, 4, 3, 2], [session.endtime.day for session in merged])
+
+    def test_merge_sessions_limit(self):
+        """Test that the history does not grow forever"""
+        downloaded = [create_session(day) for day in range(1, 11)]
+
+        merged = history.merge_sessions([], downloaded, 3)
+
+        self.assertEqual([10, 9, 8], [session.endtime.day for session in merged])
+
+    def test_session_serialization(self):
+        """Test that sessions survive a round trip to the store"""
+        session = create_session(7)
+
+        result = history.session_from_dict(history.session_to_dict(session))
+
+        self.assertEqual(session.endtime, result.endtime)
+        self.assertEqual(session.duration, result.duration)
+        self.assertEqual(session.cleandearea, result.cleandearea)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""Test the setup of the integration"""
+import os
+import tempfile
+import unittest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from custom_components.purei9 import async_rediscover, async_remove_entry, const, pool, snapshot
+from tests.fakes import FakeHass
+
+class FakeStore:
+    """A store that keeps everything in memory"""
+    def __init__(self, data):
+        self.data = data
+
+    async def async_load(self):
+        """Load what was saved"""
+        return self.data
+
+    def async_delay_save(self, data_func, _delay):
+        """Save right away"""
+        self.data = data_func()
+
+    async def async_remove(self):
+        """Forget what was saved"""
+        self.data = None
+
+# pylint: disable=too-few-public-methods
+class FakeCloudApi:
+    """Discovers a fixed set of robots"""
+    def __init__(self, robot_ids):
+        self.robot_ids = robot_ids
+
+    async def async_get_robot_ids(self, _device_types):
+        """Discover the robots"""
+        return self.robot_ids
+
+# pylint: disable=too-few-public-methods
+class FakeConfigEntries:
+    """Records reloads"""
+    def __init__(self):
+        self.reloads = []
+
+    def async_schedule_reload(self, entry_id):
+        """Schedule a reload"""
+        self.reloads.append(entry_id)
+
+# pylint: disable=too-few-public-methods
+# pylint: disable=too-few-public-methods
+class FakeConfigEntry:
+    """A config entry"""
+    entry_id = "entry"
+
+# pylint: disable=too-few-public-methods
+class FakeCoordinator:
+    """A coordinator that has not polled yet"""
+    data = None
+
+    def async_add_listener(self, _listener):
+        """Listen to updates"""
+        return lambda: None
+
+class TestInit(unittest.IsolatedAsyncioTestCase):
+    """Tests for the setup of the integration"""
+    def setUp(self):
+        # pylint: disable=protected-access
+        self.snapshot_store = snapshot.SnapshotStore.__new__(snapshot.SnapshotStore)
+        self.snapshot_store._store = FakeStore({"robots": [{"unique_id": "old"}]})
+        self.snapshot_store._coordinators = []
+        self.hass = FakeHass(config_entries=FakeConfigEntries())
+
+    async def rediscover(self, discovered):
+        """Rediscover after starting from the snapshot"""
+        await async_rediscover(
+            self.hass,
+            FakeConfigEntry(),
+            FakeCloudApi(discovered),
+            ["old"],
+            None,
+            self.snapshot_store
+        )
+
+    async def test_rediscover_changed(self):
+        """Test that the snapshot is dropped when the robots have changed"""
+        self.snapshot_store.async_track([FakeCoordinator()])
+        await self.rediscover(["old", "new"])
+
+        self.assertEqual(["entry"], self.hass.config_entries.reloads)
+        self.assertEqual({}, await self.snapshot_store.async_load())
+
+        # A save that was scheduled before the reload does not bring it back
+        # pylint: disable=protected-access
+        self.snapshot_store._async_schedule_save()
+        self.assertEqual({}, await self.snapshot_store.async_load())
+
+    async def test_rediscover_unchanged(self):
+        """Test that nothing happens when the robots are the same"""
+        await self.rediscover(["old"])
+
+        self.assertEqual([], self.hass.config_entries.reloads)
+        self.assertIsNotNone(self.snapshot_store._store.data) # pylint: disable=protected-access
+
+class TestRemoveEntry(unittest.IsolatedAsyncioTestCase):
+    """Tests for removing the integration"""
+    async def asyncSetUp(self):
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.hass = HomeAssistant(self.directory.name)
+
+    async def asyncTearDown(self):
+        await self.hass.async_stop(force=True)
+        self.directory.cleanup()
+
+    async def save(self, key, data):
+        """Save to a store"""
+        await Store(self.hass, 1, f"{const.DOMAIN}.{key}").async_save(data)
+
+    def exists(self, key):
+        """If a store has been saved"""
+        return os.path.exists(self.hass.config.path(".storage", f"{const.DOMAIN}.{key}"))
+
+    async def test_remove_entry(self):
+        """Test that the data of the robots is removed, unless another account has them"""
+        await self.save("entry.device_types", {"device_types": {
+            robot_id: {"device_type": "PUREi9", "fetched_at": 0} for robot_id in ("1", "2")
+        }})
+
+        for robot_id in ("1", "2"):
+            await self.save(f"{robot_id}.history", {"sessions": []})
+            await self.save(f"{robot_id}.maps", {"maps": []})
+
+        pool.async_get_robot_pool(self.hass).claim_robots("other", ["2"])
+        await async_remove_entry(self.hass, FakeConfigEntry())
+
+        self.assertFalse(self.exists("entry.device_types"))
+        self.assertFalse(self.exists("1.history"))
+        self.assertFalse(self.exists("1.maps"))
+        self.assertTrue(self.exists("2.history"))
+        self.assertTrue(self.exists("2.maps"))
+
+if __name__ == '__main__':
+    unittest.main()
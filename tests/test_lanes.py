@@ -0,0 +1,70 @@
+"""Test the lanes module"""
+import asyncio
+import unittest
+from custom_components.purei9 import lanes
+
+class TestLanes(unittest.IsolatedAsyncioTestCase):
+    """Tests for the lanes module"""
+    data_lane_limit = [
+        (0, lanes.LANE_LIMIT_MIN),
+        (5, 5),
+        (500, lanes.LANE_LIMIT_MAX),
+    ]
+
+    def test_lane_limit(self):
+        """Test that lanes are sized from the number of robots"""
+        for robot_count, expected in self.data_lane_limit:
+            with self.subTest():
+                self.assertEqual(expected, lanes.lane_limit(robot_count))
+
+    async def test_limit(self):
+        """Test that only a limited number of requests are let through"""
+        lane = lanes.Lane("test", 2)
+        running = []
+        max_running = []
+
+        async def request():
+            async with lane.async_acquire():
+                running.append(None)
+                max_running.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        await asyncio.gather(*[request() for _ in range(6)])
+
+        self.assertEqual(2, max(max_running))
+        self.assertEqual(4, lane.as_dict()["max_depth"])
+        self.assertEqual(6, lane.as_dict()["wait"]["count"])
+        self.assertEqual(0, lane.as_dict()["in_flight"])
+
+    async def test_cancel(self):
+        """Test that a cancelled request gives up its place in the lane"""
+        lane = lanes.Lane("test", 1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with lane.async_acquire():
+                await release.wait()
+
+        async def wait():
+            async with lane.async_acquire():
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+
+        self.assertEqual(1, lane.depth)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(0, lane.depth)
+
+        release.set()
+        await holder
+
+        # The lane is free again
+        await asyncio.wait_for(wait(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,336 @@
+"""Test the local module"""
+import asyncio
+import datetime
+import json
+import os
+import socket
+import ssl
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from purei9_unofficial.common import BatteryStatus, PowerMode, RobotStates
+from purei9_unofficial.message import BinaryMessage
+from custom_components.purei9 import exception, lanes, local, purei9
+from tests.fakes import FakeHass
+
+PASSWORD = "secret"
+
+def create_certificate(directory):
+    """Create a self-signed certificate, like the one of a robot"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "robot")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+
+    with open(cert_path, "wb") as file:
+        file.write(cert.public_bytes(serialization.Encoding.PEM))
+
+    with open(key_path, "wb") as file:
+        file.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ))
+
+    return cert_path, key_path
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class FakeRobotServer:
+    """Stands in for a robot on the local network"""
+    def __init__(self, cert_path, key_path):
+        self.status = RobotStates.Charging
+        self.battery = BatteryStatus.High
+        self.power_mode = PowerMode.MEDIUM
+        self.commands = []
+        self.connections = 0
+        self.closed = threading.Event()
+        # Requests that the robot handles without answering
+        self.silent = set()
+        self._context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self._context.load_cert_chain(cert_path, key_path)
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop accepting connections"""
+        # Shutting down wakes up the thread waiting for connections
+        self._socket.shutdown(socket.SHUT_RDWR)
+        self._socket.close()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with self._context.wrap_socket(conn, server_side=True) as tls:
+            stream = tls.makefile("rwb")
+
+            try:
+                while True:
+                    msg = BinaryMessage.from_stream(stream)
+                    reply = self._reply(msg)
+
+                    if msg.minor in self.silent:
+                        continue
+
+                    stream.write(reply.to_wire())
+                    stream.flush()
+            # The client closes the connection
+            # pylint: disable=broad-except
+            except Exception:
+                self.closed.set()
+
+    # pylint: disable=too-many-return-statements
+    def _reply(self, msg):
+        if msg.minor == BinaryMessage.MSG_HELLO:
+            return BinaryMessage.Text(msg.minor, "local-id", msg.user1)
+
+        if msg.minor == BinaryMessage.MSG_LOGIN:
+            return BinaryMessage.HeaderOnly(msg.minor, int(msg.parsed == PASSWORD))
+
+        if msg.minor == BinaryMessage.MSG_GETNAME:
+            return BinaryMessage.Text(msg.minor, "Robot")
+
+        if msg.minor == BinaryMessage.MSG_GETFIRMWARE:
+            return BinaryMessage.StringMap(msg.minor, {"FirmwareVersion": "1.0"})
+
+        if msg.minor == BinaryMessage.MSG_GET_CAPABILITIES_REQUEST:
+            return BinaryMessage.Text(msg.minor, json.dumps({"Capabilities": ["PowerLevels"]}))
+
+        if msg.minor == BinaryMessage.MSG_GETSTATUS:
+            return BinaryMessage.HeaderOnly(msg.minor, self.status.value)
+
+        if msg.minor == BinaryMessage.MSG_GET_BATTERY_STATUS_REQUEST:
+            return BinaryMessage.HeaderOnly(msg.minor, self.battery.value)
+
+        if msg.minor == BinaryMessage.MSG_GET_POWER_MODE_REQUEST:
+            return BinaryMessage.HeaderOnly(msg.minor, self.power_mode.value)
+
+        if msg.minor == BinaryMessage.MSG_SET_POWER_MODE_REQUEST:
+            self.power_mode = PowerMode(msg.user1)
+            return BinaryMessage.HeaderOnly(BinaryMessage.MSG_SET_POWER_MODE_RESPONSE)
+
+        if msg.minor == BinaryMessage.MSG_STARTCLEAN:
+            self.commands.append(msg.user1)
+
+        return BinaryMessage.HeaderOnly(msg.minor)
+
+# pylint: disable=too-few-public-methods
+class FakeCloudRobot:
+    """Stands in for the robot in the cloud"""
+    api = None
+
+    def __init__(self):
+        self.calls = []
+
+    def getid(self):
+        """Get the robot's id"""
+        return "cloud-id"
+
+    async def async_getinfo(self):
+        """Get the appliance state document"""
+        self.calls.append("getinfo")
+
+        return {
+            "applianceId": "cloud-id",
+            "connectionState": "Connected",
+            "properties": {
+                "reported": {
+                    "applianceName": "Robot",
+                    "capabilities": {"PowerLevels": {}},
+                    "firmwareVersion": "1.0",
+                    "batteryStatus": BatteryStatus.Normal.value,
+                    "robotStatus": RobotStates.Sleeping.value,
+                    "powerMode": PowerMode.HIGH.value,
+                    "dustbinStatus": "full",
+                }
+            }
+        }
+
+    async def async_startclean(self):
+        """Start cleaning"""
+        self.calls.append("startclean")
+
+    async def async_setpowermode(self, _mode):
+        """Set the power mode"""
+        self.calls.append("setpowermode")
+
+class TestLocal(unittest.IsolatedAsyncioTestCase):
+    """Tests for the local module"""
+    async def asyncSetUp(self):
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = FakeRobotServer(*create_certificate(self.directory.name))
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.hass = FakeHass({lanes.DATA_LOCAL_EXECUTOR: self.executor})
+        self.cloud = FakeCloudRobot()
+        self.robot = local.LocalFirstRobot(self.cloud)
+
+    async def asyncTearDown(self):
+        await self.robot.async_close()
+        self.server.close()
+        self.executor.shutdown(wait=False)
+        self.directory.cleanup()
+
+    def attach(self, password=PASSWORD, port=None):
+        """Attach the stand-in robot"""
+        self.robot.attach_local(local.LocalRobot(
+            self.hass,
+            "cloud-id",
+            "127.0.0.1",
+            password,
+            port or self.server.port
+        ))
+
+    async def test_getinfo(self):
+        """Test that the state is read from the robot in the same shape as the cloud"""
+        self.attach()
+        appliance = await self.robot.async_getinfo()
+        params = purei9.params_create("cloud-id", appliance)
+
+        self.assertEqual([], self.cloud.calls)
+        self.assertEqual("Robot", params.name)
+        self.assertEqual("1.0", params.firmware)
+        self.assertEqual(
+            purei9.fan_speed_to_hass(params.fan_speed_list, PowerMode.MEDIUM),
+            params.fan_speed
+        )
+        self.assertEqual(purei9.Dustbin.UNKNOWN, params.dustbin)
+
+    async def test_getinfo_keeps_cloud_properties(self):
+        """Test that what the robot does not report locally is kept from the cloud"""
+        await self.robot.async_getinfo()
+        self.attach()
+        appliance = await self.robot.async_getinfo()
+
+        self.assertEqual("full", appliance["properties"]["reported"]["dustbinStatus"])
+        self.assertEqual(
+            RobotStates.Charging.value,
+            appliance["properties"]["reported"]["robotStatus"]
+        )
+
+    async def test_reuses_connection(self):
+        """Test that the connection to the robot is kept between calls"""
+        self.attach()
+        await self.robot.async_getinfo()
+        await self.robot.async_getinfo()
+
+        self.assertEqual(1, self.server.connections)
+
+    async def test_commands(self):
+        """Test that commands are sent to the robot"""
+        self.attach()
+        await self.robot.async_startclean()
+        await self.robot.async_gohome()
+        await self.robot.async_setpowermode(PowerMode.HIGH)
+
+        self.assertEqual([1, 3], self.server.commands)
+        self.assertEqual(PowerMode.HIGH, self.server.power_mode)
+        self.assertEqual([], self.cloud.calls)
+
+    async def test_fallback_bad_password(self):
+        """Test that the cloud is used when the robot refuses the password"""
+        self.attach(password="wrong")
+        await self.robot.async_startclean()
+        await self.robot.async_getinfo()
+
+        self.assertEqual(["startclean", "getinfo"], self.cloud.calls)
+        self.assertEqual(1, self.server.connections)
+
+    async def test_fallback_unreachable(self):
+        """Test that the cloud is used when the robot can't be reached"""
+        # Nothing listens on a port that was just released
+        with socket.create_server(("127.0.0.1", 0)) as unused:
+            port = unused.getsockname()[1]
+
+        self.attach(port=port)
+        appliance = await self.robot.async_getinfo()
+
+        self.assertEqual(["getinfo"], self.cloud.calls)
+        self.assertEqual("full", appliance["properties"]["reported"]["dustbinStatus"])
+
+    async def test_fallback_stuck(self):
+        """Test that a robot that never answers does not hold up the executor"""
+        with socket.create_server(("127.0.0.1", 0)) as stuck:
+            self.attach(port=stuck.getsockname()[1])
+
+            with unittest.mock.patch.object(local, "LOCAL_TIMEOUT", 0.2):
+                await self.robot.async_startclean()
+
+            self.assertEqual(["startclean"], self.cloud.calls)
+
+            # The thread is free again once the socket has timed out
+            async with asyncio.timeout(1):
+                await asyncio.get_running_loop().run_in_executor(self.executor, lambda: None)
+
+    async def test_no_resend(self):
+        """Test that a command that may have reached the robot is not sent again"""
+        self.server.silent.add(BinaryMessage.MSG_STARTCLEAN)
+        self.attach()
+
+        with unittest.mock.patch.object(local, "LOCAL_TIMEOUT", 0.5):
+            with self.assertRaises(exception.LocalCommandException):
+                await self.robot.async_startclean()
+
+        self.assertEqual([1], self.server.commands)
+        self.assertEqual([], self.cloud.calls)
+
+    async def test_timeout_closes_connection(self):
+        """Test that the connection of a call that timed out is closed"""
+        self.attach()
+        await self.robot.async_getinfo()
+        self.server.silent.add(BinaryMessage.MSG_GETSTATUS)
+
+        # The connection was made with a longer timeout on the socket
+        with unittest.mock.patch.object(local, "LOCAL_TIMEOUT", 0.2):
+            await self.robot.async_getinfo()
+
+        self.assertEqual(["getinfo"], self.cloud.calls)
+        self.assertTrue(await asyncio.to_thread(self.server.closed.wait, 1))
+
+    async def test_resend_power_mode(self):
+        """Test that setting the power mode, which can be repeated, falls back to the cloud"""
+        self.server.silent.add(BinaryMessage.MSG_SET_POWER_MODE_REQUEST)
+        self.attach()
+
+        with unittest.mock.patch.object(local, "LOCAL_TIMEOUT", 0.5):
+            await self.robot.async_setpowermode(PowerMode.HIGH)
+
+        self.assertEqual(PowerMode.HIGH, self.server.power_mode)
+        self.assertEqual(["setpowermode"], self.cloud.calls)
+
+    async def test_cloud_only(self):
+        """Test that the cloud is used until the robot is found on the local network"""
+        await self.robot.async_startclean()
+
+        self.assertEqual(["startclean"], self.cloud.calls)
+        self.assertEqual(0, self.server.connections)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Test the maps module"""
+import unittest
+from homeassistant.components.vacuum import VacuumActivity
+from custom_components.purei9 import maps
+
+class FakeStore:
+    """A store that keeps everything in memory"""
+    def __init__(self):
+        self.saved = None
+
+    async def async_load(self):
+        """Nothing has been saved before"""
+        return None
+
+    def async_delay_save(self, data_func, _delay):
+        """Save right away"""
+        self.saved = data_func()
+
+def create_map(map_id, revision, zones):
+    """Create an interactive map as returned by the cloud"""
+    return {
+        "id": map_id,
+        "name": f"Map {map_id}",
+        "sequenceNumber": revision,
+        "zones": [{"id": zone, "name": f"Zone {zone}", "zoneType": "clean"} for zone in zones],
+    }
+
+class TestMaps(unittest.IsolatedAsyncioTestCase):
+    """Tests for the maps module"""
+    data_should_fetch = [
+        (None, VacuumActivity.DOCKED, None, 0, True),
+        (VacuumActivity.DOCKED, VacuumActivity.DOCKED, 0, maps.MAPS_MAX_AGE + 1, True),
+        (VacuumActivity.CLEANING, VacuumActivity.DOCKED, 0, 60, True),
+        (VacuumActivity.DOCKED, VacuumActivity.DOCKED, 0, 60, False),
+        (VacuumActivity.CLEANING, VacuumActivity.CLEANING, 0, 60, False),
+    ]
+
+    def test_should_fetch(self):
+        """Test the should_fetch function"""
+        for previous_state, state, fetched_at, now, expected in self.data_should_fetch:
+            with self.subTest():
+                self.assertEqual(
+                    expected,
+                    maps.should_fetch(previous_state, state, fetched_at, now)
+                )
+
+    async def test_map_cache(self):
+        """Test that maps are only parsed again when their revision changes"""
+        # pylint: disable=protected-access
+        cache = maps.MapCache.__new__(maps.MapCache)
+        cache._store = FakeStore()
+        cache._maps = ()
+        cache._fetched_at = None
+        await cache.async_load()
+
+        self.assertTrue(cache.update([create_map("1", 1, ["a"]), create_map("2", 1, ["b"])]))
+        first_map = cache.maps[0]
+        self.assertEqual(["Zone a"], [zone["name"] for zone in first_map["zones"]])
+
+        # Nothing changed
+        unchanged = cache.maps
+        self.assertFalse(cache.update([create_map("1", 1, ["a"]), create_map("2", 1, ["b"])]))
+        self.assertIs(unchanged, cache.maps)
+
+        # Only the second map changed
+        self.assertTrue(cache.update([create_map("1", 1, ["a"]), create_map("2", 2, ["b", "c"])]))
+        self.assertIs(first_map, cache.maps[0])
+        self.assertEqual(2, len(cache.maps[1]["zones"]))
+        self.assertEqual(2, len(cache._store.saved["maps"]))
+
+    async def test_map_cache_no_revision(self):
+        """Test that maps without a revision are compared on their content"""
+        # pylint: disable=protected-access
+        cache = maps.MapCache.__new__(maps.MapCache)
+        cache._store = FakeStore()
+        cache._maps = ()
+        cache._fetched_at = None
+        await cache.async_load()
+
+        self.assertTrue(cache.update([create_map("1", None, ["a"])]))
+
+        unchanged = cache.maps
+        self.assertFalse(cache.update([create_map("1", None, ["a"])]))
+        self.assertIs(unchanged, cache.maps)
+
+        self.assertTrue(cache.update([create_map("1", None, ["a", "b"])]))
+        self.assertEqual(["Zone a", "Zone b"], [zone["name"] for zone in cache.maps[0]["zones"]])
+
+if __name__ == '__main__':
+    unittest.main()
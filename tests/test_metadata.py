@@ -0,0 +1,36 @@
+"""Test the metadata module"""
+import unittest
+from custom_components.purei9 import metadata, purei9
+
+REPORTED = {
+    "firmwareVersion": "1.0",
+    "capabilities": {"PowerLevels": {}},
+}
+
+class TestMetadata(unittest.TestCase):
+    """Tests for the metadata module"""
+    def test_metadata_create(self):
+        """Test to parse the static properties"""
+        robot_metadata = metadata.metadata_create(REPORTED, 100)
+
+        self.assertEqual("1.0", robot_metadata.firmware)
+        self.assertEqual(
+            (purei9.POWER_MODE_QUIET, purei9.POWER_MODE_SMART, purei9.POWER_MODE_POWER),
+            robot_metadata.fan_speed_list
+        )
+
+    data_metadata_valid = [
+        (None, REPORTED, 0, False),
+        (metadata.RobotMetadata("1.0", (), 0), REPORTED, 60, True),
+        (metadata.RobotMetadata("0.9", (), 0), REPORTED, 60, False),
+        (metadata.RobotMetadata("1.0", (), 0), REPORTED, metadata.METADATA_MAX_AGE, False),
+    ]
+
+    def test_metadata_valid(self):
+        """Test that static properties are parsed again after a firmware update or daily"""
+        for robot_metadata, reported, now, expected in self.data_metadata_valid:
+            with self.subTest():
+                self.assertEqual(expected, metadata.metadata_valid(robot_metadata, reported, now))
+
+if __name__ == '__main__':
+    unittest.main()
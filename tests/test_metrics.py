@@ -0,0 +1,51 @@
+"""Test the metrics module"""
+import asyncio
+import unittest
+from custom_components.purei9 import metrics
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    """Tests for the metrics module"""
+    def test_record(self):
+        """Test that latencies are counted in the right buckets"""
+        stats = metrics.CallStats()
+
+        stats.record(0.05, metrics.OUTCOME_SUCCESS)
+        stats.record(0.3, metrics.OUTCOME_SUCCESS)
+        stats.record(20, metrics.OUTCOME_TIMEOUT)
+        stats.record(1, metrics.OUTCOME_FAILURE)
+
+        self.assertEqual([1, 0, 1, 1, 0, 0, 0, 1], stats.buckets)
+        self.assertEqual(4, stats.count)
+        self.assertEqual(0.5, stats.error_rate)
+        self.assertEqual(20, stats.max_latency)
+        self.assertEqual(1, stats.last_latency)
+        self.assertEqual(1, stats.as_dict()["histogram"][">10"])
+
+    def test_error_rate_empty(self):
+        """Test that there is no error rate before any calls"""
+        self.assertIsNone(metrics.CallStats().error_rate)
+
+    async def test_measure(self):
+        """Test that the outcome of a call is recorded"""
+        call_metrics = metrics.Metrics()
+
+        async with call_metrics.async_measure("call"):
+            await asyncio.sleep(0)
+
+        with self.assertRaises(TimeoutError):
+            async with call_metrics.async_measure("call"):
+                raise TimeoutError()
+
+        with self.assertRaises(ValueError):
+            async with call_metrics.async_measure("call"):
+                raise ValueError()
+
+        stats = call_metrics.stats("call")
+
+        self.assertEqual(1, stats.successes)
+        self.assertEqual(1, stats.timeouts)
+        self.assertEqual(1, stats.failures)
+        self.assertEqual(["call"], list(call_metrics.as_dict()))
+
+if __name__ == '__main__':
+    unittest.main()
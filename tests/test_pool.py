@@ -0,0 +1,27 @@
+"""Test the pool module"""
+import unittest
+from custom_components.purei9 import pool
+
+class TestPool(unittest.TestCase):
+    """Tests for the pool module"""
+    def setUp(self):
+        self.pool = pool.RobotPool()
+
+    def test_claim_robots(self):
+        """Test that a robot seen by two accounts is only set up once"""
+        self.assertEqual(["1", "2"], self.pool.claim_robots("a", ["1", "2"]))
+        self.assertEqual(["3"], self.pool.claim_robots("b", ["2", "3"]))
+        self.assertEqual(["1", "2"], self.pool.claim_robots("a", ["1", "2"]))
+        self.assertEqual({"robots": 3, "config_entries": 2}, self.pool.as_dict())
+
+    def test_release(self):
+        """Test that the robots of a config entry can be claimed once it's gone"""
+        self.pool.claim_robots("a", ["1", "2"])
+        self.pool.claim_robots("b", ["2", "3"])
+
+        self.assertEqual(["3"], self.pool.unclaimed("b", ["2", "3"]))
+        self.pool.release("a")
+        self.assertEqual(["2", "3"], self.pool.unclaimed("b", ["2", "3"]))
+
+if __name__ == '__main__':
+    unittest.main()
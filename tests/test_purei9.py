@@ -1,4 +1,5 @@
 """Test the purei9 module"""
+import dataclasses
 import unittest
 from purei9_unofficial.common import BatteryStatus, RobotStates, PowerMode, DustbinStates
 from homeassistant.components.vacuum import VacuumActivity
@@ -40,16 +41,48 @@ class TestPureI9(unittest.TestCase):
         unique_id = "bar"
         name = "foo"
 
-        params = purei9.Params(unique_id, name, list([PowerMode.MEDIUM.name]))
+        params = purei9.Params(unique_id, name, tuple([PowerMode.MEDIUM.name]))
 
         # No need to test every property. The test will become too fragile.
         self.assertEqual(unique_id, params.unique_id)
         self.assertEqual(name, params.name)
 
-        # Attempt to set a new name
+        # Params are immutable, a new name means new params
         new_name = "hello,world"
-        params.name = new_name
-        self.assertEqual(new_name, params.name)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            params.name = new_name
+
+        new_params = dataclasses.replace(params, name=new_name)
+        self.assertEqual(new_name, new_params.name)
+        self.assertEqual(name, params.name)
+
+    def test_params_reuse(self):
+        """Test that unchanged parts are shared with the previous params"""
+        previous = purei9.Params("bar", "foo", (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER))
+
+        same = purei9.Params("bar", "foo", (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER))
+        self.assertIs(previous, purei9.params_reuse(previous, same))
+
+        changed = purei9.Params(
+            "bar",
+            "foo",
+            (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER),
+            battery=20
+        )
+        result = purei9.params_reuse(previous, changed)
+        self.assertEqual(20, result.battery)
+        self.assertIs(previous.fan_speed_list, result.fan_speed_list)
+
+    def test_params_fingerprint(self):
+        """Test that the fingerprint only changes with the selected fields"""
+        params = purei9.Params("bar", "foo", ())
+        fingerprint = params.fingerprint(("battery", "name"))
+
+        params = dataclasses.replace(params, dustbin=purei9.Dustbin.FULL)
+        self.assertEqual(fingerprint, params.fingerprint(("battery", "name")))
+
+        params = dataclasses.replace(params, battery=20)
+        self.assertNotEqual(fingerprint, params.fingerprint(("battery", "name")))
 
     data_is_power_mode_v2 = [
         (list([1, 2, 3]), True),
@@ -118,5 +151,58 @@ class TestPureI9(unittest.TestCase):
             with self.subTest():
                 self.assertEqual(expected, purei9.dustbin_to_hass(dustbin))
 
+    data_dustbin_from_reported = [
+        ("connected", DustbinStates.connected),
+        ("full", DustbinStates.full),
+        ("notConnected", DustbinStates.empty),
+        ("foo", DustbinStates.unset),
+    ]
+
+    def test_dustbin_from_reported(self):
+        """Test to parse a dustbin value reported by the appliance"""
+        for dustbin, expected in self.data_dustbin_from_reported:
+            with self.subTest():
+                self.assertEqual(expected, purei9.dustbin_from_reported(dustbin))
+
+    data_power_mode_from_reported = [
+        ({"powerMode": 1}, PowerMode.LOW),
+        ({"ecoMode": True}, PowerMode.MEDIUM),
+        ({"ecoMode": False}, PowerMode.HIGH),
+        ({}, PowerMode.MEDIUM),
+    ]
+
+    def test_power_mode_from_reported(self):
+        """Test to parse a power mode reported by the appliance"""
+        for reported, expected in self.data_power_mode_from_reported:
+            with self.subTest():
+                self.assertEqual(expected, purei9.power_mode_from_reported(reported))
+
+    def test_params_create(self):
+        """Test to create params from an appliance state document"""
+        appliance = {
+            "connectionState": "Connected",
+            "properties": {
+                "reported": {
+                    "applianceName": "foo",
+                    "firmwareVersion": "42.3",
+                    "batteryStatus": BatteryStatus.High.value,
+                    "robotStatus": RobotStates.Sleeping.value,
+                    "dustbinStatus": "connected",
+                    "powerMode": PowerMode.LOW.value,
+                    "capabilities": {"PowerLevels": {}},
+                }
+            }
+        }
+
+        params = purei9.params_create("bar", appliance)
+
+        self.assertEqual("bar", params.unique_id)
+        self.assertEqual("foo", params.name)
+        self.assertEqual(VacuumActivity.DOCKED, params.state)
+        self.assertEqual(100, params.battery)
+        self.assertEqual(purei9.POWER_MODE_QUIET, params.fan_speed)
+        self.assertEqual(purei9.Dustbin.CONNECTED, params.dustbin)
+        self.assertTrue(params.available)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+"""Test the scheduler module"""
+import unittest
+from datetime import timedelta
+from homeassistant.components.vacuum import VacuumActivity
+from custom_components.purei9 import scheduler, purei9, const
+
+def create_params(state, battery):
+    """Create params with a state and battery level"""
+    return purei9.Params("foo", "bar", (), state=state, battery=battery)
+
+class TestScheduler(unittest.TestCase):
+    """Tests for the scheduler module"""
+    data_poll_interval = [
+        (create_params(VacuumActivity.CLEANING, 40), 0, 15),
+        (create_params(VacuumActivity.RETURNING, 20), 0, 15),
+        (create_params(VacuumActivity.DOCKED, 100), 0, 600),
+        (create_params(VacuumActivity.DOCKED, 80), 0, 60),
+        (create_params(VacuumActivity.IDLE, 100), 0, 60),
+        (None, 0, 60),
+        (create_params(VacuumActivity.CLEANING, 40), 2, 60),
+        (create_params(VacuumActivity.IDLE, 100), 10, 1800),
+        (create_params(VacuumActivity.DOCKED, 100), 10, 1800),
+    ]
+
+    def test_poll_interval(self):
+        """Test the poll_interval function"""
+        for params, failures, expected in self.data_poll_interval:
+            with self.subTest():
+                self.assertEqual(
+                    timedelta(seconds=expected),
+                    scheduler.poll_interval(params, failures, {})
+                )
+
+    def test_poll_interval_options(self):
+        """Test that the poll interval can be configured"""
+        params = create_params(VacuumActivity.CLEANING, 40)
+        options = {const.CONF_POLL_INTERVAL_ACTIVE: 5}
+
+        self.assertEqual(timedelta(seconds=5), scheduler.poll_interval(params, 0, options))
+
+    def test_poll_interval_push(self):
+        """Test that polling is slow while updates are pushed"""
+        params = create_params(VacuumActivity.CLEANING, 40)
+
+        self.assertEqual(
+            timedelta(seconds=scheduler.POLL_INTERVAL_PUSH),
+            scheduler.poll_interval(params, 0, {}, True)
+        )
+
+    def test_confirm_delays(self):
+        """Test that confirmation polls are spaced exponentially until the deadline"""
+        self.assertEqual([2, 4, 8, 16], list(scheduler.confirm_delays(2, 30)))
+        self.assertEqual([2, 4, 8, 16], list(scheduler.confirm_delays(2, 60)))
+        self.assertEqual([], list(scheduler.confirm_delays(2, 1)))
+
+    data_staggered_delay = [
+        (60, 0.0, 0, 60),
+        (60, 0.0, 30, 30),
+        (60, 0.5, 0, 30),
+        (60, 0.5, 29.5, 60.5),
+        (60, 0.25, 100, 35),
+    ]
+
+    def test_staggered_delay(self):
+        """Test that polls happen at a fixed phase of the interval"""
+        for interval, phase, now, expected in self.data_staggered_delay:
+            with self.subTest():
+                self.assertAlmostEqual(
+                    expected,
+                    scheduler.staggered_delay(interval, phase, now)
+                )
+
+    def test_poll_stagger(self):
+        """Test that pollers are spread evenly over the interval"""
+        stagger = scheduler.PollStagger()
+        unregister = [stagger.register(poller) for poller in ("a", "b", "c", "d")]
+
+        self.assertEqual(
+            [0, 0.25, 0.5, 0.75],
+            [stagger.phase(poller) for poller in ("a", "b", "c", "d")]
+        )
+        self.assertEqual(
+            timedelta(seconds=15),
+            stagger.delay("b", timedelta(seconds=60), 0)
+        )
+
+        unregister[0]()
+
+        self.assertEqual(0.0, stagger.phase("a"))
+        self.assertAlmostEqual(1 / 3, stagger.phase("c"))
+
+if __name__ == '__main__':
+    unittest.main()
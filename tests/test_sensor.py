@@ -0,0 +1,54 @@
+"""Test the sensor module"""
+import unittest
+from dataclasses import replace
+from custom_components.purei9 import coordinator, metrics, purei9, sensor
+
+# pylint: disable=too-few-public-methods
+class FakeCoordinator:
+    """Only what the sensors need"""
+    def __init__(self, params):
+        self.data = params
+        self.last_update_success = True
+        self.metrics = metrics.Metrics()
+
+class TestSensor(unittest.TestCase):
+    """Tests for the sensor module"""
+    def setUp(self):
+        params = purei9.Params("foo", "Robot", (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER))
+        self.coordinator = FakeCoordinator(params)
+        self.sensor = sensor.PureI9PollLatency(self.coordinator, params)
+        self.states = []
+        self.sensor.async_write_ha_state = lambda: self.states.append(
+            (self.sensor.name, self.sensor.native_value, self.sensor.extra_state_attributes)
+        )
+
+    def poll(self, latency, success=True, name="Robot"):
+        """Deliver a poll that took some time"""
+        self.coordinator.metrics.record(
+            coordinator.METRIC_POLL,
+            latency,
+            metrics.OUTCOME_SUCCESS if success else metrics.OUTCOME_FAILURE
+        )
+        self.coordinator.data = replace(self.coordinator.data, name=name)
+        self.coordinator.last_update_success = success
+        # pylint: disable=protected-access
+        self.sensor._handle_coordinator_update()
+
+    def test_diagnostic_sensor(self):
+        """Test that the name and the stale attribute follow the value"""
+        self.poll(0.1)
+        self.poll(0.2, name="Renamed")
+        self.poll(0.3, success=False, name="Renamed")
+        self.poll(0.3, success=False, name="Renamed")
+
+        self.assertEqual(
+            [
+                ("Robot poll latency", 100, {"stale": False}),
+                ("Renamed poll latency", 200, {"stale": False}),
+                ("Renamed poll latency", 300, {"stale": True}),
+            ],
+            self.states
+        )
+
+if __name__ == '__main__':
+    unittest.main()
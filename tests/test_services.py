@@ -0,0 +1,142 @@
+"""Test the services module"""
+import asyncio
+import unittest
+from homeassistant.exceptions import ServiceValidationError
+from custom_components.purei9 import services, const, exception
+from tests.fakes import FakeHass
+
+class FakeVacuum:
+    """A vacuum that records the commands it gets"""
+    running = 0
+    max_running = 0
+
+    def __init__(self, entity_id, fail=False, fan_speed_list=("ECO", "POWER")):
+        self.entity_id = entity_id
+        self.fail = fail
+        self.fan_speed_list = list(fan_speed_list)
+        self.commands = []
+
+    async def _async_command(self, *command):
+        FakeVacuum.running += 1
+        FakeVacuum.max_running = max(FakeVacuum.max_running, FakeVacuum.running)
+
+        try:
+            await asyncio.sleep(0.01)
+
+            if self.fail:
+                raise exception.CommandException("Failed")
+
+            self.commands.append(command)
+        finally:
+            FakeVacuum.running -= 1
+
+    async def async_start(self):
+        """Start cleaning"""
+        await self._async_command("start")
+
+    async def async_set_fan_speed(self, fan_speed):
+        """Set the fan speed"""
+        await self._async_command("set_fan_speed", fan_speed)
+
+    async def async_execute_command(self, command, params):
+        """Send a custom command"""
+        await self._async_command(command, params)
+
+# pylint: disable=too-few-public-methods
+def create_hass(vacuums):
+    """Just enough of Home Assistant to find the vacuums"""
+    return FakeHass({const.DOMAIN: {"entry": {const.VACUUMS: vacuums}}})
+
+class TestServices(unittest.IsolatedAsyncioTestCase):
+    """Tests for the services module"""
+    async def test_bulk_command(self):
+        """Test that every robot gets the command and a result"""
+        vacuums = [FakeVacuum(f"vacuum.robot_{i}") for i in range(10)]
+        vacuums.append(FakeVacuum("vacuum.broken", fail=True))
+
+        response = await services.async_handle_bulk_command(
+            create_hass(vacuums),
+            {
+                "entity_id": [vacuum.entity_id for vacuum in vacuums],
+                "action": services.ACTION_START,
+            }
+        )
+
+        results = response["results"]
+
+        self.assertEqual(11, len(results))
+        self.assertTrue(results["vacuum.robot_0"]["success"])
+        self.assertFalse(results["vacuum.broken"]["success"])
+        self.assertEqual([("start",)], vacuums[0].commands)
+        self.assertLessEqual(FakeVacuum.max_running, services.BULK_CONCURRENCY)
+
+    async def test_bulk_command_params(self):
+        """Test that parameters are passed on and required"""
+        vacuum = FakeVacuum("vacuum.robot")
+        hass = create_hass([vacuum])
+
+        await services.async_handle_bulk_command(
+            hass,
+            {
+                "entity_id": ["vacuum.robot"],
+                "action": services.ACTION_CLEAN_ZONES,
+                "map": "Upstairs",
+                "zones": ["Kitchen"],
+            }
+        )
+
+        response = await services.async_handle_bulk_command(
+            hass,
+            {"entity_id": ["vacuum.robot"], "action": services.ACTION_SET_FAN_SPEED}
+        )
+
+        self.assertEqual(
+            [("clean_zones", {"map": "Upstairs", "zones": ["Kitchen"]})],
+            vacuum.commands
+        )
+        self.assertFalse(response["results"]["vacuum.robot"]["success"])
+
+    async def test_bulk_command_fan_speed(self):
+        """Test that a fan speed that any robot does not have is rejected"""
+        vacuums = [
+            FakeVacuum("vacuum.robot"),
+            FakeVacuum("vacuum.robot_v2", fan_speed_list=("QUIET", "SMART", "POWER")),
+        ]
+        hass = create_hass(vacuums)
+
+        with self.assertRaises(ServiceValidationError):
+            await services.async_handle_bulk_command(
+                hass,
+                {
+                    "entity_id": ["vacuum.robot", "vacuum.robot_v2"],
+                    "action": services.ACTION_SET_FAN_SPEED,
+                    "fan_speed": "ECO",
+                }
+            )
+
+        self.assertEqual([[], []], [vacuum.commands for vacuum in vacuums])
+
+        await services.async_handle_bulk_command(
+            hass,
+            {
+                "entity_id": ["vacuum.robot", "vacuum.robot_v2"],
+                "action": services.ACTION_SET_FAN_SPEED,
+                "fan_speed": "POWER",
+            }
+        )
+
+        self.assertEqual(
+            [[("set_fan_speed", "POWER")], [("set_fan_speed", "POWER")]],
+            [vacuum.commands for vacuum in vacuums]
+        )
+
+    async def test_bulk_command_unknown(self):
+        """Test that unknown robots are rejected"""
+        with self.assertRaises(ServiceValidationError):
+            await services.async_handle_bulk_command(
+                create_hass([]),
+                {"entity_id": ["vacuum.unknown"], "action": services.ACTION_START}
+            )
+
+if __name__ == '__main__':
+    unittest.main()
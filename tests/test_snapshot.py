@@ -0,0 +1,45 @@
+"""Test the snapshot module"""
+import json
+import unittest
+from datetime import datetime
+from homeassistant.components.vacuum import VacuumActivity
+from purei9_unofficial.common import CleaningSession
+from custom_components.purei9 import snapshot, purei9
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for the snapshot module"""
+    def test_params_serialization(self):
+        """Test that params survive a round trip to the store"""
+        params = purei9.Params(
+            "foo",
+            "bar",
+            (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER),
+            state=VacuumActivity.CLEANING,
+            battery=40,
+            dustbin=purei9.Dustbin.FULL,
+            last_cleaning_session=CleaningSession(
+                endtime=datetime(2024, 1, 2),
+                duration=60,
+                cleandearea=10
+            ),
+            maps=({"id": "1", "name": "Upstairs", "zones": [{"id": "2", "name": "Kitchen"}]},),
+        )
+
+        # The store saves JSON
+        data = json.loads(json.dumps(snapshot.params_to_dict(params)))
+        result = snapshot.params_from_dict(data)
+
+        self.assertEqual(params.unique_id, result.unique_id)
+        self.assertEqual(params.name, result.name)
+        self.assertEqual(params.fan_speed_list, result.fan_speed_list)
+        self.assertEqual(params.state, result.state)
+        self.assertEqual(params.battery, result.battery)
+        self.assertEqual(params.dustbin, result.dustbin)
+        self.assertEqual(params.maps, result.maps)
+        self.assertEqual(
+            params.last_cleaning_session.endtime,
+            result.last_cleaning_session.endtime
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""Test the stream module"""
+import asyncio
+import json
+import unittest
+import unittest.mock
+from aiohttp import web, ClientSession
+from aiohttp.test_utils import TestServer
+from custom_components.purei9 import stream
+
+# pylint: disable=too-few-public-methods
+class FakeAuth:
+    """Authentication that never logs in"""
+    async def async_get_headers(self):
+        """Get fake headers"""
+        return {"Authorization": "Bearer foo"}
+
+class FailingAuth(FakeAuth):
+    """Authentication that fails to log in the first time"""
+    def __init__(self):
+        self.attempts = 0
+
+    async def async_get_headers(self):
+        """Fail to log in, then get fake headers"""
+        self.attempts += 1
+
+        if self.attempts == 1:
+            raise ValueError("Could not log in")
+
+        return await super().async_get_headers()
+
+class TestStream(unittest.IsolatedAsyncioTestCase):
+    """Tests for the stream module"""
+    def test_websocket_url(self):
+        """Test to get the websocket URL of a region"""
+        self.assertEqual(
+            "wss://ws.eu.ocp.electrolux.one",
+            stream.websocket_url("https://api.eu.ocp.electrolux.one")
+        )
+
+    data_parse_message = [
+        (
+            {"Payload": {"Appliances": [
+                {"ApplianceId": "foo", "Metrics": [{"Name": "robotStatus", "Value": 1}]}
+            ]}},
+            [("foo", {"robotStatus": 1})]
+        ),
+        ({"Payload": {"Appliances": [{"ApplianceId": "foo", "Metrics": []}]}}, []),
+        ({"Payload": None}, []),
+        ({}, []),
+    ]
+
+    def test_parse_message(self):
+        """Test to parse messages from the stream"""
+        for message, expected in self.data_parse_message:
+            with self.subTest():
+                self.assertEqual(expected, stream.parse_message(message))
+
+    async def test_stream(self):
+        """Test that pushed properties are delivered"""
+        headers = {}
+
+        async def handler(request):
+            headers.update(request.headers)
+            websocket = web.WebSocketResponse()
+            await websocket.prepare(request)
+            await websocket.send_str(json.dumps({"Payload": {"Appliances": [
+                {"ApplianceId": "foo", "Metrics": [{"Name": "batteryStatus", "Value": 6}]}
+            ]}}))
+            await websocket.close()
+            return websocket
+
+        app = web.Application()
+        app.add_routes([web.get("/", handler)])
+
+        deltas = asyncio.Queue()
+        connections = []
+
+        async def on_delta(appliance_id, delta):
+            await deltas.put((appliance_id, delta))
+
+        async with TestServer(app) as server, ClientSession() as session:
+            appliance_stream = stream.ApplianceStream(
+                session,
+                FakeAuth(),
+                str(server.make_url("/")),
+                ["foo"],
+                on_delta,
+                connections.append
+            )
+
+            task = asyncio.create_task(appliance_stream.async_run())
+
+            self.assertEqual(("foo", {"batteryStatus": 6}), await deltas.get())
+
+            task.cancel()
+
+        self.assertEqual("Bearer foo", headers["Authorization"])
+        self.assertEqual([{"applianceId": "foo"}], json.loads(headers["appliances"]))
+        self.assertTrue(connections[0])
+
+    async def test_stream_login_failed(self):
+        """Test that a failed login reconnects instead of ending the stream"""
+        async def handler(request):
+            websocket = web.WebSocketResponse()
+            await websocket.prepare(request)
+            await websocket.send_str(json.dumps({"Payload": {"Appliances": [
+                {"ApplianceId": "foo", "Metrics": [{"Name": "batteryStatus", "Value": 6}]}
+            ]}}))
+            await websocket.receive()
+            return websocket
+
+        app = web.Application()
+        app.add_routes([web.get("/", handler)])
+
+        deltas = asyncio.Queue()
+        connections = []
+
+        async def on_delta(appliance_id, delta):
+            await deltas.put((appliance_id, delta))
+
+        async with TestServer(app) as server, ClientSession() as session:
+            appliance_stream = stream.ApplianceStream(
+                session,
+                FailingAuth(),
+                str(server.make_url("/")),
+                ["foo"],
+                on_delta,
+                connections.append
+            )
+
+            with unittest.mock.patch.object(stream, "RECONNECT_DELAY_MIN", 0):
+                task = asyncio.create_task(appliance_stream.async_run())
+
+                async with asyncio.timeout(1):
+                    self.assertEqual(("foo", {"batteryStatus": 6}), await deltas.get())
+
+            task.cancel()
+
+        self.assertEqual([False, True], connections[:2])
+
+    async def test_stream_bad_messages(self):
+        """Test that bad messages are skipped without reconnecting"""
+        async def handler(request):
+            websocket = web.WebSocketResponse()
+            await websocket.prepare(request)
+            await websocket.send_str("{")
+            await websocket.send_str(json.dumps({"Payload": {"Appliances": [1]}}))
+            await websocket.send_str(json.dumps({"Payload": {"Appliances": [
+                {"ApplianceId": "broken", "Metrics": [{"Name": "batteryStatus", "Value": 6}]},
+                {"ApplianceId": "foo", "Metrics": [{"Name": "batteryStatus", "Value": 6}]}
+            ]}}))
+            # Keep the connection open
+            await websocket.receive()
+            return websocket
+
+        app = web.Application()
+        app.add_routes([web.get("/", handler)])
+
+        deltas = asyncio.Queue()
+        connections = []
+
+        async def on_delta(appliance_id, delta):
+            if appliance_id == "broken":
+                raise ValueError("Can't apply the delta")
+
+            await deltas.put((appliance_id, delta))
+
+        async with TestServer(app) as server, ClientSession() as session:
+            appliance_stream = stream.ApplianceStream(
+                session,
+                FakeAuth(),
+                str(server.make_url("/")),
+                ["foo", "broken"],
+                on_delta,
+                connections.append
+            )
+
+            task = asyncio.create_task(appliance_stream.async_run())
+
+            with self.assertLogs(stream.__name__, "WARNING") as logs:
+                self.assertEqual(("foo", {"batteryStatus": 6}), await deltas.get())
+
+            task.cancel()
+
+        self.assertEqual(1, connections.count(True))
+        self.assertEqual(3, len(logs.records))
+
+if __name__ == '__main__':
+    unittest.main()
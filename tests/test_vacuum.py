@@ -0,0 +1,116 @@
+"""Test the vacuum module"""
+import unittest
+import unittest.mock
+from homeassistant.components.vacuum import VacuumActivity
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from custom_components.purei9 import command_queue, exception, purei9, scheduler, vacuum
+from tests.fakes import FakeHass
+
+# pylint: disable=too-few-public-methods
+class FakeRobot:
+    """A robot that fails while the cloud is unavailable"""
+    def __init__(self):
+        self.cloud_available = True
+        self.calls = []
+
+    async def _async_call(self, name):
+        if not self.cloud_available:
+            raise exception.CloudUnavailableException("The cloud is unavailable.")
+
+        self.calls.append(name)
+
+    async def async_startclean(self):
+        """Start cleaning"""
+        await self._async_call("startclean")
+
+    async def async_setpowermode(self, mode):
+        """Set the power mode"""
+        await self._async_call(mode)
+
+class FakeCoordinator:
+    """Only what the vacuum needs"""
+    def __init__(self, hass, params):
+        self.data = params
+        self.last_update_success = True
+        self.commands = command_queue.CommandQueue(hass, debounce=0)
+        self.confirmations = []
+
+    def async_confirm(self, confirmed):
+        """Remember what confirms a command"""
+        self.confirmations.append(confirmed)
+
+class TestVacuum(unittest.IsolatedAsyncioTestCase):
+    """Tests for the vacuum module"""
+    async def asyncSetUp(self):
+        params = purei9.Params("foo", "Robot", (purei9.POWER_MODE_ECO, purei9.POWER_MODE_POWER))
+        self.coordinator = FakeCoordinator(FakeHass(), params)
+        self.robot = FakeRobot()
+        self.vacuum = vacuum.PureI9(self.coordinator, self.robot, params)
+        self.states = []
+        self.vacuum.async_write_ha_state = lambda: self.states.append(self.vacuum.activity)
+
+    async def test_start(self):
+        """Test that the robot is told to start cleaning"""
+        await self.vacuum.async_start()
+
+        self.assertEqual(["startclean"], self.robot.calls)
+        self.assertEqual(1, len(self.states))
+
+    @staticmethod
+    def clock(now):
+        """Stop the clock of the vacuum at a point in time"""
+        return unittest.mock.patch.object(
+            vacuum,
+            "time",
+            unittest.mock.Mock(monotonic=lambda: now)
+        )
+
+    def poll(self, now):
+        """Deliver a poll that still has the state from before any command"""
+        with self.clock(now):
+            # pylint: disable=protected-access
+            self.vacuum._handle_coordinator_update()
+
+    async def test_hold(self):
+        """Test that each optimistic value is held until its own deadline"""
+        with self.clock(0):
+            await self.vacuum.async_start()
+
+        with self.clock(10):
+            await self.vacuum.async_set_fan_speed(purei9.POWER_MODE_ECO)
+
+        # A stale poll does not revert the held state
+        self.poll(1)
+        self.assertEqual(VacuumActivity.CLEANING, self.vacuum.activity)
+        self.assertEqual(purei9.POWER_MODE_ECO, self.vacuum.fan_speed)
+
+        # Setting the fan speed did not hold the state for longer
+        self.poll(scheduler.CONFIRM_DEADLINE + 1)
+        self.assertEqual(self.coordinator.data.state, self.vacuum.activity)
+        self.assertEqual(purei9.POWER_MODE_ECO, self.vacuum.fan_speed)
+
+        self.poll(scheduler.CONFIRM_DEADLINE + 11)
+        self.assertEqual(purei9.POWER_MODE_POWER, self.vacuum.fan_speed)
+
+    async def test_cloud_unavailable(self):
+        """Test that the user is told why a command could not be sent"""
+        self.robot.cloud_available = False
+
+        with self.assertRaises(HomeAssistantError):
+            await self.vacuum.async_start()
+
+        with self.assertRaises(HomeAssistantError):
+            await self.vacuum.async_set_fan_speed(purei9.POWER_MODE_POWER)
+
+    async def test_unknown_command(self):
+        """Test that an unknown command is rejected"""
+        with self.assertRaises(ServiceValidationError):
+            await self.vacuum.async_send_command("dance")
+
+        with self.assertRaises(ServiceValidationError):
+            await self.vacuum.async_set_fan_speed("dance")
+
+        self.assertEqual([], self.robot.calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Test the vacuum_command module"""
+import unittest
+from custom_components.purei9 import vacuum_command, exception, zones, purei9
+
+MAPS = (
+    {
+        "id": "map-1",
+        "name": "Upstairs",
+        "zones": [{"id": "zone-1", "name": "Kitchen"}, {"id": "zone-2", "name": "Hallway"}],
+    },
+)
+
+# pylint: disable=too-few-public-methods
+class FakeRobot:
+    """A robot that records which zones it was asked to clean"""
+    def __init__(self):
+        self.cleaned = []
+
+    async def async_clean_zones(self, map_id, zone_ids):
+        """Record the zones"""
+        self.cleaned.append((map_id, zone_ids))
+
+class TestVacuumCommand(unittest.IsolatedAsyncioTestCase):
+    """Tests for the vacuum_command module"""
+    def test_get_command(self):
+        """Test that commands are registered once and reused"""
+        command = vacuum_command.get_command(vacuum_command.COMMAND_CLEAN_ZONES)
+
+        self.assertIsInstance(command, vacuum_command.CommandCleanZones)
+        self.assertIs(command, vacuum_command.get_command(vacuum_command.COMMAND_CLEAN_ZONES))
+        self.assertIsNone(vacuum_command.get_command("does_not_exist"))
+
+    data_validate_invalid = [
+        (None, "params"),
+        ({"zones": ["Kitchen"]}, "map"),
+        ({"map": "Upstairs"}, "zones"),
+    ]
+
+    def test_validate_invalid(self):
+        """Test that missing parameters are explained"""
+        command = vacuum_command.get_command(vacuum_command.COMMAND_CLEAN_ZONES)
+
+        for params, param_name in self.data_validate_invalid:
+            with self.subTest():
+                with self.assertRaises(exception.CommandParamException) as context:
+                    command.validate(params)
+
+                self.assertEqual(param_name, context.exception.param_name)
+
+    def test_validate(self):
+        """Test that parameters are normalized"""
+        command = vacuum_command.get_command(vacuum_command.COMMAND_CLEAN_ZONES)
+
+        self.assertEqual(
+            {"map": "Upstairs", "zones": ["Kitchen"]},
+            command.validate({"map": "Upstairs", "zones": "Kitchen"})
+        )
+
+    async def test_clean_zones(self):
+        """Test that zones are cleaned by name"""
+        robot = FakeRobot()
+        params = purei9.Params("id", "Robot", (), maps=MAPS)
+        target = vacuum_command.CommandTarget(robot, params, zones.ZoneIndex(MAPS))
+        command = vacuum_command.get_command(vacuum_command.COMMAND_CLEAN_ZONES)
+
+        await command.execute(target, {"map": "upstairs", "zones": ["Hallway", "Garage"]})
+        self.assertEqual([("map-1", ["zone-2"])], robot.cleaned)
+
+        with self.assertRaises(exception.CommandException):
+            await command.execute(target, {"map": "Basement", "zones": ["Hallway"]})
+
+if __name__ == '__main__':
+    unittest.main()
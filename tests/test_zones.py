@@ -0,0 +1,69 @@
+"""Test the zones module"""
+import unittest
+from custom_components.purei9 import zones
+
+MAPS = (
+    {
+        "id": "map-1",
+        "name": "Ground floor",
+        "zones": [
+            {"id": "zone-1", "name": "Kitchen"},
+            {"id": "zone-2", "name": "Living room"},
+        ],
+    },
+    {
+        "id": "map-2",
+        "name": "Upstairs",
+        "zones": [
+            {"id": "zone-3", "name": "Kitchen"},
+            {"id": "zone-4", "name": None},
+        ],
+    },
+    {
+        "id": "map-3",
+        "name": None,
+        "zones": [],
+    },
+)
+
+class TestZones(unittest.TestCase):
+    """Tests for the zones module"""
+    data_find_map_id = [
+        ("Ground floor", "map-1"),
+        ("ground FLOOR", "map-1"),
+        (" Upstairs ", "map-2"),
+        ("map-3", "map-3"),
+        ("Basement", None),
+    ]
+
+    def test_find_map_id(self):
+        """Test finding maps by name and id"""
+        index = zones.ZoneIndex(MAPS)
+
+        for map_name_or_id, expected in self.data_find_map_id:
+            with self.subTest():
+                self.assertEqual(expected, index.find_map_id(map_name_or_id))
+
+    data_find_zone_ids = [
+        ("map-1", ["kitchen"], ["zone-1"]),
+        ("map-2", ["KITCHEN"], ["zone-3"]),
+        ("map-1", ["Living room", "zone-1"], ["zone-2", "zone-1"]),
+        ("map-1", ["Kitchen", "zone-1"], ["zone-1"]),
+        ("map-2", ["zone-4", "Garage"], ["zone-4"]),
+        ("map-1", ["zone-3"], []),
+    ]
+
+    def test_find_zone_ids(self):
+        """Test finding zones by name and id within a map"""
+        index = zones.ZoneIndex(MAPS)
+
+        for map_id, zone_names_or_ids, expected in self.data_find_zone_ids:
+            with self.subTest():
+                self.assertEqual(expected, index.find_zone_ids(map_id, zone_names_or_ids))
+
+    def test_maps(self):
+        """Test that the index remembers which maps it was built from"""
+        self.assertIs(MAPS, zones.ZoneIndex(MAPS).maps)
+
+if __name__ == '__main__':
+    unittest.main()